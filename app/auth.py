@@ -1,18 +1,36 @@
-from fastapi import Depends, HTTPException, status
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import Optional, Union
-from pydantic import BaseModel, EmailStr
-from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from .database import get_db
+from typing import Any, Callable, Dict, Optional, Set, Tuple, Union
+from pydantic import BaseModel, ConfigDict, EmailStr
+from .config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE,
+    AUTH_CACHE_ENABLED, AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS, ADMIN_USERNAMES
+)
+from .database import get_db, run_db
+from .profiler import tag_thread
 from .models import User
 from app.logger import logger
 
 # Configure password hashing and OAuth2
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max rounds to the configured cost flags hashes made with any other cost for rehashing
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
 
 class Token(BaseModel):
@@ -24,6 +42,15 @@ class TokenData(BaseModel):
     """Token data model for decoded JWT tokens."""
     username: Optional[str] = None
 
+class CurrentUser(BaseModel):
+    """Authenticated principal: a detached snapshot of the user record, safe to cache and share."""
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    id: int
+    username: str
+    email: Optional[str] = None
+    is_active: bool = True
+
 class UserCreate(BaseModel):
     """User creation request model with validation."""
     username: str
@@ -56,6 +83,23 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         logger.error("Password verification failed", exc_info=True)
         return False
 
+def verify_password_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and produce a replacement hash if the stored one uses an outdated cost.
+    
+    Args:
+        plain_password: The password to verify
+        hashed_password: The hashed password to compare against
+    
+    Returns:
+        Tuple[bool, Optional[str]]: Whether the password matches, and the new hash to store (or None)
+    """
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception as e:
+        logger.error("Password verification failed", exc_info=True)
+        return False, None
+
 def get_password_hash(password: str) -> str:
     """
     Generate password hash using bcrypt.
@@ -78,6 +122,40 @@ def get_password_hash(password: str) -> str:
             detail="Password processing failed"
         )
 
+# Bcrypt runs on a dedicated pool (bcrypt releases the GIL) so logins never block the event loop
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE)
+
+async def run_password_task(fn: Callable[..., Any], *args) -> Any:
+    """
+    Run a bcrypt operation on the password pool.
+    
+    Args:
+        fn: Blocking hashing or verification function
+        *args: Arguments for fn
+    
+    Returns:
+        Any: The result of fn
+    
+    Raises:
+        HTTPException: 503 if the pool and its queue are full
+    """
+    if not _password_slots.acquire(blocking=False):
+        logger.warning("Password hashing queue is full; rejecting request")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent sign-ins, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    # The slot is held until the work itself finishes, even if the awaiting request is cancelled
+    future = asyncio.get_running_loop().run_in_executor(_password_executor, tag_thread(fn), *args)
+    future.add_done_callback(lambda _: _password_slots.release())
+    return await future
+
+async def aget_password_hash(password: str) -> str:
+    """Async variant of get_password_hash running on the password pool."""
+    return await run_password_task(get_password_hash, password)
+
 def get_user(db: Session, username: str) -> Optional[User]:
     """
     Retrieve user from database by username.
@@ -101,13 +179,30 @@ def get_user(db: Session, username: str) -> Optional[User]:
             detail="Database error occurred"
         )
 
-def create_user(db: Session, user: UserCreate) -> User:
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    """
+    Retrieve user from database by email address.
+    
+    Raises:
+        HTTPException: If database query fails
+    """
+    try:
+        return db.query(User).filter(User.email == email).first()
+    except Exception as e:
+        logger.error("Database query for user failed", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Database error occurred"
+        )
+
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
     """
     Create a new user in the database.
     
     Args:
         db: Database session
         user: User creation data
+        hashed_password: Precomputed password hash, e.g. from aget_password_hash
     
     Returns:
         User: Created user object
@@ -116,7 +211,7 @@ def create_user(db: Session, user: UserCreate) -> User:
         HTTPException: If user creation fails
     """
     try:
-        logger.info(f"Creating new user: {user.username}")
+        logger.info("Creating new user: %s", user.username)
         
         # Check if username already exists
         if db.query(User).filter(User.username == user.username).first():
@@ -135,13 +230,13 @@ def create_user(db: Session, user: UserCreate) -> User:
         db_user = User(
             username=user.username,
             email=user.email,
-            hashed_password=get_password_hash(user.password)
+            hashed_password=hashed_password or get_password_hash(user.password)
         )
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
         
-        logger.info(f"User created successfully: {user.username}")
+        logger.info("User created successfully: %s", user.username)
         return db_user
         
     except HTTPException:
@@ -170,20 +265,63 @@ def authenticate_user(db: Session, username: str, password: str) -> Union[User,
     try:
         user = get_user(db, username)
         if not user:
-            logger.warning(f"Authentication failed: User not found - {username}")
+            logger.warning("Authentication failed: User not found - %s", username)
             return False
             
-        if not verify_password(password, user.hashed_password):
-            logger.warning(f"Authentication failed: Invalid password - {username}")
+        valid, new_hash = verify_password_and_update(password, user.hashed_password)
+        if not valid:
+            logger.warning("Authentication failed: Invalid password - %s", username)
             return False
+        _store_rehashed_password(db, user, new_hash)
             
-        logger.info(f"User authenticated successfully: {username}")
+        logger.info("User authenticated successfully: %s", username)
         return user
         
     except Exception as e:
         logger.error("Authentication error", exc_info=True)
         return False
 
+async def aauthenticate_user(db: Session, username: str, password: str) -> Union[User, bool]:
+    """
+    Async variant of authenticate_user; bcrypt runs on the password pool and
+    the queries on the database threads.
+    
+    Raises:
+        HTTPException: 503 if the password pool is saturated
+    """
+    try:
+        user = await run_db(get_user, db, username)
+        if not user:
+            logger.warning("Authentication failed: User not found - %s", username)
+            return False
+
+        valid, new_hash = await run_password_task(verify_password_and_update, password, user.hashed_password)
+        if not valid:
+            logger.warning("Authentication failed: Invalid password - %s", username)
+            return False
+        await run_db(_store_rehashed_password, db, user, new_hash)
+
+        logger.info("User authenticated successfully: %s", username)
+        return user
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Authentication error", exc_info=True)
+        return False
+
+def _store_rehashed_password(db: Session, user: User, new_hash: Optional[str]) -> None:
+    """Persist a hash upgraded to the configured bcrypt cost; failures keep the old hash."""
+    if not new_hash:
+        return
+    try:
+        user.hashed_password = new_hash
+        db.commit()
+        logger.info("Password rehashed with bcrypt cost %s: %s", BCRYPT_ROUNDS, user.username)
+    except Exception as e:
+        logger.error("Failed to store rehashed password", exc_info=True)
+        db.rollback()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create JWT access token.
@@ -204,7 +342,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         to_encode.update({"exp": expire})
         token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         
-        logger.debug(f"Access token created for user: {data.get('sub')}")
+        logger.debug("Access token created for user: %s", data.get('sub'))
         return token
         
     except Exception as e:
@@ -214,23 +352,129 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
             detail="Failed to create access token"
         )
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+class PrincipalCache:
     """
-    Validate JWT token and return current user.
+    Bounded in-process cache of verified tokens and the users they belong to.
+
+    A hit skips both the JWT decode and the ``users`` query. Entries expire
+    with their token (or after ``ttl_seconds``, whichever is sooner) and are
+    dropped explicitly when a user's ``is_active`` flag or credentials change.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES, ttl_seconds: float = AUTH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[CurrentUser, float]]" = OrderedDict()  # token -> (user, expires_at)
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def put(self, token: str, user: CurrentUser, token_expires_at: Optional[float]) -> None:
+        """Cache a verified principal; ``token_expires_at`` is the token's ``exp`` as a Unix timestamp."""
+        lifetime = self.ttl_seconds
+        if token_expires_at is not None:
+            lifetime = min(lifetime, token_expires_at - time.time())
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (user, time.monotonic() + lifetime)
+            self._entries.move_to_end(token)
+            self._tokens_by_user.setdefault(user.username, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, token: str) -> None:
+        user, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user.username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user.username]
+
+    def invalidate_user(self, username: str) -> None:
+        """Drop every cached token of a user."""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(username, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+
+# Shared principal cache, or None when disabled
+principal_cache: Optional[PrincipalCache] = PrincipalCache() if AUTH_CACHE_ENABLED else None
+
+def invalidate_user(username: str) -> None:
+    """Forget cached authentication for a user, e.g. after deactivation or a password change."""
+    if principal_cache is not None:
+        principal_cache.invalidate_user(username)
+
+# Session.info key of the usernames flushed with credential changes, invalidated again on commit
+_INVALIDATE_ON_COMMIT = "principal_cache_invalidations"
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_user_change(mapper, connection, target: User) -> None:
+    """
+    Invalidate cached principals whenever is_active or the credentials of a user change.
+
+    The flush runs before the commit, and a concurrent cache miss in between still
+    reads the old committed row and caches it; the usernames are therefore kept on
+    the session and invalidated once more after the commit.
+    """
+    state = inspect(target)
+    changed = any(
+        state.attrs[name].history.has_changes()
+        for name in ("is_active", "hashed_password", "username")
+    )
+    if changed:
+        usernames = {target.username, *(state.attrs["username"].history.deleted or ())}
+        for username in usernames:
+            invalidate_user(username)
+        if state.session is not None:
+            state.session.info.setdefault(_INVALIDATE_ON_COMMIT, set()).update(usernames)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for username in session.info.pop(_INVALIDATE_ON_COMMIT, ()):
+        invalidate_user(username)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_invalidations(session: Session) -> None:
+    # The committed rows did not change, so principals cached meanwhile are still valid
+    session.info.pop(_INVALIDATE_ON_COMMIT, None)
+
+def authenticate_token(db: Session, token: str) -> CurrentUser:
+    """
+    Resolve a bearer token to the active user it was issued to.
     
     Args:
-        token: JWT token to validate
-        db: Database session
+        db: Database session, only used on a cache miss
+        token: Encoded JWT
     
     Returns:
-        User: Current authenticated user
+        CurrentUser: The authenticated principal
     
     Raises:
-        HTTPException: If token is invalid or user not found
+        HTTPException: 401 if the token is invalid or the user is unknown, 403 if inactive
     """
+    if principal_cache is not None:
+        cached = principal_cache.get(token)
+        if cached is not None:
+            return cached
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid authentication credentials",
@@ -252,15 +496,77 @@ def get_current_user(
     
     user = get_user(db, username=token_data.username)
     if not user:
-        logger.warning(f"User not found: {token_data.username}")
+        logger.warning("User not found: %s", token_data.username)
         raise credentials_exception
     
     if not user.is_active:
-        logger.warning(f"Inactive user attempted access: {user.username}")
+        logger.warning("Inactive user attempted access: %s", user.username)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is inactive"
         )
         
-    logger.debug(f"Current user validated: {user.username}")
-    return user 
\ No newline at end of file
+    principal = CurrentUser.model_validate(user)
+    if principal_cache is not None:
+        principal_cache.put(token, principal, payload.get("exp"))
+    logger.debug("Current user validated: %s", user.username)
+    return principal
+
+async def aauthenticate_token(db: Session, token: str) -> CurrentUser:
+    """Async variant of authenticate_token: cache hits stay on the event loop, misses query on the database threads."""
+    if principal_cache is not None:
+        cached = principal_cache.get(token)
+        if cached is not None:
+            return cached
+    return await run_db(authenticate_token, db, token)
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
+    """
+    Validate JWT token and return current user.
+    
+    Args:
+        token: JWT token to validate
+        db: Database session
+    
+    Returns:
+        CurrentUser: Current authenticated user
+    
+    Raises:
+        HTTPException: If token is invalid or user not found
+    """
+    return await aauthenticate_token(db, token)
+
+async def get_admin_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    """
+    Require an authenticated user listed in ``ADMIN_USERNAMES``.
+    
+    Raises:
+        HTTPException: 403 if the user is not an administrator
+    """
+    if current_user.username not in ADMIN_USERNAMES:
+        logger.warning("Non-admin user attempted admin access: %s", current_user.username)
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator access required"
+        )
+    return current_user
+
+async def get_page_user(request: Request, db: Session = Depends(get_db)) -> Optional[CurrentUser]:
+    """
+    Authenticate a page request from the ``access_token`` cookie or the Authorization header.
+    
+    Returns:
+        Optional[CurrentUser]: The user, or None if the request is not authenticated
+    """
+    token = request.cookies.get("access_token") or request.headers.get("Authorization")
+    if not token:
+        return None
+    if token.startswith("Bearer "):
+        token = token[len("Bearer "):]
+    try:
+        return await aauthenticate_token(db, token)
+    except HTTPException:
+        return None
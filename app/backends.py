@@ -0,0 +1,507 @@
+"""
+Pluggable inference backends for the heart disease model.
+
+Every backend serves ``dl_best_model.h5`` and exposes the same ``predict``
+interface. Backends are looked up by name through :data:`BACKENDS`, so the one
+used by :class:`app.prediction.ML_Model_Predictor` is chosen with the
+``INFERENCE_BACKEND`` setting. The ``remote`` backend forwards rows to the
+inference sidecar in :mod:`app.inference_server`.
+
+Run ``python -m app.backends export`` to write the NumPy weight file and
+``python -m app.backends parity`` to confirm all backends agree.
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import struct
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+from app.logger import logger
+from .config import (
+    MODELS_DIR, INFERENCE_SOCKET_PATH, INFERENCE_SOCKET_TIMEOUT_SECONDS, INFERENCE_SOCKET_POOL_SIZE
+)
+
+KERAS_MODEL_PATH = os.path.join(MODELS_DIR, "dl_best_model.h5")
+NUMPY_MODEL_PATH = os.path.join(MODELS_DIR, "dl_best_model.npz")
+TFLITE_MODEL_PATH = os.path.join(MODELS_DIR, "dl_best_model.tflite")
+
+# Registry of backend name -> backend class
+BACKENDS: Dict[str, Type["InferenceBackend"]] = {}
+
+
+def register_backend(name: str) -> Callable[[Type["InferenceBackend"]], Type["InferenceBackend"]]:
+    """Class decorator adding a backend to the registry under ``name``."""
+    def decorator(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def create_backend(
+    name: str,
+    scaler=None,
+    model_path: str = KERAS_MODEL_PATH,
+    version: Optional[str] = None
+) -> "InferenceBackend":
+    """
+    Instantiate a registered backend.
+
+    Args:
+        name: Registered backend name (keras, numpy, tflite, remote)
+        scaler: Fitted StandardScaler, required by backends that fold scaling
+        model_path: Path to the Keras .h5 model
+        version: Model registry version of ``model_path``; the remote backend asks the sidecar for it
+
+    Returns:
+        InferenceBackend: Loaded backend ready for prediction
+
+    Raises:
+        ValueError: If no backend is registered under ``name``
+    """
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown inference backend '{name}'. Available: {', '.join(sorted(BACKENDS))}")
+    return backend_cls(model_path=model_path, scaler=scaler, version=version)
+
+
+def sibling_path(model_path: str, extension: str) -> str:
+    """Path of a converted model stored next to the .h5 file, e.g. dl_best_model.npz."""
+    return os.path.splitext(model_path)[0] + extension
+
+
+class InferenceBackend:
+    """Base class for model backends."""
+
+    name = "base"
+
+    # True if the backend expects raw (unscaled) features because it has the
+    # scaler folded into its first layer
+    folds_scaler = False
+
+    # True if the model is served by another process, so parity checks skip it
+    out_of_process = False
+
+    def __init__(self, model_path: str = KERAS_MODEL_PATH, scaler=None, version: Optional[str] = None):
+        self.model_path = model_path
+        self.scaler = scaler
+        self.version = version
+
+    def predict(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Run a forward pass.
+
+        Args:
+            rows: 2D array of shape (n, 11). Scaled features unless ``folds_scaler``
+
+        Returns:
+            np.ndarray: Model outputs of shape (n, 1)
+        """
+        raise NotImplementedError
+
+
+@register_backend("keras")
+class KerasBackend(InferenceBackend):
+    """Serves the model with ``tf.keras``."""
+
+    def __init__(self, model_path: str = KERAS_MODEL_PATH, scaler=None, version: Optional[str] = None):
+        super().__init__(model_path, scaler, version)
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict_on_batch(rows))
+
+
+_ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "tanh": np.tanh,
+}
+
+
+def read_keras_dense_layers(model_path: str = KERAS_MODEL_PATH) -> List[Tuple[np.ndarray, np.ndarray, str]]:
+    """
+    Read Dense layer weights and activations straight from a Keras .h5 file.
+
+    Only ``h5py`` is needed, so TensorFlow is never imported. Dropout layers are
+    skipped since they are a no-op at inference time.
+
+    Returns:
+        List[Tuple[np.ndarray, np.ndarray, str]]: (kernel, bias, activation) per Dense layer
+    """
+    import h5py
+
+    layers = []
+    with h5py.File(model_path, "r") as f:
+        config = json.loads(f.attrs["model_config"])
+        weights = f["model_weights"]
+        for layer in config["config"]["layers"]:
+            class_name = layer["class_name"]
+            layer_config = layer["config"]
+            if class_name in ("InputLayer", "Dropout"):
+                continue
+            if class_name != "Dense":
+                raise ValueError(f"Layer type '{class_name}' is not supported by the NumPy backend")
+
+            group = weights[layer_config["name"]]
+            names = [n.decode() if isinstance(n, bytes) else n for n in group.attrs["weight_names"]]
+            kernel = np.asarray(group[next(n for n in names if "kernel" in n)])
+            bias = (
+                np.asarray(group[next(n for n in names if "bias" in n)])
+                if layer_config.get("use_bias", True) else np.zeros(kernel.shape[1], dtype=kernel.dtype)
+            )
+            layers.append((kernel, bias, layer_config.get("activation", "linear")))
+    return layers
+
+
+def export_numpy_model(model_path: str = KERAS_MODEL_PATH, output_path: str = NUMPY_MODEL_PATH) -> str:
+    """Export the Dense layers of a Keras .h5 model to a NumPy .npz file."""
+    layers = read_keras_dense_layers(model_path)
+    arrays = {}
+    for index, (kernel, bias, _) in enumerate(layers):
+        arrays[f"kernel_{index}"] = kernel
+        arrays[f"bias_{index}"] = bias
+    arrays["activations"] = np.array([activation for _, _, activation in layers])
+    np.savez(output_path, **arrays)
+    logger.info("Exported %s dense layers to %s", len(layers), output_path)
+    return output_path
+
+
+def load_numpy_model(path: str = NUMPY_MODEL_PATH) -> List[Tuple[np.ndarray, np.ndarray, str]]:
+    """Load Dense layers previously written by :func:`export_numpy_model`."""
+    with np.load(path, allow_pickle=False) as data:
+        activations = [str(a) for a in data["activations"]]
+        return [(data[f"kernel_{i}"], data[f"bias_{i}"], activation) for i, activation in enumerate(activations)]
+
+
+@register_backend("numpy")
+class NumpyBackend(InferenceBackend):
+    """
+    Pure-NumPy forward pass of the dense network.
+
+    The scaler's mean and scale are folded into the first layer, so this backend
+    takes raw clinical features and needs neither TensorFlow nor scikit-learn at
+    prediction time.
+    """
+
+    folds_scaler = True
+
+    def __init__(
+        self,
+        model_path: str = KERAS_MODEL_PATH,
+        scaler=None,
+        version: Optional[str] = None,
+        numpy_path: Optional[str] = None
+    ):
+        super().__init__(model_path, scaler, version)
+        numpy_path = numpy_path or sibling_path(model_path, ".npz")
+        if scaler is None:
+            raise ValueError("The NumPy backend needs the fitted scaler to fold into its first layer")
+
+        layers = load_numpy_model(numpy_path) if os.path.exists(numpy_path) else read_keras_dense_layers(model_path)
+        self.layers = self._fold_scaler(layers, scaler)
+
+    @staticmethod
+    def _fold_scaler(layers, scaler) -> List[Tuple[np.ndarray, np.ndarray, Callable]]:
+        """Fold ``(x - mean) / scale`` into the first layer's kernel and bias."""
+        mean = np.asarray(scaler.mean_, dtype=np.float64)
+        scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+        folded = []
+        for index, (kernel, bias, activation) in enumerate(layers):
+            if activation not in _ACTIVATIONS:
+                raise ValueError(f"Activation '{activation}' is not supported by the NumPy backend")
+            kernel = np.asarray(kernel, dtype=np.float64)
+            bias = np.asarray(bias, dtype=np.float64)
+            if index == 0:
+                kernel = kernel / scale[:, None]
+                bias = bias - mean @ kernel
+            folded.append((kernel, bias, _ACTIVATIONS[activation]))
+        return folded
+
+    def predict(self, rows: np.ndarray) -> np.ndarray:
+        output = np.asarray(rows, dtype=np.float64)
+        for kernel, bias, activation in self.layers:
+            output = activation(output @ kernel + bias)
+        return output
+
+
+@register_backend("tflite")
+class TFLiteBackend(InferenceBackend):
+    """
+    Serves the model with a TFLite interpreter.
+
+    Uses ``tflite_runtime`` when installed and falls back to ``tf.lite``. The
+    .tflite file is converted from the Keras model on first use if missing.
+    """
+
+    def __init__(
+        self,
+        model_path: str = KERAS_MODEL_PATH,
+        scaler=None,
+        version: Optional[str] = None,
+        tflite_path: Optional[str] = None
+    ):
+        super().__init__(model_path, scaler, version)
+        tflite_path = tflite_path or sibling_path(model_path, ".tflite")
+        if not os.path.exists(tflite_path):
+            self._convert(model_path, tflite_path)
+
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=tflite_path)
+        self.interpreter.allocate_tensors()
+        self._input_index = self.interpreter.get_input_details()[0]["index"]
+        self._output_index = self.interpreter.get_output_details()[0]["index"]
+        self._batch_size = None
+
+    @staticmethod
+    def _convert(model_path: str, tflite_path: str) -> None:
+        import tensorflow as tf
+        model = tf.keras.models.load_model(model_path)
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        with open(tflite_path, "wb") as f:
+            f.write(converter.convert())
+        logger.info("Converted Keras model to TFLite at %s", tflite_path)
+
+    def predict(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.ascontiguousarray(rows, dtype=np.float32)
+        if rows.shape[0] != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input_index, list(rows.shape))
+            self.interpreter.allocate_tensors()
+            self._batch_size = rows.shape[0]
+        self.interpreter.set_tensor(self._input_index, rows)
+        self.interpreter.invoke()
+        return np.array(self.interpreter.get_tensor(self._output_index))
+
+
+# Sidecar wire protocol. A request is a REQUEST_HEADER (rows, columns, version length)
+# followed by the UTF-8 model version to score with (empty for the sidecar's default)
+# and rows * columns little-endian float32 raw features; a request without rows only
+# loads the version. A response is a RESPONSE_HEADER (status, count, version length)
+# followed by the version that scored the rows and count float32 probabilities, or on
+# error no version and a UTF-8 message of count bytes. Connections are persistent and
+# carry one request at a time.
+REQUEST_HEADER = struct.Struct("<IIH")
+RESPONSE_HEADER = struct.Struct("<BIH")
+STATUS_OK = 0
+STATUS_ERROR = 1
+WIRE_DTYPE = np.dtype("<f4")
+
+
+class RemoteInferenceError(Exception):
+    """The sidecar received the request but could not score it."""
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    """Read exactly ``size`` bytes, raising ConnectionError if the peer closes first."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Inference socket closed by peer")
+        received += count
+    return buffer
+
+
+@register_backend("remote")
+class RemoteBackend(InferenceBackend):
+    """
+    Client of the inference sidecar (``python -m app.inference_server``).
+
+    The sidecar owns the scaler and model, so raw features are sent as-is and
+    the web worker never imports TensorFlow. Every call names the model version
+    it expects and is scored by the sidecar with exactly that version, which the
+    sidecar loads on first use; without a version the sidecar's default is used
+    and recorded. Connections are pooled; a call on a stale connection, e.g.
+    after the sidecar restarted, is retried once on a fresh one.
+    """
+
+    folds_scaler = True
+    out_of_process = True
+
+    def __init__(
+        self,
+        model_path: str = KERAS_MODEL_PATH,
+        scaler=None,
+        version: Optional[str] = None,
+        socket_path: str = INFERENCE_SOCKET_PATH,
+        timeout: float = INFERENCE_SOCKET_TIMEOUT_SECONDS,
+        pool_size: int = INFERENCE_SOCKET_POOL_SIZE
+    ):
+        super().__init__(model_path, scaler, version)
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool: "queue.LifoQueue[socket.socket]" = queue.LifoQueue()
+        # Fail at startup or activation, rather than on the first request, if the
+        # sidecar is not listening or cannot load the version
+        self.predict(np.empty((0, 0), dtype=WIRE_DTYPE))
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _release(self, sock: socket.socket) -> None:
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(sock)
+        else:
+            sock.close()
+
+    def _call(self, sock: socket.socket, rows: np.ndarray) -> np.ndarray:
+        version = (self.version or "").encode("utf-8")
+        sock.sendall(REQUEST_HEADER.pack(*rows.shape, len(version)) + version + rows.tobytes())
+        status, count, version_length = RESPONSE_HEADER.unpack(recv_exactly(sock, RESPONSE_HEADER.size))
+        served = recv_exactly(sock, version_length).decode("utf-8")
+        payload = recv_exactly(sock, count if status != STATUS_OK else count * WIRE_DTYPE.itemsize)
+        if status != STATUS_OK:
+            raise RemoteInferenceError(payload.decode("utf-8", "replace"))
+        if self.version is None:
+            self.version = served
+        elif served != self.version:
+            raise RemoteInferenceError(f"Sidecar scored with model version {served}, expected {self.version}")
+        return np.frombuffer(payload, dtype=WIRE_DTYPE)
+
+    def predict(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.ascontiguousarray(np.atleast_2d(rows), dtype=WIRE_DTYPE)
+        for attempt in range(2):
+            try:
+                sock = self._pool.get_nowait()
+            except queue.Empty:
+                sock = self._connect()
+            try:
+                outputs = self._call(sock, rows)
+            except RemoteInferenceError:
+                self._release(sock)
+                raise
+            except OSError:
+                sock.close()
+                if attempt:
+                    raise
+                logger.warning("Inference sidecar connection failed, retrying on a new connection")
+                continue
+            self._release(sock)
+            return outputs.reshape(-1, 1)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def reference_dataset(size: int = 512, seed: int = 0) -> np.ndarray:
+    """
+    Deterministic reference inputs covering the clinical ranges accepted by the form.
+
+    Returns:
+        np.ndarray: Raw feature rows of shape (size, 11)
+    """
+    rng = np.random.default_rng(seed)
+    columns = [
+        rng.integers(1, 121, size),           # age
+        rng.integers(0, 2, size),             # gender
+        rng.integers(0, 4, size),             # chest_pain
+        rng.integers(80, 221, size),          # bp
+        rng.integers(100, 601, size),         # cholesterol
+        rng.integers(0, 2, size),             # blood_sugar
+        rng.integers(0, 3, size),             # electrocardiographic
+        rng.integers(60, 221, size),          # heart_rate
+        rng.integers(0, 2, size),             # exercise_angina
+        np.round(rng.uniform(0, 10, size), 1),  # oldpeak
+        rng.integers(0, 3, size),             # slope
+    ]
+    return np.column_stack(columns).astype(np.float64)
+
+
+def check_backend_parity(
+    backend_names: Optional[List[str]] = None,
+    scaler=None,
+    rows: Optional[np.ndarray] = None,
+    atol: float = 1e-4
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compare every backend against the Keras reference on the same inputs.
+
+    Args:
+        backend_names: Backends to compare, defaults to all registered
+        scaler: Fitted scaler, loaded from MODELS_DIR if omitted
+        rows: Raw feature rows, defaults to :func:`reference_dataset`
+        atol: Maximum allowed absolute difference in predicted probability
+
+    Returns:
+        Dict[str, Dict[str, float]]: Per-backend max abs difference, verdict
+        mismatches and whether the backend is within tolerance
+    """
+    if scaler is None:
+        import joblib
+        scaler = joblib.load(os.path.join(MODELS_DIR, "scaler_object.joblib"))
+    if rows is None:
+        rows = reference_dataset()
+
+    scaled = scaler.transform(rows)
+    outputs = {}
+    for name in backend_names or sorted(name for name, cls in BACKENDS.items() if not cls.out_of_process):
+        backend = create_backend(name, scaler=scaler)
+        outputs[name] = backend.predict(rows if backend.folds_scaler else scaled).reshape(-1)
+
+    reference = outputs.get("keras")
+    if reference is None:
+        reference = create_backend("keras", scaler=scaler).predict(scaled).reshape(-1)
+
+    report = {}
+    for name, output in outputs.items():
+        max_abs_diff = float(np.max(np.abs(output - reference)))
+        report[name] = {
+            "max_abs_diff": max_abs_diff,
+            "verdict_mismatches": int(np.sum(np.round(output) != np.round(reference))),
+            "ok": max_abs_diff <= atol,
+        }
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inference backend utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export the Keras model to NumPy weights")
+    export_parser.add_argument("--model", default=KERAS_MODEL_PATH)
+    export_parser.add_argument("--output", default=NUMPY_MODEL_PATH)
+
+    parity_parser = subparsers.add_parser("parity", help="Check that all backends agree")
+    parity_parser.add_argument("--backends", nargs="*", default=None)
+    parity_parser.add_argument("--size", type=int, default=512)
+    parity_parser.add_argument("--atol", type=float, default=1e-4)
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        print(export_numpy_model(args.model, args.output))
+        return 0
+
+    report = check_backend_parity(args.backends, rows=reference_dataset(args.size), atol=args.atol)
+    print(json.dumps(report, indent=2))
+    return 0 if all(result["ok"] for result in report.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
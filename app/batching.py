@@ -0,0 +1,190 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.logger import logger
+from .metrics import Counter, Histogram, snapshot_all
+
+# Bucket bounds for the exposed histograms
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_WAIT_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 250]
+
+_STOP = object()
+
+
+class _PendingRequest:
+    """A single row waiting to be scored, together with its result future."""
+
+    __slots__ = ("row", "future", "enqueued_at")
+
+    def __init__(self, row: np.ndarray):
+        self.row = row
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class InferenceBatcher:
+    """
+    Coalesces concurrent single-row scoring requests into batched forward passes.
+
+    Callers submit one feature row at a time from any thread. A background worker
+    thread drains the queue, waiting at most ``max_wait_ms`` after the first row
+    arrives for up to ``max_batch_size`` rows, runs ``batch_fn`` once on the stacked
+    rows, and resolves each caller's future with its own output row.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        name: str = "inference-batcher"
+    ):
+        """
+        Args:
+            batch_fn: Function scoring a 2D array of rows, returning one output per row
+            max_batch_size: Maximum number of rows per forward pass
+            max_wait_ms: Maximum time to hold the first queued row waiting for more
+            name: Name of the worker thread
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.name = name
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.batch_size_histogram = Histogram(
+            "inference_batch_size", BATCH_SIZE_BUCKETS, "Rows per batched forward pass"
+        )
+        self.queue_wait_histogram = Histogram(
+            "inference_queue_wait_ms", QUEUE_WAIT_BUCKETS_MS, "Time a row spent queued before scoring"
+        )
+        self.batches_total = Counter("inference_batches_total", "Batched forward passes executed")
+        self.failed_batches_total = Counter("inference_failed_batches_total", "Batched forward passes that raised")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the background worker thread if it is not already running."""
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            logger.info(
+                "Inference batcher started (max_batch_size=%d, max_wait_ms=%.1f)",
+                self.max_batch_size, self.max_wait * 1000
+            )
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker after it has flushed everything queued before the call."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+            logger.info("Inference batcher stopped")
+
+    def submit(self, row: np.ndarray) -> Future:
+        """
+        Queue a single feature row for scoring.
+
+        Args:
+            row: 1D feature vector
+
+        Returns:
+            Future: Resolves to the model output for this row
+        """
+        if not self.running:
+            raise RuntimeError("Inference batcher is not running")
+        request = _PendingRequest(row)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, row: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """Blocking convenience wrapper around :meth:`submit`."""
+        return self.submit(row).result(timeout)
+
+    def stats(self) -> dict:
+        """Return batch-size and queue-wait histograms plus batch counters."""
+        return snapshot_all(
+            {
+                "batch_size": self.batch_size_histogram,
+                "queue_wait_ms": self.queue_wait_histogram,
+                "batches_total": self.batches_total,
+                "failed_batches_total": self.failed_batches_total,
+            },
+            extra={
+                "running": self.running,
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+        )
+
+    def _collect(self, first: _PendingRequest) -> Tuple[List[_PendingRequest], bool]:
+        """Gather rows for one batch, starting from an already dequeued request."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stopping = self._collect(item)
+            self._process(batch)
+
+        # Flush whatever is still queued so no caller is left waiting
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                self._process([item])
+
+    def _process(self, batch: List[_PendingRequest]) -> None:
+        started = time.monotonic()
+        for request in batch:
+            self.queue_wait_histogram.observe((started - request.enqueued_at) * 1000)
+        self.batch_size_histogram.observe(len(batch))
+        self.batches_total.inc()
+
+        try:
+            outputs = self.batch_fn(np.vstack([request.row for request in batch]))
+        except Exception as e:
+            self.failed_batches_total.inc()
+            logger.error("Batched inference failed for %s rows", len(batch), exc_info=True)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        for request, output in zip(batch, outputs):
+            request.future.set_result(output)
+        logger.debug("Scored batch of %d rows in %.2f ms", len(batch), (time.monotonic() - started) * 1000)
@@ -0,0 +1,305 @@
+import argparse
+import collections
+import struct
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+from app.logger import logger
+from .config import REPORT_COMPRESSION, REPORT_COMPRESSION_LEVEL
+
+try:  # Optional: better ratios and faster decompression than zlib
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Codec tag stored in the first byte of every compressed report
+ZLIB = 0x01
+ZLIB_DICT = 0x02  # followed by the 4-byte dictionary id
+ZSTD = 0x03       # zstd frames carry their own dictionary id
+
+# zlib preset dictionaries are limited to the 32 KiB deflate window
+ZLIB_DICT_MAX_SIZE = 32 * 1024
+
+
+class ReportCompressionError(Exception):
+    pass
+
+
+class _Dictionaries:
+    """Process-wide cache of the compression dictionaries stored in ``report_dictionaries``."""
+
+    def __init__(self):
+        self._by_id: Dict[int, bytes] = {}
+        self._active: Dict[str, Optional[int]] = {}
+        self._lock = threading.Lock()
+
+    def _query(self):
+        # Imported here: the models module depends on this one for the report property
+        from .database import SessionLocal
+        from .models import ReportDictionary
+        return SessionLocal(), ReportDictionary
+
+    def get(self, dictionary_id: int) -> bytes:
+        data = self._by_id.get(dictionary_id)
+        if data is not None:
+            return data
+        db, ReportDictionary = self._query()
+        try:
+            entry = db.get(ReportDictionary, dictionary_id)
+        finally:
+            db.close()
+        if entry is None:
+            raise ReportCompressionError(f"Compression dictionary {dictionary_id} not found")
+        with self._lock:
+            self._by_id[dictionary_id] = entry.data
+        return entry.data
+
+    def active(self, codec: str) -> Optional[int]:
+        """Id of the newest dictionary for a codec, looked up once per process."""
+        if codec in self._active:
+            return self._active[codec]
+        db, ReportDictionary = self._query()
+        try:
+            entry = (
+                db.query(ReportDictionary).filter(ReportDictionary.codec == codec)
+                .order_by(ReportDictionary.id.desc()).first()
+            )
+        except Exception:
+            # e.g. the table does not exist yet; compress without a dictionary
+            logger.warning("Could not load report compression dictionary", exc_info=True)
+            entry = None
+        finally:
+            db.close()
+        with self._lock:
+            self._active[codec] = entry.id if entry is not None else None
+            if entry is not None:
+                self._by_id[entry.id] = entry.data
+        return self._active[codec]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_id.clear()
+            self._active.clear()
+
+
+dictionaries = _Dictionaries()
+
+
+def preload_dictionaries() -> Optional[int]:
+    """
+    Look up the active dictionary of the configured codec ahead of the first request.
+
+    Blocking: call it at startup (through ``run_db`` from async code) so that
+    :func:`compress_report`, which runs on the event loop while a prediction
+    is built, never queries the database.
+
+    Returns:
+        Optional[int]: Id of the active dictionary, or None if none was trained
+    """
+    codec = _codec()
+    if codec == "none":
+        return None
+    return dictionaries.active(codec)
+
+
+def _codec() -> str:
+    if REPORT_COMPRESSION == "zstd" and zstandard is None:
+        logger.warning("REPORT_COMPRESSION=zstd but the zstandard package is not installed; using zlib")
+        return "zlib"
+    return REPORT_COMPRESSION
+
+
+def compress_report(text: str) -> bytes:
+    """
+    Compress a report with the configured codec and, if one was trained, its shared dictionary.
+
+    Args:
+        text: Markdown report
+
+    Returns:
+        bytes: Codec tag followed by the compressed payload
+    """
+    data = text.encode("utf-8")
+    codec = _codec()
+    dictionary_id = dictionaries.active(codec)
+
+    if codec == "zstd":
+        dict_data = zstandard.ZstdCompressionDict(dictionaries.get(dictionary_id)) if dictionary_id else None
+        compressor = zstandard.ZstdCompressor(level=REPORT_COMPRESSION_LEVEL, dict_data=dict_data)
+        return bytes([ZSTD]) + compressor.compress(data)
+
+    if dictionary_id is None:
+        return bytes([ZLIB]) + zlib.compress(data, REPORT_COMPRESSION_LEVEL)
+    compressor = zlib.compressobj(REPORT_COMPRESSION_LEVEL, zdict=dictionaries.get(dictionary_id))
+    return bytes([ZLIB_DICT]) + struct.pack(">I", dictionary_id) + compressor.compress(data) + compressor.flush()
+
+
+def decompress_report(blob: bytes) -> str:
+    """
+    Decompress a report produced by :func:`compress_report` with any codec.
+
+    Raises:
+        ReportCompressionError: For unknown codecs, missing dictionaries or zstd data without zstandard
+    """
+    codec, payload = blob[0], memoryview(blob)[1:]
+    if codec == ZLIB:
+        return zlib.decompress(payload).decode("utf-8")
+    if codec == ZLIB_DICT:
+        (dictionary_id,) = struct.unpack(">I", payload[:4])
+        decompressor = zlib.decompressobj(zdict=dictionaries.get(dictionary_id))
+        return (decompressor.decompress(payload[4:]) + decompressor.flush()).decode("utf-8")
+    if codec == ZSTD:
+        if zstandard is None:
+            raise ReportCompressionError("Report is zstd-compressed but the zstandard package is not installed")
+        dictionary_id = zstandard.get_frame_parameters(payload).dict_id
+        dict_data = zstandard.ZstdCompressionDict(dictionaries.get(dictionary_id)) if dictionary_id else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(payload).decode("utf-8")
+    raise ReportCompressionError(f"Unknown report compression codec {codec}")
+
+
+def build_zlib_dictionary(samples: List[str], size: int = ZLIB_DICT_MAX_SIZE) -> bytes:
+    """
+    Build a zlib preset dictionary from sample reports.
+
+    Lines shared by many reports (headings, boilerplate advice) are packed up
+    to ``size`` bytes, most common last, since deflate favours near matches.
+    """
+    counts = collections.Counter(line for sample in samples for line in set(sample.splitlines(keepends=True)))
+    chosen, total = [], 0
+    for line, count in counts.most_common():
+        encoded = line.encode("utf-8")
+        if count < 2 or total + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        total += len(encoded)
+    return b"".join(reversed(chosen))
+
+
+def train_dictionary(db, codec: Optional[str] = None, samples: int = 2000, size: int = ZLIB_DICT_MAX_SIZE) -> Optional[int]:
+    """
+    Train a shared dictionary on the most recent reports and store it.
+
+    Args:
+        db: Database session
+        codec: ``zlib`` or ``zstd``, defaults to the configured codec
+        samples: Number of recent reports to learn from
+        size: Dictionary size in bytes (zlib is capped at 32 KiB)
+
+    Returns:
+        Optional[int]: Id of the new dictionary, or None if there were too few reports
+    """
+    from .models import Prediction, ReportDictionary
+
+    codec = codec or _codec()
+    reports = [
+        prediction.report for prediction in
+        db.query(Prediction).filter(Prediction.report.isnot(None)).order_by(Prediction.id.desc()).limit(samples)
+    ]
+    if len(reports) < 10:
+        logger.warning("Only %s reports available; not training a dictionary", len(reports))
+        return None
+
+    if codec == "zstd":
+        if zstandard is None:
+            raise ReportCompressionError("Training a zstd dictionary requires the zstandard package")
+        trained = zstandard.train_dictionary(size, [report.encode("utf-8") for report in reports])
+        entry = ReportDictionary(id=trained.dict_id(), codec="zstd", data=trained.as_bytes())
+    else:
+        entry = ReportDictionary(codec="zlib", data=build_zlib_dictionary(reports, min(size, ZLIB_DICT_MAX_SIZE)))
+
+    # zstd dictionary ids come from the trainer; retraining on the same reports yields the same id
+    db.merge(entry)
+    db.commit()
+    dictionaries.clear()
+    dictionary_id = dictionaries.active(codec)
+    logger.info("Trained %s report dictionary %s (%s bytes) on %s reports", codec, dictionary_id, len(entry.data), len(reports))
+    return dictionary_id
+
+
+def migrate_reports(db, chunk_size: int = 500, recompress: bool = False) -> Dict[str, int]:
+    """
+    Compress stored reports in chunks, committing after each chunk.
+
+    Args:
+        db: Database session
+        chunk_size: Rows rewritten per transaction
+        recompress: Also re-encode already compressed reports, e.g. after training a dictionary
+
+    Returns:
+        Dict[str, int]: Rows rewritten and total report bytes before and after
+
+    Raises:
+        ReportCompressionError: If REPORT_COMPRESSION is ``none``, so reports would be stored as plain text
+    """
+    from .models import Prediction
+
+    if REPORT_COMPRESSION == "none":
+        raise ReportCompressionError("REPORT_COMPRESSION is 'none'; set it to 'zlib' or 'zstd' before migrating reports")
+
+    totals = {"rows": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+    while True:
+        query = db.query(Prediction).filter(Prediction.id > last_id)
+        if recompress:
+            query = query.filter(Prediction.report.isnot(None))
+        else:
+            query = query.filter(Prediction.report_text.isnot(None))
+        chunk = query.order_by(Prediction.id).limit(chunk_size).all()
+        if not chunk:
+            break
+
+        for prediction in chunk:
+            totals["bytes_before"] += len(prediction.report_compressed or b"") + len((prediction.report_text or "").encode("utf-8"))
+            # Assigning through the property stores the compressed form and clears the plain text
+            prediction.report = prediction.report
+            totals["bytes_after"] += len(prediction.report_compressed)
+        db.commit()
+
+        totals["rows"] += len(chunk)
+        last_id = chunk[-1].id
+        db.expunge_all()
+        logger.info("Compressed reports up to prediction %s (%s rows so far)", last_id, totals['rows'])
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report compression utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Train a shared compression dictionary on stored reports")
+    train_parser.add_argument("--codec", choices=["zlib", "zstd"], default=None)
+    train_parser.add_argument("--samples", type=int, default=2000)
+    train_parser.add_argument("--size", type=int, default=ZLIB_DICT_MAX_SIZE)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Compress stored reports in chunks")
+    migrate_parser.add_argument("--chunk-size", type=int, default=500)
+    migrate_parser.add_argument("--recompress", action="store_true", help="Also re-encode compressed reports")
+    migrate_parser.add_argument("--vacuum", action="store_true", help="Run VACUUM afterwards to shrink a SQLite file")
+
+    args = parser.parse_args(argv)
+
+    from sqlalchemy import text
+    from .database import SessionLocal, engine
+    from .migrations import upgrade
+
+    upgrade(engine)
+    db = SessionLocal()
+    try:
+        if args.command == "train":
+            print(train_dictionary(db, args.codec, args.samples, args.size))
+            return 0
+        print(migrate_reports(db, args.chunk_size, args.recompress))
+    except ReportCompressionError as e:
+        parser.error(str(e))
+    finally:
+        db.close()
+
+    if args.vacuum and engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            connection.execute(text("VACUUM"))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
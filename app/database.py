@@ -1,19 +1,104 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
+import functools
+from typing import Any, Callable
+
+import anyio.to_thread
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-import datetime
+from sqlalchemy.orm import sessionmaker
+from .profiler import tag_thread
+from .config import (
+    DATABASE_URL, DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW, DATABASE_POOL_TIMEOUT,
+    DATABASE_POOL_RECYCLE, DATABASE_POOL_PRE_PING, DATABASE_THREADS, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE
+)
+
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL, **engine_kwargs: Any):
+    """
+    Create the SQLAlchemy engine for a database URL.
+
+    SQLite connections get the journal, sync and cache PRAGMAs from the config;
+    other databases get a sized connection pool with pre-ping so connections
+    dropped by the server or a proxy are replaced transparently. The pool size
+    settings only apply to a QueuePool: in-memory SQLite databases (and an
+    explicit ``poolclass=StaticPool``) keep their single shared connection.
+
+    Args:
+        url: Database URL
+        **engine_kwargs: Extra create_engine arguments, e.g. ``poolclass``
+    """
+    parsed = make_url(url)
+    poolclass = engine_kwargs.get("poolclass") or parsed.get_dialect().get_pool_class(parsed)
+    if issubclass(poolclass, QueuePool):
+        engine_kwargs = {
+            "pool_size": DATABASE_POOL_SIZE,
+            "max_overflow": DATABASE_MAX_OVERFLOW,
+            "pool_timeout": DATABASE_POOL_TIMEOUT,
+            **engine_kwargs
+        }
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./heart_disease_prediction.db"
+    if parsed.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_recycle=DATABASE_POOL_RECYCLE,
+            pool_pre_ping=DATABASE_POOL_PRE_PING,
+            **engine_kwargs
+        )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    sqlite_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        **engine_kwargs
+    )
+
+    @event.listens_for(sqlite_engine, "connect")
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            # A negative cache_size is in KiB rather than pages
+            cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        finally:
+            cursor.close()
+
+    return sqlite_engine
+
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-# Dependency
-def get_db():
+# Caps blocking database calls made from async code. It is separate from the default
+# threadpool so slow queries or lock waits cannot starve other offloaded work.
+db_limiter = anyio.CapacityLimiter(DATABASE_THREADS)
+
+async def run_db(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run blocking database work in a worker thread without stalling the event loop.
+    
+    Cancellation waits for the call to return, so a session is never used by
+    two threads at once.
+    
+    Args:
+        fn: Function performing the database work, usually taking a Session
+        *args: Positional arguments for fn
+        **kwargs: Keyword arguments for fn
+    
+    Returns:
+        Any: Whatever fn returns
+    """
+    return await anyio.to_thread.run_sync(tag_thread(functools.partial(fn, *args, **kwargs)), limiter=db_limiter)
+
+# Dependency; CLI tools and background threads use SessionLocal directly
+async def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        await run_db(db.close)
@@ -0,0 +1,195 @@
+"""
+Out-of-process inference sidecar.
+
+One sidecar process per host loads the scaler and model (and with the keras
+backend, TensorFlow) once and scores rows for every web worker over a Unix
+domain socket, using the float32 framing defined in :mod:`app.backends`. Web
+workers run with ``INFERENCE_BACKEND=remote`` and stay free of TensorFlow.
+
+Requests name the model registry version to score with, so a hot swap in the
+web workers switches the sidecar too: it loads a version on first use and keeps
+the most recently used ones loaded while workers move over.
+
+Run ``python -m app.inference_server`` before starting the web workers.
+"""
+import argparse
+import collections
+import os
+import signal
+import socketserver
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.logger import logger
+from .backends import (
+    REQUEST_HEADER, RESPONSE_HEADER, STATUS_OK, STATUS_ERROR, WIRE_DTYPE, recv_exactly
+)
+from .config import INFERENCE_SOCKET_PATH, INFERENCE_SIDECAR_BACKEND, INFERENCE_SIDECAR_MAX_VERSIONS, MODEL_VERSION
+from .model_registry import resolve_version
+
+# Largest request accepted, in feature values; bigger frames close the connection
+MAX_REQUEST_VALUES = 1 << 22
+
+
+class InferenceRequestHandler(socketserver.BaseRequestHandler):
+    """Serves requests from one client connection until the client disconnects."""
+
+    def handle(self):
+        sock = self.request
+        while True:
+            try:
+                header = recv_exactly(sock, REQUEST_HEADER.size)
+            except ConnectionError:
+                return
+            rows, columns, version_length = REQUEST_HEADER.unpack(header)
+            if rows * columns > MAX_REQUEST_VALUES:
+                self._send_error(f"Request of {rows}x{columns} values exceeds the limit of {MAX_REQUEST_VALUES}")
+                return
+            version = recv_exactly(sock, version_length).decode("utf-8") or None
+            features = np.frombuffer(
+                recv_exactly(sock, rows * columns * WIRE_DTYPE.itemsize), dtype=WIRE_DTYPE
+            ).reshape(rows, columns)
+
+            try:
+                version, outputs = self.server.score(features, version)
+            except Exception as e:
+                logger.error("Sidecar scoring failed", exc_info=True)
+                self._send_error(str(e) or type(e).__name__)
+                continue
+            encoded = version.encode("utf-8")
+            sock.sendall(RESPONSE_HEADER.pack(STATUS_OK, outputs.shape[0], len(encoded)) + encoded + outputs.tobytes())
+
+    def _send_error(self, message: str) -> None:
+        encoded = message.encode("utf-8")
+        self.request.sendall(RESPONSE_HEADER.pack(STATUS_ERROR, len(encoded), 0) + encoded)
+
+
+class InferenceServer(socketserver.ThreadingUnixStreamServer):
+    """Unix socket server owning the shared DataPreprocessor and ML_Model_Predictor of each loaded version."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str = INFERENCE_SOCKET_PATH,
+        backend_name: str = INFERENCE_SIDECAR_BACKEND,
+        version: str = MODEL_VERSION,
+        max_versions: int = INFERENCE_SIDECAR_MAX_VERSIONS
+    ):
+        """
+        Args:
+            socket_path: Path of the Unix socket to listen on; a stale socket file is replaced
+            backend_name: Local backend serving the model (keras, numpy or tflite)
+            version: Model registry version served to requests that do not name one
+            max_versions: Loaded versions kept; the least recently used is released beyond that
+
+        Raises:
+            ValueError: If ``backend_name`` is ``remote``
+        """
+        if backend_name == "remote":
+            raise ValueError("The inference sidecar needs a local backend, not 'remote'")
+        self.backend_name = backend_name
+        self.max_versions = max(max_versions, 1)
+        self._models: "collections.OrderedDict[str, Tuple]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes loading, so other versions keep being scored while one loads
+        self._load_lock = threading.Lock()
+
+        self.version, _ = resolve_version(version)
+        self.score(np.empty((0, 0), dtype=WIRE_DTYPE))
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.socket_path = socket_path
+        super().__init__(socket_path, InferenceRequestHandler)
+
+    def _models_for(self, version: str) -> Tuple:
+        """The (preprocessor, predictor) of a version, loading and warming it up on first use."""
+        with self._lock:
+            models = self._models.get(version)
+            if models is not None:
+                self._models.move_to_end(version)
+                return models
+
+        with self._load_lock:
+            with self._lock:
+                models = self._models.get(version)
+            if models is not None:
+                return models
+            # Imported here so that only the sidecar pays for loading the model stack
+            from .prediction import DataPreprocessor, ML_Model_Predictor
+
+            version, models_dir = resolve_version(version)
+            preprocessor = DataPreprocessor(models_dir)
+            predictor = ML_Model_Predictor(
+                scaler=preprocessor.scaler, backend_name=self.backend_name, models_dir=models_dir, version=version
+            )
+            models = (preprocessor, predictor)
+            self._score_with(models, np.asarray(preprocessor.scaler.mean_, dtype=WIRE_DTYPE).reshape(1, -1))
+            with self._lock:
+                self._models[version] = models
+                while len(self._models) > self.max_versions:
+                    released, _ = self._models.popitem(last=False)
+                    logger.info("Inference sidecar released model version %s", released)
+            logger.info("Inference sidecar loaded model version %s", version)
+            return models
+
+    @staticmethod
+    def _score_with(models: Tuple, rows: np.ndarray) -> np.ndarray:
+        preprocessor, predictor = models
+        if not predictor.expects_raw_features:
+            rows = preprocessor.preprocess_batch(rows)
+        return np.ascontiguousarray(predictor.predict_batch(rows), dtype=WIRE_DTYPE).reshape(-1)
+
+    def score(self, rows: np.ndarray, version: Optional[str] = None) -> Tuple[str, np.ndarray]:
+        """
+        Scale (unless the backend folds the scaler) and score raw rows with a model version.
+
+        Args:
+            rows: Raw feature rows; without rows the version is only loaded
+            version: Concrete registry version, or None for the default version
+
+        Returns:
+            Tuple[str, np.ndarray]: The version that scored the rows and their float32 probabilities
+
+        Raises:
+            ModelVersionNotFound: If the version does not exist in the sidecar's registry
+        """
+        version = version or self.version
+        models = self._models_for(version)
+        if rows.shape[0] == 0:
+            return version, np.empty(0, dtype=WIRE_DTYPE)
+        return version, self._score_with(models, rows)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Shared inference sidecar for the web workers")
+    parser.add_argument("--socket", default=INFERENCE_SOCKET_PATH, help="Unix socket path to listen on")
+    parser.add_argument("--backend", default=INFERENCE_SIDECAR_BACKEND, help="Backend serving the model")
+    parser.add_argument("--model-version", default=MODEL_VERSION, help="Model registry version served by default")
+    args = parser.parse_args(argv)
+
+    server = InferenceServer(args.socket, args.backend, args.model_version)
+    # shutdown() waits for serve_forever to return, so call it from another thread
+    stop = lambda *_: threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info("Inference sidecar serving model version %s by default with the '%s' backend on %s", server.version, args.backend, args.socket)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        logger.info("Inference sidecar stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
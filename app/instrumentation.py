@@ -0,0 +1,114 @@
+import functools
+import inspect
+import threading
+from typing import Callable, Dict
+
+from .metrics import Counter, Gauge, Histogram
+
+# Seconds; covers sub-millisecond scaler calls up to multi-second LLM reports
+STAGE_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+# Pipeline stages timed on the hot path:
+#   parse       decoding the clinical_data form field
+#   preprocess  scaler transform, once per forward pass (batched when micro-batching is on)
+#   predict     model forward pass, once per forward pass
+#   score       preprocess + predict for one request, including the micro-batching queue wait
+#   llm         one Gemini call (generate, async or streamed)
+#   db_write    storing one prediction, including the write-behind wait
+STAGES = ("parse", "preprocess", "predict", "score", "llm", "db_write")
+
+stage_histograms: Dict[str, Histogram] = {
+    stage: Histogram(
+        "prediction_stage_duration_seconds", STAGE_BUCKETS,
+        "Time spent in each stage of the prediction pipeline", labels={"stage": stage}
+    )
+    for stage in STAGES
+}
+
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+
+_error_counters: Dict[str, Counter] = {}
+_in_flight_gauges: Dict[str, Gauge] = {}
+_lock = threading.Lock()
+
+
+def observe_stage(stage: str):
+    """Context manager timing one pipeline stage, e.g. ``with observe_stage("parse"):``."""
+    return stage_histograms[stage].time()
+
+
+def count_error(error_type: str) -> None:
+    """Count one pipeline error by exception type name."""
+    counter = _error_counters.get(error_type)
+    if counter is None:
+        with _lock:
+            counter = _error_counters.setdefault(error_type, Counter(
+                "prediction_errors_total", "Prediction pipeline errors by exception type", labels={"type": error_type}
+            ))
+    counter.inc()
+
+
+def track_in_flight(mode: str) -> Callable:
+    """
+    Decorator counting running calls in the ``predictions_in_flight`` gauge.
+
+    Works on plain and async functions as well as sync and async generators,
+    which count as in flight until exhausted or closed.
+    """
+    with _lock:
+        gauge = _in_flight_gauges.setdefault(mode, Gauge(
+            "predictions_in_flight", "Predictions currently being processed", labels={"mode": mode}
+        ))
+
+    def decorator(fn: Callable) -> Callable:
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def async_generator_wrapper(*args, **kwargs):
+                gauge.inc()
+                generator = fn(*args, **kwargs)
+                try:
+                    async for item in generator:
+                        yield item
+                finally:
+                    await generator.aclose()
+                    gauge.dec()
+            return async_generator_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def coroutine_wrapper(*args, **kwargs):
+                with gauge.track_inprogress():
+                    return await fn(*args, **kwargs)
+            return coroutine_wrapper
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                with gauge.track_inprogress():
+                    return (yield from fn(*args, **kwargs))
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with gauge.track_inprogress():
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+class InFlightMiddleware:
+    """ASGI middleware keeping ``http_requests_in_flight`` up to date (streamed bodies count until sent)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            http_requests_in_flight.dec()
@@ -0,0 +1,275 @@
+import asyncio
+import datetime
+import random
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, func, or_
+
+from app.logger import logger
+from .config import (
+    REPORT_JOB_WORKERS, REPORT_JOB_MAX_ATTEMPTS, REPORT_JOB_BACKOFF_SECONDS,
+    REPORT_JOB_BACKOFF_MAX_SECONDS, REPORT_JOB_POLL_SECONDS, REPORT_JOB_LEASE_SECONDS
+)
+from .database import SessionLocal, run_db
+from .metrics import Counter, snapshot_all
+from .models import Prediction, ReportJob
+from .profiler import run_in_threadpool
+from .prediction import agenerate_report, get_models, report_source
+
+
+class ReportJobQueue:
+    """
+    Worker pool generating reports from the durable ``report_jobs`` table.
+
+    Jobs are claimed with a conditional UPDATE so several workers (and several
+    processes sharing the database) never run the same job twice. Failed jobs
+    are retried with exponential backoff and jitter; running jobs whose lease
+    expired, e.g. because the process died, are picked up again.
+    """
+
+    def __init__(
+        self,
+        workers: int = REPORT_JOB_WORKERS,
+        max_attempts: int = REPORT_JOB_MAX_ATTEMPTS,
+        backoff_seconds: float = REPORT_JOB_BACKOFF_SECONDS,
+        backoff_max_seconds: float = REPORT_JOB_BACKOFF_MAX_SECONDS,
+        poll_seconds: float = REPORT_JOB_POLL_SECONDS,
+        lease_seconds: float = REPORT_JOB_LEASE_SECONDS
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._completed: Optional[asyncio.Condition] = None
+
+        self.completed_total = Counter("report_jobs_completed_total", "Report jobs that produced a report")
+        self.retried_total = Counter("report_jobs_retried_total", "Report job attempts that failed and were rescheduled")
+        self.failed_total = Counter("report_jobs_failed_total", "Report jobs that exhausted their attempts")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._completed = asyncio.Condition()
+        self._tasks = [
+            asyncio.create_task(self._worker(index), name=f"report-job-worker-{index}")
+            for index in range(self.workers)
+        ]
+        logger.info("Report job queue started with %s workers", self.workers)
+
+    async def stop(self) -> None:
+        """Cancel the workers. Interrupted jobs are reclaimed once their lease expires."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if tasks:
+            logger.info("Report job queue stopped")
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was enqueued. Safe to call from any thread."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_seconds * (2 ** max(attempts - 1, 0)), self.backoff_max_seconds)
+        return delay * random.uniform(0.5, 1.0)
+
+    # Blocking database operations, run with run_db
+    def _claim_next(self) -> Optional[int]:
+        db = SessionLocal()
+        try:
+            now = datetime.datetime.utcnow()
+            claimable = or_(
+                and_(ReportJob.status == "queued", ReportJob.next_run_at <= now),
+                and_(ReportJob.status == "running", ReportJob.lease_until < now),
+            )
+            for job_id, status in (
+                db.query(ReportJob.id, ReportJob.status).filter(claimable)
+                .order_by(ReportJob.next_run_at).limit(self.workers).all()
+            ):
+                claimed = db.query(ReportJob).filter(ReportJob.id == job_id, ReportJob.status == status, claimable).update(
+                    {
+                        ReportJob.status: "running",
+                        ReportJob.attempts: ReportJob.attempts + 1,
+                        ReportJob.lease_until: now + datetime.timedelta(seconds=self.lease_seconds),
+                        ReportJob.updated_at: now,
+                    },
+                    synchronize_session=False
+                )
+                db.commit()
+                if claimed:
+                    return job_id
+            return None
+        except Exception:
+            logger.error("Failed to claim report job", exc_info=True)
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def _load(self, job_id: int) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            job = db.get(ReportJob, job_id)
+            if job is None or job.prediction is None:
+                return None
+            prediction = job.prediction
+            return {
+                "attempts": job.attempts,
+                "clinical_data": prediction.clinical_features,
+                "ml_result": 1 if prediction.clinical_model_result else 0,
+                "language": prediction.language,
+            }
+        finally:
+            db.close()
+
+    def _complete(self, job_id: int, report: str) -> None:
+        db = SessionLocal()
+        try:
+            job = db.get(ReportJob, job_id)
+            job.status = "done"
+            job.lease_until = None
+            job.last_error = None
+            job.updated_at = datetime.datetime.utcnow()
+            job.prediction.report = report
+            job.prediction.report_status = "ready"
+            job.prediction.report_source = report_source()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _fail(self, job_id: int, attempts: int, error: str) -> bool:
+        """Record a failed attempt; returns True if the job will be retried."""
+        db = SessionLocal()
+        try:
+            job = db.get(ReportJob, job_id)
+            now = datetime.datetime.utcnow()
+            job.last_error = error
+            job.lease_until = None
+            job.updated_at = now
+            retry = attempts < self.max_attempts
+            if retry:
+                job.status = "queued"
+                job.next_run_at = now + datetime.timedelta(seconds=self._backoff(attempts))
+            else:
+                job.status = "failed"
+                # A fallback template report stays in place when its replacement fails
+                if job.prediction.report is None:
+                    job.prediction.report_status = "failed"
+            db.commit()
+            return retry
+        except Exception:
+            logger.error("Failed to record report job failure", exc_info=True)
+            db.rollback()
+            return True
+        finally:
+            db.close()
+
+    async def _notify_completed(self) -> None:
+        async with self._completed:
+            self._completed.notify_all()
+
+    async def _run_job(self, job_id: int) -> None:
+        job = await run_db(self._load, job_id)
+        if job is None:
+            return
+
+        try:
+            _, _, llm = await run_in_threadpool(get_models)
+            report = await agenerate_report(llm, job["clinical_data"], job["ml_result"], job["language"])
+            await run_db(self._complete, job_id, report)
+            self.completed_total.inc()
+            logger.info("Report job %s completed on attempt %s", job_id, job["attempts"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if await run_db(self._fail, job_id, job["attempts"], str(e)):
+                self.retried_total.inc()
+                logger.warning("Report job %s attempt %s failed, will retry: %s", job_id, job['attempts'], e)
+            else:
+                self.failed_total.inc()
+                logger.error("Report job %s failed after %s attempts: %s", job_id, job['attempts'], e)
+        await self._notify_completed()
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            try:
+                job_id = await run_db(self._claim_next)
+                if job_id is not None:
+                    await self._run_job(job_id)
+                    continue
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.error("Report job worker %s crashed; restarting loop", index, exc_info=True)
+                await asyncio.sleep(self.poll_seconds)
+
+    async def wait_for_report(self, prediction_id: int, timeout: float) -> None:
+        """
+        Wait until a prediction's report is no longer pending, or the timeout passes.
+
+        Wakes on local job completions and re-checks the database every poll
+        interval, so jobs finished by other processes are noticed as well.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        def is_pending() -> bool:
+            db = SessionLocal()
+            try:
+                status = db.query(Prediction.report_status).filter(Prediction.id == prediction_id).scalar()
+                return status == "pending"
+            finally:
+                db.close()
+
+        while await run_db(is_pending):
+            remaining = deadline - loop.time()
+            if remaining <= 0 or self._completed is None:
+                return
+            async with self._completed:
+                try:
+                    await asyncio.wait_for(self._completed.wait(), min(remaining, self.poll_seconds))
+                except asyncio.TimeoutError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Job counters plus queue depth by status."""
+        db = SessionLocal()
+        try:
+            depth = dict(db.query(ReportJob.status, func.count(ReportJob.id)).group_by(ReportJob.status).all())
+        finally:
+            db.close()
+        return snapshot_all(
+            {
+                "completed_total": self.completed_total,
+                "retried_total": self.retried_total,
+                "failed_total": self.failed_total,
+            },
+            extra={"running": self.running, "workers": self.workers, "jobs_by_status": depth}
+        )
+
+
+# Shared job queue, started by the application lifespan
+report_jobs = ReportJobQueue()
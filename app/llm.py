@@ -1,9 +1,40 @@
-import google.generativeai as genai
-from .config import GEMINI_API_KEY, GEMINI_MODEL_NAME
+import asyncio
+from typing import AsyncIterator, Optional
+from .config import GEMINI_API_KEY, GEMINI_MODEL_NAME, GEMINI_API_ENDPOINT, LLM_MAX_CONCURRENCY, LLM_TIMEOUT_SECONDS
 from app.logger import logger
+from .instrumentation import observe_stage
+from .profiler import iterate_in_threadpool, run_in_threadpool
 
-# Configure Gemini API with key from config
-genai.configure(api_key=GEMINI_API_KEY)
+class LLMTimeoutError(Exception):
+    pass
+
+class _FenceStripper:
+    """Removes markdown code fences from streamed text, even when split across chunks."""
+
+    FENCES = ("```markdown", "```")
+
+    def __init__(self):
+        self._carry = ""
+
+    def _strip(self, text: str) -> str:
+        for fence in self.FENCES:
+            text = text.replace(fence, "")
+        return text
+
+    def feed(self, text: str) -> str:
+        text = self._carry + text
+        # Hold back a trailing partial fence until the next chunk decides it
+        cut = len(text)
+        for start in range(max(0, len(text) - len(self.FENCES[0]) + 1), len(text)):
+            if self.FENCES[0].startswith(text[start:]):
+                cut = start
+                break
+        self._carry = text[cut:]
+        return self._strip(text[:cut])
+
+    def flush(self) -> str:
+        text, self._carry = self._strip(self._carry), ""
+        return text
 
 class LLM:
     """Handles interaction with Google's Gemini LLM for report generation."""
@@ -11,7 +42,24 @@ class LLM:
     def __init__(self):
         """Initialize the LLM model."""
         try:
+            # Imported lazily: the SDK is heavy and only needed once a model is built
+            import google.generativeai as genai
+
+            # Configure Gemini API with key from config
+            if GEMINI_API_ENDPOINT:
+                genai.configure(
+                    api_key=GEMINI_API_KEY or "local",
+                    transport="rest",
+                    client_options={"api_endpoint": GEMINI_API_ENDPOINT}
+                )
+                logger.info("Using Gemini API endpoint %s", GEMINI_API_ENDPOINT)
+            else:
+                genai.configure(api_key=GEMINI_API_KEY)
+            # The SDK has no async REST client, so REST calls run in the threadpool instead
+            self._threaded = bool(GEMINI_API_ENDPOINT)
             self.model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+            # Bounds in-flight async calls; created on first use inside the event loop
+            self._semaphore: Optional[asyncio.Semaphore] = None
             logger.info("Gemini LLM model initialized successfully")
         except Exception as e:
             logger.error("Failed to initialize LLM model", exc_info=True)
@@ -101,6 +149,29 @@ Format each section clearly with headers and subheaders for easy reading. Use bu
 
         return prompt
 
+    def _build_prompt(self, result: str, language: str) -> list:
+        """Wrap the templated prompt in the Gemini chat message format."""
+        return [{'role': 'user', 'parts': [self.prompt_template(result, language)]}]
+
+    async def _generate_async(self, prompt: list, stream: bool = False):
+        """Call Gemini without blocking the event loop; streamed responses are async-iterable."""
+        if not self._threaded:
+            return await self.model.generate_content_async(prompt, stream=stream)
+        response = await run_in_threadpool(self.model.generate_content, prompt, stream=stream)
+        return iterate_in_threadpool(iter(response)) if stream else response
+
+    @staticmethod
+    def _clean_response(response) -> str:
+        """Extract the report text from a Gemini response, stripping markdown fences."""
+        if response.text:
+            llm_response = response.text
+            llm_response = llm_response.replace("```markdown", "").replace("```", "")
+            logger.info("Successfully generated LLM report")
+            return llm_response
+        else:
+            logger.error("LLM returned empty response")
+            raise Exception("LLM response is empty")
+
     def inference(self, result: str, language: str) -> str:
         """
         Generate a report using the LLM model.
@@ -110,24 +181,119 @@ Format each section clearly with headers and subheaders for easy reading. Use bu
             language: Target language for the report
         """
         try:
-            # Generate prompt using template
-            refined_prompt = self.prompt_template(result, language)
-    
-            prompt = [{'role': 'user', 'parts': [refined_prompt]}]
+            prompt = self._build_prompt(result, language)
             
             # Generate response
             logger.info("Sending request to Gemini LLM")
-            response = self.model.generate_content(prompt)
-            
-            if response.text:
-                llm_response = response.text
-                llm_response = llm_response.replace("```markdown", "").replace("```", "")
-                logger.info("Successfully generated LLM report")
-                return llm_response
-            else:
+            with observe_stage("llm"):
+                response = self.model.generate_content(prompt)
+            return self._clean_response(response)
+
+        except Exception as e:
+            logger.error("Error during LLM inference", exc_info=True)
+            raise Exception(f"Error during LLM inference: {str(e)}")
+
+    async def ainference(self, result: str, language: str, timeout: Optional[float] = LLM_TIMEOUT_SECONDS) -> str:
+        """
+        Generate a report without blocking the event loop.
+
+        At most ``LLM_MAX_CONCURRENCY`` calls are in flight at once; the deadline
+        covers both waiting for a slot and the Gemini call itself. Cancelling the
+        awaiting task (e.g. on client disconnect) cancels the underlying request.
+
+        Args:
+            result: Analysis results and clinical data
+            language: Target language for the report
+            timeout: Deadline in seconds, or None to wait indefinitely
+
+        Raises:
+            LLMTimeoutError: If no report was produced before the deadline
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+        async def generate() -> str:
+            async with self._semaphore:
+                logger.info("Sending async request to Gemini LLM")
+                with observe_stage("llm"):
+                    response = await self._generate_async(self._build_prompt(result, language))
+                return self._clean_response(response)
+
+        try:
+            return await asyncio.wait_for(generate(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("LLM inference exceeded the %ss deadline", timeout)
+            raise LLMTimeoutError(f"LLM inference timed out after {timeout} seconds")
+        except asyncio.CancelledError:
+            logger.warning("LLM inference cancelled")
+            raise
+        except Exception as e:
+            logger.error("Error during LLM inference", exc_info=True)
+            raise Exception(f"Error during LLM inference: {str(e)}")
+
+    async def astream_inference(
+        self,
+        result: str,
+        language: str,
+        timeout: Optional[float] = LLM_TIMEOUT_SECONDS
+    ) -> AsyncIterator[str]:
+        """
+        Stream report text chunks as Gemini generates them.
+
+        Shares the concurrency limit of :meth:`ainference`; the deadline applies
+        to the whole stream. Closing the iterator cancels the request.
+
+        Raises:
+            LLMTimeoutError: If the stream did not finish before the deadline
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(deadline - loop.time(), 0)
+
+        stripper = _FenceStripper()
+        received = False
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), remaining())
+            try:
+                logger.info("Sending streaming request to Gemini LLM")
+                # Timed from the request until the last chunk arrives
+                with observe_stage("llm"):
+                    response = await asyncio.wait_for(
+                        self._generate_async(self._build_prompt(result, language), stream=True),
+                        remaining()
+                    )
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), remaining())
+                        except StopAsyncIteration:
+                            break
+                        text = stripper.feed(chunk.text or "")
+                        if text:
+                            received = True
+                            yield text
+            finally:
+                self._semaphore.release()
+
+            tail = stripper.flush()
+            if tail:
+                received = True
+                yield tail
+            if not received:
                 logger.error("LLM returned empty response")
                 raise Exception("LLM response is empty")
+            logger.info("Successfully streamed LLM report")
 
+        except asyncio.TimeoutError:
+            logger.error("LLM streaming exceeded the %ss deadline", timeout)
+            raise LLMTimeoutError(f"LLM inference timed out after {timeout} seconds")
+        except (asyncio.CancelledError, GeneratorExit, LLMTimeoutError):
+            raise
         except Exception as e:
-            logger.error("Error during LLM inference", exc_info=True)
+            logger.error("Error during LLM streaming inference", exc_info=True)
             raise Exception(f"Error during LLM inference: {str(e)}")
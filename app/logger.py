@@ -1,8 +1,20 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from datetime import datetime
-from app.config import BASE_DIR
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from app.config import (
+    BASE_DIR, LOG_LEVEL, LOG_FORMAT, LOG_ASYNC, LOG_QUEUE_SIZE,
+    LOG_RATE_LIMIT_PER_SECOND, LOG_SAMPLE_RATES, LOG_PHI
+)
+from app.metrics import Counter
 
 # Define base directory and create logs directory
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
@@ -12,14 +24,162 @@ os.makedirs(LOG_DIR, exist_ok=True)
 log_file = os.path.join(LOG_DIR, f'app_{datetime.now().strftime("%Y%m%d")}.log')
 error_log_file = os.path.join(LOG_DIR, f'error_{datetime.now().strftime("%Y%m%d")}.log')
 
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra`` fields of the record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """
+    Pass at most ``per_second`` records below WARNING per call site each second.
+
+    The next record let through from a throttled call site carries the number
+    of records dropped in between as its ``suppressed`` attribute.
+    """
+
+    def __init__(self, per_second: float):
+        super().__init__()
+        self.per_second = per_second
+        self._sites: Dict[tuple, List[float]] = {}  # call site -> [window start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.per_second <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._sites.get(key)
+            if window is None or now - window[0] >= 1.0:
+                suppressed = int(window[2]) if window else 0
+                self._sites[key] = [now, 1, 0]
+            elif window[1] < self.per_second:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep a random fraction of the records below WARNING from selected loggers (and their children)."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first, so "a.b=1" overrides "a=0.1"
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for name, rate in self.rates:
+            if record.name == name or record.name.startswith(name + "."):
+                return random.random() < rate
+        return True
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse ``httpx=0.1,uvicorn.access=0.01`` into sampling fractions."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    Records are queued with their arguments unmerged, so callers only pay for
+    building the record; don't pass objects that are mutated after logging.
+    When the queue is full, records below WARNING are dropped and counted
+    rather than blocking the request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = Counter("log_records_dropped_total", "Records dropped because the log queue was full")
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record)
+            else:
+                self.dropped.inc()
+
+class FanoutHandler(logging.Handler):
+    """Synchronous stand-in for the queue listener: hands each record to every handler at its level."""
+
+    def __init__(self, handlers: List[logging.Handler]):
+        super().__init__()
+        self.handlers = handlers
+
+    def emit(self, record: logging.LogRecord) -> None:
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+class _RedactedPHI:
+    """Placeholder logged instead of a clinical payload; rendering it costs nothing."""
+
+    __slots__ = ("size",)
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def __str__(self) -> str:
+        return f"<redacted: {self.size} fields>"
+
+    __repr__ = __str__
+
+def redact_phi(value: Any) -> Any:
+    """
+    Wrap a clinical payload for logging.
+
+    Returns:
+        Any: The value itself when LOG_PHI is on, otherwise a placeholder that only reveals its size
+    """
+    if LOG_PHI:
+        return value
+    return _RedactedPHI(len(value) if hasattr(value, "__len__") else 1)
+
 # Define log formatters
-standard_formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s'
-)
-error_formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s\n'
-    'Exception:\n%(exc_info)s\n'
-)
+if LOG_FORMAT == "json":
+    standard_formatter = error_formatter = JsonFormatter()
+else:
+    standard_formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s'
+    )
+    error_formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s\n'
+        'Exception:\n%(exc_info)s\n'
+    )
 
 # Create and configure handlers
 file_handler = RotatingFileHandler(
@@ -42,13 +202,29 @@ console_handler = logging.StreamHandler()
 console_handler.setLevel(logging.INFO)
 console_handler.setFormatter(standard_formatter)
 
+output_handlers = [file_handler, error_file_handler, console_handler]
+
+# Requests only enqueue records; a listener thread formats them and writes to disk
+if LOG_ASYNC:
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    front_handler: logging.Handler = AsyncQueueHandler(log_queue)
+    log_listener = QueueListener(log_queue, *output_handlers, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+else:
+    front_handler = FanoutHandler(output_handlers)
+
+# Volume control runs before queueing, so dropped records cost almost nothing
+if LOG_RATE_LIMIT_PER_SECOND > 0:
+    front_handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT_PER_SECOND))
+if LOG_SAMPLE_RATES:
+    front_handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+
 # Configure root logger
-logging.basicConfig(level=logging.INFO, handlers=[])
+logging.basicConfig(level=LOG_LEVEL, handlers=[])
 root_logger = logging.getLogger()
-root_logger.addHandler(file_handler)
-root_logger.addHandler(error_file_handler)
-root_logger.addHandler(console_handler)
+root_logger.addHandler(front_handler)
 
 # Create application logger
 logger = logging.getLogger('heart_disease_prediction_app')
-logger.setLevel(logging.INFO) 
\ No newline at end of file
+logger.setLevel(LOG_LEVEL)
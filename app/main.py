@@ -1,42 +1,85 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends, HTTPException, status, Form, Request
+import anyio
+from fastapi import FastAPI, Depends, HTTPException, status, Form, Request, Query
+from fastapi.exceptions import RequestValidationError
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 import json
-from fastapi.responses import RedirectResponse
-from jose import jwt
+from fastapi.responses import RedirectResponse, StreamingResponse, JSONResponse, Response, PlainTextResponse
+from typing import Optional
 
-from .database import engine, get_db, Base, SessionLocal
+from .database import get_db, run_db, SessionLocal
+from .migrations import upgrade as upgrade_schema
+from .compression import preload_dictionaries
 from .models import User
 from .auth import (
-    authenticate_user, create_access_token, get_current_user,
-    create_user, UserCreate, Token, ACCESS_TOKEN_EXPIRE_MINUTES, get_user
+    aauthenticate_user, aget_password_hash, create_access_token, get_current_user, get_page_user, get_admin_user,
+    create_user, get_user, get_user_by_email, CurrentUser, UserCreate, Token, ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from .prediction import (
-    make_prediction, get_user_predictions,
-    initialize_models, clear_models
+    make_prediction_async, make_prediction_deferred, stream_prediction,
+    get_user_predictions_page, iter_user_predictions, get_user_prediction, get_user_prediction_report,
+    initialize_models, clear_models, get_batcher_stats,
+    activate_model_version, get_model_status, start_model_watcher,
+    warm_up_models, start_background_initialization, get_readiness,
+    make_batch_predictions, PipelineError, PredictionError, ModelLoadingError, pipeline_error_type
 )
+from .report_cache import get_report_cache_stats
+from .score_cache import get_score_cache_stats
+from .jobs import report_jobs
+from .write_behind import prediction_writer, get_write_behind_stats
+from .instrumentation import InFlightMiddleware, count_error, observe_stage
+from .schemas import ClinicalFeatures, PredictionRequest, PredictionPage, PredictionSummary, PredictionSummaryList
+from .metrics import registry
+from .model_registry import ModelVersionNotFound
+from .profiler import (
+    ProfileRequestMiddleware, ProfilerBusyError, SamplingProfiler, capture, index_routes, request_profiles,
+    iterate_in_threadpool, run_in_threadpool
+)
+from .utils import parse_clinical_csv, run_until_disconnected, ClientDisconnected
 from datetime import timedelta
-from .config import SECRET_KEY, ALGORITHM
-from app.logger import logger
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from .config import (
+    BULK_PREDICTION_MAX_ROWS, PREDICTION_PAGE_SIZE, PREDICTION_PAGE_MAX_SIZE, STARTUP_MODE, REPORT_FALLBACK_REPLACE, DATABASE_AUTO_MIGRATE, METRICS_TOKEN,
+    PROFILER_INTERVAL_MS, PROFILER_MAX_SECONDS
+)
+import time
+from app.logger import logger, redact_phi
 
 # Define lifespan context manager for startup/shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Initialize models when the application starts
-    logger.info("Initializing models on application startup")
-    initialize_models()
-    logger.info("Models initialized successfully")
+    # Startup: Bring the database schema up to date
+    if DATABASE_AUTO_MIGRATE:
+        logger.info("Database schema at version %s", upgrade_schema())
+    # Report compression looks its dictionary up once; do it here rather than on the event loop
+    await run_db(preload_dictionaries)
+    
+    # Initialize models when the application starts
+    if STARTUP_MODE == "background":
+        logger.info("Loading models in the background; /readyz reports progress")
+        start_background_initialization()
+    else:
+        started = time.perf_counter()
+        logger.info("Initializing models on application startup")
+        initialize_models()
+        warm_up_models()
+        logger.info("Models initialized and warmed up in %.1f ms", (time.perf_counter() - started) * 1000)
+    # Hot-swap new registry versions as they appear (MODEL_WATCH_INTERVAL_SECONDS)
+    start_model_watcher()
+    if prediction_writer is not None:
+        prediction_writer.start()
+    await report_jobs.start()
     
     yield  # This is where the app runs
     
     # Shutdown: Clean up resources when the application is shutting down
     logger.info("Application shutdown, performing cleanup...")
+    await report_jobs.stop()
+    if prediction_writer is not None:
+        prediction_writer.stop()
     clear_models()
     logger.info("Models cleared successfully")
 
@@ -46,6 +89,18 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Track in-flight requests for /metrics
+app.add_middleware(InFlightMiddleware)
+# Opt-in single-request profiling via the X-Profile header
+app.add_middleware(ProfileRequestMiddleware)
+
+# Pipeline failures that escape a route are counted once here, by their original type
+@app.exception_handler(PipelineError)
+async def pipeline_error_handler(request: Request, exc: PipelineError):
+    count_error(pipeline_error_type(exc))
+    logger.error("Prediction pipeline error on %s: %s", request.url.path, exc)
+    return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content={"detail": str(exc)})
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -55,7 +110,7 @@ templates = Jinja2Templates(directory="templates")
 # Authentication routes
 @app.post("/api/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await aauthenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -70,145 +125,458 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 
 @app.post("/api/signup")
 async def signup(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = await run_db(get_user, db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    db_email = db.query(User).filter(User.email == user.email).first()
+    db_email = await run_db(get_user_by_email, db, user.email)
     if db_email:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return create_user(db=db, user=user)
+    hashed_password = await aget_password_hash(user.password)
+    return await run_db(create_user, db=db, user=user, hashed_password=hashed_password)
 
 # Prediction routes
+def invalid_input(error: ValidationError, *loc: str) -> RequestValidationError:
+    """422 listing every missing, malformed or out-of-range field, located under ``body``."""
+    count_error("InvalidClinicalData")
+    return RequestValidationError([
+        {**item, "loc": ("body", *loc, *item["loc"])} for item in error.errors(include_url=False)
+    ])
+
+def parse_clinical_data(raw) -> ClinicalFeatures:
+    """Validate the clinical features JSON of a form request before anything is scored."""
+    with observe_stage("parse"):
+        try:
+            return ClinicalFeatures.model_validate_json(raw)
+        except ValidationError as e:
+            raise invalid_input(e, "clinical_data")
+
+async def read_prediction_request(request: Request) -> PredictionRequest:
+    """
+    Read /api/predict input: a typed JSON body, or the original form whose
+    ``clinical_data`` field holds the features as a JSON string.
+    """
+    if request.headers.get("content-type", "").startswith("application/json"):
+        body = await request.body()
+        with observe_stage("parse"):
+            try:
+                return PredictionRequest.model_validate_json(body)
+            except ValidationError as e:
+                raise invalid_input(e)
+
+    form = await request.form()
+    clinical_data = form.get("clinical_data")
+    if clinical_data is None:
+        raise RequestValidationError([{"type": "missing", "loc": ("body", "clinical_data"), "msg": "Field required", "input": None}])
+    clinical_features = parse_clinical_data(clinical_data)
+    try:
+        return PredictionRequest(
+            clinical_data=clinical_features,
+            language=form.get("language", "English"),
+            background=form.get("background", False)
+        )
+    except ValidationError as e:
+        raise invalid_input(e)
+
 @app.post("/api/predict")
 async def create_prediction(
-    clinical_data: str = Form(...),
-    language: str = Form("English"),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    payload: PredictionRequest = Depends(read_prediction_request),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    
-    # Parse clinical data
-    clinical_features = json.loads(clinical_data)
+    clinical_features = payload.clinical_data.model_dump()
+    features = payload.clinical_data.to_vector()
+    language = payload.language
     
     # Log the parsed clinical data
-    logger.info(f"Parsed clinical data: {clinical_features}")
-    # Make prediction with image object
-    prediction = make_prediction(
-        db=db,
-        user_id=current_user.id,
-        clinical_data=clinical_features,
-        language=language
-    )
+    logger.info("Parsed clinical data: %s", redact_phi(clinical_features))
+
+    if payload.background:
+        # Persist the ML result now and let the job queue generate the report
+        prediction = await make_prediction_deferred(
+            db=db,
+            user_id=current_user.id,
+            clinical_data=clinical_features,
+            language=language,
+            features=features
+        )
+        if prediction.report_status == "pending":
+            report_jobs.notify()
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED if prediction.report_status == "pending" else status.HTTP_200_OK,
+            content=await run_db(serialize_prediction, prediction)
+        )
+
+    # Make prediction without blocking the event loop; abandon it if the client goes away
+    try:
+        prediction = await run_until_disconnected(request, make_prediction_async(
+            db=db,
+            user_id=current_user.id,
+            clinical_data=clinical_features,
+            language=language,
+            features=features
+        ))
+    except ClientDisconnected:
+        logger.warning("Client disconnected before the prediction finished; cancelled")
+        return Response(status_code=499)
     
     # Log the prediction result
-    logger.info(f"Prediction result: {prediction}")
+    logger.info("Prediction stored: id=%s clinical_result=%s model_version=%s report_source=%s",
+                prediction.id, prediction.clinical_model_result, prediction.model_version, prediction.report_source)
+
+    # A template report served after the latency budget may have a replacement job queued
+    if prediction.report_source == "template" and REPORT_FALLBACK_REPLACE:
+        report_jobs.notify()
     
     return {
         "id": prediction.id,
         "clinical_result": prediction.clinical_model_result,
+        "model_version": prediction.model_version,
         "language": prediction.language,
-        "report": prediction.report
+        # Decompression may load a shared dictionary from the database
+        "report": await run_db(getattr, prediction, "report"),
+        "report_source": prediction.report_source
     }
 
-@app.get("/api/user/predictions")
-async def user_predictions(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    predictions = get_user_predictions(db, current_user.id)
-    return predictions
+def serialize_prediction(prediction) -> dict:
+    """JSON view of a prediction including its report status. Blocking: reading the report may query the database."""
+    return {
+        "id": prediction.id,
+        "clinical_result": prediction.clinical_model_result,
+        "model_version": prediction.model_version,
+        "language": prediction.language,
+        "report": prediction.report,
+        "report_status": prediction.report_status,
+        "report_source": prediction.report_source,
+        "created_at": prediction.created_at.isoformat() if prediction.created_at else None
+    }
+
+@app.get("/api/predictions/{prediction_id}")
+async def read_prediction(
+    prediction_id: int,
+    wait: float = 0,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Fetch a prediction; with ``wait`` > 0, long-poll up to that many seconds (max 60) for a pending report."""
+    prediction = await run_db(get_user_prediction, db, current_user.id, prediction_id)
+    if prediction is None:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+
+    if wait > 0 and prediction.report_status == "pending":
+        await report_jobs.wait_for_report(prediction_id, min(wait, 60))
+        await run_db(db.refresh, prediction)
+
+    return await run_db(serialize_prediction, prediction)
+
+@app.get("/api/predictions/{prediction_id}/report")
+async def read_prediction_report(
+    prediction_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Fetch only the report of a prediction, loaded on demand by the dashboard."""
+    prediction = await run_db(get_user_prediction_report, db, current_user.id, prediction_id)
+    if prediction is None:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+    return {
+        "id": prediction.id,
+        # Decompression may load a shared dictionary from the database
+        "report": await run_db(getattr, prediction, "report"),
+        "report_status": prediction.report_status,
+        "report_source": prediction.report_source
+    }
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/predict/stream")
+async def create_prediction_stream(
+    clinical_data: str = Form(...),
+    language: str = Form("English"),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    validated = parse_clinical_data(clinical_data)
+    clinical_features, features = validated.model_dump(), validated.to_vector()
+    user_id = current_user.id
+
+    async def event_stream():
+        # Own session: the stream outlives the request-scoped dependency
+        db = SessionLocal()
+        try:
+            async for event, data in stream_prediction(
+                db=db,
+                user_id=user_id,
+                clinical_data=clinical_features,
+                language=language,
+                features=features
+            ):
+                yield format_sse(event, data)
+        except PredictionError as e:
+            count_error(pipeline_error_type(e))
+            yield format_sse("error", {"detail": str(e)})
+        finally:
+            with anyio.CancelScope(shield=True):
+                await run_db(db.close)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def read_batch_records(request: Request) -> list:
+    """Read bulk clinical records from a JSON array, a CSV body or a CSV file upload."""
+    content_type = request.headers.get("content-type", "")
+
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Multipart uploads must include a CSV 'file' field")
+            records = parse_clinical_csv((await upload.read()).decode("utf-8"))
+        elif content_type.startswith("text/csv"):
+            records = parse_clinical_csv((await request.body()).decode("utf-8"))
+        else:
+            records = await request.json()
+    except HTTPException:
+        raise
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Could not parse batch body as JSON or CSV")
+
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Batch body must be a JSON array of clinical records")
+    if len(records) > BULK_PREDICTION_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds the maximum of {BULK_PREDICTION_MAX_ROWS} records"
+        )
+    return records
+
+@app.post("/api/predict/batch")
+async def create_batch_prediction(
+    request: Request,
+    language: str = "English",
+    include_report: bool = False,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    records = await read_batch_records(request)
+    user_id = current_user.id
+    logger.info("Batch prediction requested: %s records, include_report=%s", len(records), include_report)
+
+    def generate_ndjson():
+        # Own session: the stream outlives the request-scoped dependency
+        db = SessionLocal()
+        try:
+            for chunk_results in make_batch_predictions(
+                db=db,
+                user_id=user_id,
+                records=records,
+                language=language,
+                include_report=include_report
+            ):
+                yield "".join(json.dumps(item) + "\n" for item in chunk_results)
+        except PredictionError as e:
+            count_error(pipeline_error_type(e))
+            yield json.dumps({"error": str(e)}) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate_ndjson(), media_type="application/x-ndjson")
+
+@app.get("/api/user/predictions", response_model=PredictionPage)
+async def user_predictions(
+    limit: int = Query(PREDICTION_PAGE_SIZE, ge=1, le=PREDICTION_PAGE_MAX_SIZE),
+    cursor: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """One page of the prediction history without report texts; pass ``next_cursor`` back as ``cursor``."""
+    try:
+        predictions, next_cursor = await run_db(get_user_predictions_page, db, current_user.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page = PredictionPage.model_validate({"predictions": predictions, "next_cursor": next_cursor}, from_attributes=True)
+    return Response(page.model_dump_json(), media_type="application/json")
+
+@app.get("/api/user/predictions/export")
+async def export_user_predictions(
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """The whole prediction history, newest first, streamed as a JSON array or as NDJSON."""
+    user_id = current_user.id
+
+    def generate():
+        # Own session: the stream outlives the request-scoped dependency
+        db = SessionLocal()
+        try:
+            first = True
+            if format == "json":
+                yield b"["
+            for rows in iter_user_predictions(db, user_id):
+                if format == "ndjson":
+                    yield b"".join(PredictionSummary.model_validate(row).model_dump_json().encode() + b"\n" for row in rows)
+                    continue
+                # Strip the brackets of each encoded chunk to splice it into one array
+                encoded = PredictionSummaryList.dump_json(PredictionSummaryList.validate_python(rows))[1:-1]
+                yield encoded if first else b"," + encoded
+                first = False
+            if format == "json":
+                yield b"]"
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        iterate_in_threadpool(generate()),
+        media_type="application/json" if format == "json" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="predictions.{format}"'}
+    )
+
+@app.get("/api/inference/stats")
+async def inference_stats(current_user: CurrentUser = Depends(get_current_user)):
+    return get_batcher_stats()
+
+@app.get("/api/report-jobs/stats")
+async def report_job_stats(current_user: CurrentUser = Depends(get_current_user)):
+    return await run_db(report_jobs.stats)
+
+@app.get("/api/report-cache/stats")
+async def report_cache_stats(current_user: CurrentUser = Depends(get_current_user)):
+    return get_report_cache_stats()
+
+@app.get("/api/score-cache/stats")
+async def score_cache_stats(current_user: CurrentUser = Depends(get_current_user)):
+    return get_score_cache_stats()
+
+@app.get("/api/write-behind/stats")
+async def write_behind_stats(current_user: CurrentUser = Depends(get_current_user)):
+    return get_write_behind_stats()
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Prometheus scrape endpoint: pipeline stage latencies, error counts, in-flight gauges and component metrics."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# Admin routes
+def collapsed_stacks_response(profiler: SamplingProfiler, name: str) -> PlainTextResponse:
+    return PlainTextResponse(profiler.collapsed(), headers={
+        "Content-Disposition": f'attachment; filename="{name}.collapsed"',
+        "X-Profile-Samples": str(profiler.samples)
+    })
+
+@app.get("/api/admin/profile")
+async def profile_worker(
+    seconds: float = 10,
+    interval_ms: float = PROFILER_INTERVAL_MS,
+    by_route: bool = True,
+    admin: CurrentUser = Depends(get_admin_user)
+):
+    """Sample every thread of this worker for ``seconds`` and return collapsed stacks for a flame graph."""
+    if not 0 < seconds <= PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be greater than 0 and at most {PROFILER_MAX_SECONDS:g}")
+    try:
+        profiler = await capture(seconds, interval_ms, index_routes(app.routes) if by_route else None)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return collapsed_stacks_response(profiler, f"profile-{int(time.time())}")
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def read_request_profile(profile_id: str, admin: CurrentUser = Depends(get_admin_user)):
+    """Download the profile of a request sent with ``X-Profile: 1``."""
+    profiler = request_profiles.get(profile_id)
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return collapsed_stacks_response(profiler, f"request-{profile_id}")
+
+@app.get("/api/admin/models")
+async def model_status(admin: CurrentUser = Depends(get_admin_user)):
+    return get_model_status()
+
+@app.post("/api/admin/models/{version}/activate")
+async def activate_model(version: str, admin: CurrentUser = Depends(get_admin_user)):
+    """Load, warm up and hot-swap a registry version (or ``latest``/``base``) while requests keep being served."""
+    try:
+        return await run_in_threadpool(activate_model_version, version)
+    except ModelVersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ModelLoadingError as e:
+        count_error(pipeline_error_type(e))
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+# Health routes
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    readiness = get_readiness()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if readiness["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=readiness
+    )
 
 # Page routes
 @app.get("/")
 async def get_login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return templates.TemplateResponse(request, "login.html", {"request": request})
 
 @app.get("/login")
 async def get_login_page_alt(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return templates.TemplateResponse(request, "login.html", {"request": request})
 
 @app.get("/signup")
 async def get_signup_page(request: Request):
-    return templates.TemplateResponse("signup.html", {"request": request})
+    return templates.TemplateResponse(request, "signup.html", {"request": request})
 
 @app.get("/home")
-async def get_home_page(request: Request):
-    # Get token from request cookies or headers
-    token = request.cookies.get("access_token") or request.headers.get("Authorization")
-    
-    if not token:
-        # If no token, redirect to login page
+async def get_home_page(request: Request, user: Optional[CurrentUser] = Depends(get_page_user)):
+    # Authenticated from the cookie or Authorization header; otherwise redirect to login page
+    if not user:
         return RedirectResponse(url="/", status_code=303)
-    
-    try:
-        # Try to get the current user
-        if token and token.startswith("Bearer "):
-            token = token.replace("Bearer ", "")
-        
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
         
-        if not username:
-            return RedirectResponse(url="/", status_code=303)
-            
-        db = SessionLocal()
-        user = get_user(db, username)
-        db.close()
-        
-        if not user:
-            return RedirectResponse(url="/", status_code=303)
-            
-        # If authentication successful, render the page with the API key
-        return templates.TemplateResponse("index.html", {
-            "request": request, 
-            "user": user
-        })
-    except jwt.JWTError as e:
-        logger.error(f"JWT error: {str(e)}")
-        return RedirectResponse(url="/", status_code=303)
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
-        return RedirectResponse(url="/", status_code=303)
+    # If authentication successful, render the page with the API key
+    return templates.TemplateResponse(request, "index.html", {
+        "request": request, 
+        "user": user
+    })
 
 @app.get("/dashboard")
-async def get_dashboard_page(request: Request):
-    # Get token from request cookies or headers
-    token = request.cookies.get("access_token") or request.headers.get("Authorization")
-    
-    if not token:
-        # If no token, redirect to login page
+async def get_dashboard_page(
+    request: Request,
+    cursor: Optional[str] = None,
+    user: Optional[CurrentUser] = Depends(get_page_user),
+    db: Session = Depends(get_db)
+):
+    # Authenticated from the cookie or Authorization header; otherwise redirect to login page
+    if not user:
         return RedirectResponse(url="/", status_code=303)
     
     try:
-        # Try to get the current user
-        if token and token.startswith("Bearer "):
-            token = token.replace("Bearer ", "")
-        
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        
-        if not username:
-            return RedirectResponse(url="/", status_code=303)
-            
-        db = SessionLocal()
-        user = get_user(db, username)
-        
-        # Get predictions for the user
-        predictions = get_user_predictions(db, user.id)
-        
-        
-        db.close()
+        # Get one page of predictions for the user (reports are fetched when opened)
+        try:
+            predictions, next_cursor = await run_db(get_user_predictions_page, db, user.id, PREDICTION_PAGE_SIZE, cursor)
+        except ValueError:
+            return RedirectResponse(url="/dashboard", status_code=303)
         
         # If authentication successful, render the page with API key
         return templates.TemplateResponse(
+            request,
             "dashboard.html", 
             {
                 "request": request, 
                 "user": user, 
-                "predictions": predictions
+                "predictions": predictions,
+                "next_cursor": next_cursor,
+                "is_first_page": not cursor
             }
         )
-    except jwt.JWTError as e:
-        logger.error(f"JWT error: {str(e)}")
-        return RedirectResponse(url="/", status_code=303)
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         return RedirectResponse(url="/", status_code=303)
 
@@ -0,0 +1,241 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class MetricsRegistry:
+    """
+    Every metric created in the process, rendered in the Prometheus text format.
+
+    Metrics register themselves on creation, keyed by name and labels; a metric
+    created again under the same key (e.g. after a component restart) replaces
+    the old one.
+    """
+
+    def __init__(self):
+        self._metrics: "OrderedDict[Tuple[str, Tuple], object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, metric) -> None:
+        with self._lock:
+            self._metrics[(metric.name, tuple(sorted(metric.labels.items())))] = metric
+
+    def collect(self) -> List[object]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self) -> str:
+        """Prometheus text exposition (version 0.0.4) of all registered metrics."""
+        families: "OrderedDict[str, List[object]]" = OrderedDict()
+        for metric in self.collect():
+            families.setdefault(metric.name, []).append(metric)
+
+        lines = []
+        for name, metrics in families.items():
+            first = metrics[0]
+            if first.description:
+                lines.append(f"# HELP {name} {_escape(first.description, quote=False)}")
+            lines.append(f"# TYPE {name} {first.metric_type}")
+            for metric in metrics:
+                lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str, quote: bool = True) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quote else value
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Process-wide registry served on /metrics
+registry = MetricsRegistry()
+
+
+class Histogram:
+    """Thread-safe cumulative histogram with fixed bucket upper bounds."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, buckets: Iterable[float], description: str = "", labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value: float) -> None:
+        """Record a single observation."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Return a consistent copy of the histogram state.
+
+        Returns:
+            dict: Cumulative bucket counts keyed by upper bound, plus sum and count
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets + [float("inf")], counts):
+            running += bucket_count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+
+        return {
+            "buckets": cumulative,
+            "sum": total,
+            "count": count,
+            "mean": (total / count) if count else None,
+        }
+
+    @contextmanager
+    def time(self, scale: float = 1.0):
+        """Observe the duration of the ``with`` block, in seconds times ``scale``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe((time.perf_counter() - started) * scale)
+
+    def exposition(self) -> List[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        lines, running = [], 0
+        for bound, bucket_count in zip(self.buckets + [float("inf")], counts):
+            running += bucket_count
+            lines.append(f"{self.name}_bucket{_format_labels({**self.labels, 'le': _format_value(bound)})} {running}")
+        labels = _format_labels(self.labels)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def reset(self) -> None:
+        """Drop all recorded observations."""
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, description: str = "", labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self._value = 0
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def exposition(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels)} {_format_value(self._value)}"]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._value = 0
+
+
+class Gauge:
+    """
+    Thread-safe value that can go up and down.
+
+    With ``function`` the value is read from the callable at collection time,
+    e.g. a queue depth.
+    """
+
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        function: Optional[Callable[[], float]] = None
+    ):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.function = function
+        self._value = 0
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    @contextmanager
+    def track_inprogress(self):
+        """Count the ``with`` block as in progress while it runs."""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    @property
+    def value(self) -> float:
+        return self.function() if self.function is not None else self._value
+
+    def exposition(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels)} {_format_value(self.value)}"]
+
+
+def snapshot_all(metrics: Dict[str, object], extra: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+    """Build a JSON-friendly view of a mapping of named metrics."""
+    result = {}
+    for key, metric in metrics.items():
+        if isinstance(metric, Histogram):
+            result[key] = metric.snapshot()
+        elif isinstance(metric, (Counter, Gauge)):
+            result[key] = metric.value
+        else:
+            result[key] = metric
+    if extra:
+        result.update(extra)
+    return result
@@ -0,0 +1,167 @@
+import argparse
+import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, MetaData, String, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.logger import logger
+from .database import Base, engine as default_engine
+from . import models  # noqa: F401  (registers the tables on Base.metadata)
+
+# Applied schema versions, one row per migration
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+# Arbitrary key for PostgreSQL's advisory lock, so concurrent workers migrate one at a time
+MIGRATION_LOCK_ID = 80_211_017
+
+
+def add_column(connection: Connection, table: str, column: Column) -> None:
+    """Add a column unless it already exists (e.g. created by the baseline migration)."""
+    inspector = inspect(connection)
+    if not inspector.has_table(table) or column.name in {c["name"] for c in inspector.get_columns(table)}:
+        return
+    ddl = f"ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect=connection.dialect)}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    connection.execute(text(ddl))
+
+
+def create_index(connection: Connection, table: str, name: str) -> None:
+    index = next(index for index in Base.metadata.tables[table].indexes if index.name == name)
+    index.create(connection, checkfirst=True)
+
+
+def rebuild_sqlite_table(connection: Connection, table: str) -> None:
+    """
+    Recreate a SQLite table from its current model definition, keeping the rows.
+
+    SQLite cannot change column constraints in place, so the table is copied
+    into a new one built from the model, then swapped in and re-indexed.
+    """
+    model = Base.metadata.tables[table]
+    # Referenced tables are copied along so the new table's foreign keys resolve
+    metadata = MetaData()
+    for other in Base.metadata.sorted_tables:
+        if other.name != table:
+            other.to_metadata(metadata)
+    temporary = model.to_metadata(metadata, name=f"_{table}_rebuild")
+    temporary.indexes.clear()
+    temporary.create(connection)
+    existing = {c["name"] for c in inspect(connection).get_columns(table)}
+    columns = ", ".join(column.name for column in model.columns if column.name in existing)
+    connection.execute(text(f"INSERT INTO {temporary.name} ({columns}) SELECT {columns} FROM {table}"))
+    connection.execute(text(f"DROP TABLE {table}"))
+    connection.execute(text(f"ALTER TABLE {temporary.name} RENAME TO {table}"))
+    for index in model.indexes:
+        index.create(connection, checkfirst=True)
+
+
+def _baseline(connection: Connection) -> None:
+    # Tables that already exist are left alone; later migrations bring them up to date
+    Base.metadata.create_all(connection)
+
+
+def _report_status_and_source(connection: Connection) -> None:
+    add_column(connection, "predictions", Column("report_status", String, nullable=False, server_default="'ready'"))
+    add_column(connection, "predictions", Column("report_source", String, nullable=False, server_default="'llm'"))
+
+
+def _report_compressed(connection: Connection) -> None:
+    add_column(connection, "predictions", Column("report_compressed", LargeBinary))
+
+
+def _prediction_history_index(connection: Connection) -> None:
+    create_index(connection, "predictions", "ix_predictions_user_id_created_at")
+
+
+def _model_version(connection: Connection) -> None:
+    add_column(connection, "predictions", Column("model_version", String))
+
+
+def _nullable_report_source(connection: Connection) -> None:
+    # The 'llm' default would otherwise be filled in for rows stored without a report
+    column = next(c for c in inspect(connection).get_columns("predictions") if c["name"] == "report_source")
+    if column["nullable"] and column["default"] is None:
+        return
+    if connection.dialect.name == "sqlite":
+        rebuild_sqlite_table(connection, "predictions")
+    else:
+        connection.execute(text(
+            "ALTER TABLE predictions ALTER COLUMN report_source DROP NOT NULL, ALTER COLUMN report_source DROP DEFAULT"
+        ))
+
+
+# Ordered schema history. Append new migrations; never edit or reorder applied ones.
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline schema", _baseline),
+    (2, "predictions.report_status and report_source", _report_status_and_source),
+    (3, "predictions.report_compressed", _report_compressed),
+    (4, "index predictions(user_id, created_at)", _prediction_history_index),
+    (5, "predictions.model_version", _model_version),
+    (6, "predictions.report_source nullable without a default", _nullable_report_source),
+]
+
+
+def current_version(connection: Connection) -> int:
+    if not inspect(connection).has_table(schema_migrations.name):
+        return 0
+    return connection.execute(text(f"SELECT COALESCE(MAX(version), 0) FROM {schema_migrations.name}")).scalar()
+
+
+def upgrade(engine: Engine = default_engine, target: Optional[int] = None) -> int:
+    """
+    Apply pending migrations in one transaction.
+
+    Migrations are idempotent, so a database created by the old
+    ``create_all`` startup code is adopted as-is and only missing pieces are added.
+
+    Args:
+        engine: Engine to migrate
+        target: Stop after this version (default: latest)
+
+    Returns:
+        int: Schema version after the upgrade
+    """
+    target = MIGRATIONS[-1][0] if target is None else target
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        schema_migrations.create(connection, checkfirst=True)
+        version = current_version(connection)
+        for number, description, migrate in MIGRATIONS:
+            if version < number <= target:
+                logger.info("Applying schema migration %s: %s", number, description)
+                migrate(connection)
+                connection.execute(schema_migrations.insert().values(
+                    version=number, description=description, applied_at=datetime.datetime.utcnow()
+                ))
+                version = number
+    return version
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = subparsers.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--target", type=int, default=None, help="Stop after this version")
+    subparsers.add_parser("current", help="Print the applied schema version")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        print(upgrade(target=args.target))
+    else:
+        with default_engine.connect() as connection:
+            print(f"{current_version(connection)} (latest {MIGRATIONS[-1][0]})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
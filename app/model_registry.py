@@ -0,0 +1,68 @@
+import os
+import re
+from typing import List, Tuple
+
+from .config import MODELS_DIR, MODEL_REGISTRY_DIR
+
+# Files every model version provides
+MODEL_FILE = "dl_best_model.h5"
+SCALER_FILE = "scaler_object.joblib"
+
+# Version served from the files directly in MODELS_DIR when the registry is empty
+BASE_VERSION = "base"
+LATEST = "latest"
+
+
+class ModelVersionNotFound(Exception):
+    pass
+
+
+def _version_key(version: str) -> List:
+    """Natural sort key, so v10 sorts after v9."""
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"(\d+)", version) if part]
+
+
+def _is_complete(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MODEL_FILE)) and os.path.isfile(os.path.join(path, SCALER_FILE))
+
+
+def list_versions(registry_dir: str = MODEL_REGISTRY_DIR) -> List[str]:
+    """
+    Complete model versions in the registry, oldest first.
+
+    Directories starting with ``.`` or ``_`` are ignored, so a version can be
+    copied in under a temporary name and renamed into place atomically.
+    """
+    if not os.path.isdir(registry_dir):
+        return []
+    versions = [
+        name for name in os.listdir(registry_dir)
+        if not name.startswith((".", "_")) and _is_complete(os.path.join(registry_dir, name))
+    ]
+    return sorted(versions, key=_version_key)
+
+
+def resolve_version(version: str = LATEST, registry_dir: str = MODEL_REGISTRY_DIR) -> Tuple[str, str]:
+    """
+    Find the directory holding a model version.
+
+    Args:
+        version: Version name, ``latest``, or ``base`` for the files in MODELS_DIR
+        registry_dir: Registry directory
+
+    Returns:
+        Tuple[str, str]: The concrete version name and its directory
+
+    Raises:
+        ModelVersionNotFound: If the version does not exist or is incomplete
+    """
+    if version == LATEST:
+        versions = list_versions(registry_dir)
+        return (versions[-1], os.path.join(registry_dir, versions[-1])) if versions else (BASE_VERSION, MODELS_DIR)
+    if version == BASE_VERSION:
+        return BASE_VERSION, MODELS_DIR
+
+    path = os.path.join(registry_dir, version)
+    if os.path.basename(version) != version or version.startswith((".", "_")) or not _is_complete(path):
+        raise ModelVersionNotFound(f"Model version '{version}' not found in {registry_dir}")
+    return version, path
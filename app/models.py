@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON, LargeBinary, Index, case, literal
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
+from .compression import compress_report, decompress_report
+from .config import REPORT_COMPRESSION
 from .database import Base
 import datetime
 
@@ -16,6 +19,8 @@ class User(Base):
 
 class Prediction(Base):
     __tablename__ = "predictions"
+    # Serves the newest-first history pages (see get_user_predictions_page)
+    __table_args__ = (Index("ix_predictions_user_id_created_at", "user_id", "created_at"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -25,9 +30,73 @@ class Prediction(Base):
     
     # Model predictions
     clinical_model_result = Column(Boolean)
+    # Registry version of the model that scored the row (NULL for rows predating versioning)
+    model_version = Column(String)
     
     # Generated report
     language = Column(String, default="English")
-    report = Column(Text)
+    # Reports are stored compressed; report_text only holds rows written before
+    # compression (or with REPORT_COMPRESSION=none). Use the report property.
+    report_text = Column("report", Text)
+    report_compressed = Column(LargeBinary)
+    # "ready", or "pending"/"failed" while a background job owns the report
+    report_status = Column(String, default="ready", nullable=False)
+    # "llm", or "template" when the local report engine wrote it; NULL while no report is stored
+    report_source = Column(String)
     
     user = relationship("User", back_populates="predictions")
+    report_job = relationship("ReportJob", back_populates="prediction", uselist=False)
+
+    @hybrid_property
+    def report(self):
+        if self.report_compressed is not None:
+            return decompress_report(self.report_compressed)
+        return self.report_text
+
+    @report.setter
+    def report(self, value):
+        if value is None or REPORT_COMPRESSION == "none":
+            self.report_text, self.report_compressed = value, None
+        else:
+            self.report_text, self.report_compressed = None, compress_report(value)
+
+    @report.expression
+    def report(cls):
+        # In SQL the report is only good for NULL checks: compressed rows read as a placeholder
+        return case((cls.report_compressed.isnot(None), literal("<compressed>")), else_=cls.report_text)
+
+class ReportJob(Base):
+    __tablename__ = "report_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    prediction_id = Column(Integer, ForeignKey("predictions.id"), unique=True)
+    
+    # queued -> running -> done, or back to queued with backoff until failed
+    status = Column(String, default="queued", nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_run_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    # Running jobs whose lease has expired are reclaimed (e.g. after a crash)
+    lease_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+    prediction = relationship("Prediction", back_populates="report_job")
+
+class ReportCacheEntry(Base):
+    __tablename__ = "report_cache"
+    
+    # SHA-256 of the normalized clinical features, model verdict and language
+    key = Column(String(64), primary_key=True)
+    language = Column(String)
+    report = Column(Text)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class ReportDictionary(Base):
+    __tablename__ = "report_dictionaries"
+    
+    # zlib dictionaries are numbered by the database, zstd ones keep the id embedded in their frames
+    id = Column(Integer, primary_key=True)
+    codec = Column(String, nullable=False, index=True)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
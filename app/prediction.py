@@ -1,34 +1,65 @@
+import asyncio
+import base64
+import datetime
 import os
+import threading
+import time
+from contextlib import aclosing, contextmanager
+import anyio
 import joblib
 import numpy as np
-import tensorflow as tf
-from sqlalchemy.orm import Session
-from typing import Dict, Any, List
+from pydantic import ValidationError
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session, load_only
+from typing import Dict, Any, List, Iterator, Optional, AsyncIterator, Tuple
 import json
-from app.logger import logger
-from .models import Prediction
+from app.logger import logger, redact_phi
+from .database import run_db
+from .instrumentation import observe_stage, track_in_flight
+from .models import Prediction, ReportJob
 from .llm import LLM
-from .config import MODELS_DIR
+from .profiler import run_in_threadpool
+from .batching import InferenceBatcher
+from .backends import create_backend
+from .model_registry import LATEST, list_versions, resolve_version
+from .report_cache import report_cache, make_cache_key
+from .report_templates import generate_template_report
+from .score_cache import score_cache, make_score_key
+from .schemas import ClinicalFeatures
+from .write_behind import prediction_writer
+from .config import (
+    MODELS_DIR, MICRO_BATCHING_ENABLED, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS,
+    BULK_PREDICTION_CHUNK_SIZE, INFERENCE_BACKEND, WARMUP_ENABLED, MODEL_VERSION, MODEL_WATCH_INTERVAL_SECONDS,
+    REPORT_LATENCY_BUDGET_SECONDS, REPORT_FALLBACK_REPLACE, LLM_OFFLINE, PREDICTION_PAGE_SIZE, PREDICTION_EXPORT_CHUNK_SIZE
+)
 
-# Custom exceptions
-class ModelLoadingError(Exception):
+# Custom exceptions; the routes count each one they handle by type on /metrics
+class PipelineError(Exception):
     pass
 
-class PreprocessingError(Exception):
+class ModelLoadingError(PipelineError):
     pass
 
-class PredictionError(Exception):
+class PreprocessingError(PipelineError):
     pass
 
+class PredictionError(PipelineError):
+    pass
+
+def pipeline_error_type(error: PipelineError) -> str:
+    """Type name an error is counted under: the original pipeline error when it was wrapped in PredictionError"""
+    cause = error.__cause__
+    return type(cause).__name__ if isinstance(cause, PipelineError) else type(error).__name__
+
 
 # Data preprocessing class
 class DataPreprocessor:
     """Handles data preprocessing for the ML model input."""
 
-    def __init__(self):
+    def __init__(self, models_dir: str = MODELS_DIR):
         try:
             logger.info("Initializing DataPreprocessor")
-            self.scaler = joblib.load(f"{MODELS_DIR}/scaler_object.joblib")
+            self.scaler = joblib.load(f"{models_dir}/scaler_object.joblib")
             logger.debug("Scaler loaded successfully")
         except Exception as e:
             logger.error("Failed to load scaler", exc_info=True)
@@ -37,71 +68,556 @@ class DataPreprocessor:
     def preprocess(self, input_data):
         """Preprocess input data using the loaded scaler."""
         try:
-            logger.debug(f"Preprocessing input data: {input_data}")
+            logger.debug("Preprocessing input data: %s", redact_phi(input_data))
             scaled_data = self.scaler.transform(np.array(input_data).reshape(1, -1))
             return scaled_data
         except Exception as e:
             logger.error("Error in data preprocessing", exc_info=True)
             raise PreprocessingError("Preprocessing failed. Ensure input data format is correct.")
 
+    def preprocess_batch(self, input_rows):
+        """Preprocess a 2D array of input rows in a single scaler call."""
+        try:
+            return self.scaler.transform(np.asarray(input_rows, dtype=np.float64))
+        except Exception as e:
+            logger.error("Error in batch data preprocessing", exc_info=True)
+            raise PreprocessingError("Batch preprocessing failed. Ensure input data format is correct.")
+
 # ML model predictor
 class ML_Model_Predictor:
-    """Handles prediction using the ML Model."""
+    """Handles prediction using the ML Model served by a pluggable backend."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        scaler=None,
+        backend_name: str = INFERENCE_BACKEND,
+        models_dir: str = MODELS_DIR,
+        version: Optional[str] = None
+    ):
         try:
-            self.model = tf.keras.models.load_model(f"{MODELS_DIR}/dl_best_model.h5")
-            logger.info("ML model loaded successfully.")
+            self.backend = create_backend(
+                backend_name, scaler=scaler, model_path=f"{models_dir}/dl_best_model.h5", version=version
+            )
+            logger.info("ML model loaded successfully with the '%s' backend.", backend_name)
         except Exception as e:
             logger.error("Failed to load ML model", exc_info=True)
             raise ModelLoadingError("Could not load the ML model.")
-        
+
+    @property
+    def expects_raw_features(self) -> bool:
+        """True if the backend has the scaler folded in and takes unscaled features."""
+        return self.backend.folds_scaler
+
     def predict(self, preprocessed_data):
         """Make predictions using the loaded ML model."""
         try:
-            prediction = self.model.predict(preprocessed_data)
+            prediction = self.backend.predict(np.asarray(preprocessed_data).reshape(1, -1))
             logger.info("ML model prediction completed successfully.")
             return prediction[0]
         except Exception as e:
             logger.error("Error during ML prediction", exc_info=True)
             raise PredictionError("ML prediction failed.")
 
+    def predict_batch(self, preprocessed_rows):
+        """Run a single forward pass over a batch of preprocessed rows."""
+        try:
+            return np.asarray(self.backend.predict(preprocessed_rows))
+        except Exception as e:
+            logger.error("Error during batched ML prediction", exc_info=True)
+            raise PredictionError("Batched ML prediction failed.")
+
+    def close(self):
+        """Release backend resources such as sidecar connections."""
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            close()
+
+
+# Order of the clinical features expected by the scaler and model (the schema declares them in this order)
+FEATURE_NAMES = list(ClinicalFeatures.model_fields)
+
+def extract_features(clinical_data: Dict[str, Any]) -> List[Any]:
+    """Prepare structured data input for ML model (extract from clinical_data dict)"""
+    return [clinical_data.get(name) for name in FEATURE_NAMES]
 
-# Global Variables to store model instances
-_preprocessor = None
-_ml_predictor = None
+def format_result_summary(clinical_data: Dict[str, Any], ml_result: int) -> str:
+    """Format the model verdict and input data as the LLM input string"""
+    return f"""
+        Heart Disease Diagnosis Report:
+
+        **ML Model Prediction:** {'Yes' if ml_result == 1 else 'No'}
+        
+        **Input Data:**
+        - Age: {clinical_data.get('age')}
+        - Gender: {clinical_data.get('gender')}
+        - Chest Pain Type: {clinical_data.get('chest_pain')}
+        - Blood Pressure: {clinical_data.get('bp')}
+        - Cholesterol: {clinical_data.get('cholesterol')}
+        - Blood Sugar: {clinical_data.get('blood_sugar')}
+        - Electrocardiographic: {clinical_data.get('electrocardiographic')}
+        - Heart Rate: {clinical_data.get('heart_rate')}
+        - Exercise Angina: {clinical_data.get('exercise_angina')}
+        - Oldpeak: {clinical_data.get('oldpeak')}
+        - Slope: {clinical_data.get('slope')}
+        """
+
+
+class ModelBundle:
+    """
+    One loaded model version: its scaler, model and micro-batcher.
+
+    Requests hold the bundle they started with for the whole scoring call, so a
+    hot swap never pairs the scaler of one version with the model of another. A
+    replaced bundle is retired and released once its last request finishes.
+    """
+
+    def __init__(self, version: str, models_dir: str, preprocessor=None, predictor=None):
+        self.version = version
+        self.models_dir = models_dir
+        self.preprocessor = preprocessor or DataPreprocessor(models_dir)
+        self.predictor = predictor or ML_Model_Predictor(
+            scaler=self.preprocessor.scaler, models_dir=models_dir, version=version
+        )
+        self.batcher: Optional[InferenceBatcher] = None
+        self.loaded_at = datetime.datetime.utcnow()
+
+        self._in_flight = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    def score_batch(self, rows: np.ndarray) -> np.ndarray:
+        """Preprocess (unless the backend folds the scaler) and score a batch of raw feature rows."""
+        if not self.predictor.expects_raw_features:
+            with observe_stage("preprocess"):
+                rows = self.preprocessor.preprocess_batch(rows)
+        with observe_stage("predict"):
+            return self.predictor.predict_batch(rows)
+
+    def start_batcher(self) -> None:
+        if MICRO_BATCHING_ENABLED and self.batcher is None:
+            self.batcher = InferenceBatcher(self.score_batch, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS)
+            self.batcher.start()
+
+    def warm_up(self) -> None:
+        row = np.asarray(self.preprocessor.scaler.mean_, dtype=np.float64).reshape(1, -1)
+        # Warm both the single-row shape and the largest batch shape
+        for batch_size in sorted({1, BATCH_MAX_SIZE if self.batcher is not None else 1}):
+            self.score_batch(np.repeat(row, batch_size, axis=0))
+        if self.batcher is not None:
+            self.batcher.predict(row[0])
+
+    def acquire(self) -> bool:
+        """Register a request using this bundle; False once it has been retired."""
+        with self._lock:
+            if self._retired:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            drained = self._retired and self._in_flight == 0
+        if drained:
+            self._close()
+
+    def retire(self) -> None:
+        """Stop accepting requests and release the models after the in-flight ones finish."""
+        with self._lock:
+            self._retired = True
+            drained = self._in_flight == 0
+            if not drained:
+                logger.info("Model version %s draining %d in-flight requests", self.version, self._in_flight)
+        if drained:
+            self._close()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _close(self) -> None:
+        if self.batcher is not None:
+            self.batcher.stop()
+        self.predictor.close()
+        logger.info("Model version %s released", self.version)
+
+
+# Global Variables to store model instances; _active is swapped as a whole on hot swap
+_active: Optional[ModelBundle] = None
 _llm = None
+_retired_bundles: List[ModelBundle] = []
+_swap_lock = threading.Lock()
+_watcher_stop = threading.Event()
+_watcher_thread: Optional[threading.Thread] = None
 
-def initialize_models():
-    """Initialize and load all models once during application startup"""
-    global _preprocessor, _ml_predictor, _llm
+# Startup state: per-component readiness and phase timings
+_init_lock = threading.RLock()
+_STARTUP_COMPONENTS = ("scaler", "model", "llm", "warmup")
+_startup_state: Dict[str, Dict[str, Any]] = {}
+_startup_thread: Optional[threading.Thread] = None
 
+def _reset_startup_state():
+    for component in _STARTUP_COMPONENTS:
+        _startup_state[component] = {"ready": False, "load_ms": None, "error": None}
+
+_reset_startup_state()
+
+@contextmanager
+def _startup_phase(component: str):
+    """Time a startup phase, log it and record the component's readiness"""
+    started = time.perf_counter()
     try:
-        logger.info("Initializing models on application startup")
-        _preprocessor = DataPreprocessor()
-        _ml_predictor = ML_Model_Predictor()
-        _llm = LLM()
-        logger.info("Models initialized successfully")
+        yield
     except Exception as e:
-        logger.error("Failed to load models on startup", exc_info=True)
-        raise ModelLoadingError(f"Could not load models during initialization: {str(e)}")
+        _startup_state[component]["error"] = str(e)
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _startup_state[component]["load_ms"] = round(elapsed_ms, 2)
+        logger.info("Startup phase '%s' finished in %.1f ms", component, elapsed_ms)
+    _startup_state[component]["ready"] = True
+    _startup_state[component]["error"] = None
+
+def initialize_models():
+    """Initialize and load all models once during application startup"""
+    global _active, _llm
+
+    with _init_lock:
+        try:
+            logger.info("Initializing models on application startup")
+            version, models_dir = resolve_version(MODEL_VERSION)
+            with _startup_phase("scaler"):
+                preprocessor = DataPreprocessor(models_dir)
+            with _startup_phase("model"):
+                predictor = ML_Model_Predictor(scaler=preprocessor.scaler, models_dir=models_dir, version=version)
+            with _startup_phase("llm"):
+                _llm = LLM()
+            bundle = ModelBundle(version, models_dir, preprocessor, predictor)
+            bundle.start_batcher()
+            _active = bundle
+            if score_cache is not None:
+                score_cache.clear()
+            logger.info("Models initialized successfully (model version %s)", version)
+        except Exception as e:
+            logger.error("Failed to load models on startup", exc_info=True)
+            raise ModelLoadingError(f"Could not load models during initialization: {str(e)}")
+
+def warm_up_models():
+    """
+    Run throwaway forward passes so the first real request does not pay
+    graph-tracing and allocation costs.
+    """
+    get_models()
+    with _startup_phase("warmup"):
+        if WARMUP_ENABLED:
+            _active.warm_up()
+
+def start_background_initialization() -> threading.Thread:
+    """Load and warm up the models on a background thread so the server can start serving at once"""
+    global _startup_thread
+
+    def run():
+        started = time.perf_counter()
+        try:
+            initialize_models()
+            warm_up_models()
+            logger.info("Background model initialization finished in %.1f ms", (time.perf_counter() - started) * 1000)
+        except Exception:
+            logger.error("Background model initialization failed", exc_info=True)
+
+    _startup_thread = threading.Thread(target=run, name="model-startup", daemon=True)
+    _startup_thread.start()
+    return _startup_thread
 
 def clear_models():
     """Clear all model from memory during application shutdown"""
-    global _preprocessor, _ml_predictor, _llm
-    _preprocessor = None
-    _ml_predictor = None
-    _llm = None
+    global _active, _llm
+    stop_model_watcher()
+    with _init_lock:
+        if _active is not None:
+            _active.retire()
+            _active = None
+        _llm = None
+        _reset_startup_state()
 
 def get_models():
-    """Get the initialized models"""
-    global _preprocessor, _ml_predictor, _llm
+    """Get the initialized models of the active version"""
+    bundle = _get_bundle()
+    return bundle.preprocessor, bundle.predictor, _llm
+
+def _get_bundle() -> ModelBundle:
+    bundle = _active
+    if bundle is None or _llm is None:
+        with _init_lock:
+            # If models aren't initialized yet, initialize them
+            if _active is None or _llm is None:
+                initialize_models()
+            bundle = _active
+    return bundle
+
+@contextmanager
+def _acquire_models() -> Iterator[ModelBundle]:
+    """Hold the active model version for the duration of one scoring call"""
+    while True:
+        bundle = _get_bundle()
+        # Fails only if a hot swap retired the bundle in between; pick up the new one
+        if bundle.acquire():
+            break
+    try:
+        yield bundle
+    finally:
+        bundle.release()
+
+def activate_model_version(version: str = LATEST) -> Dict[str, Any]:
+    """
+    Load a model version in the background of the caller, warm it up and swap it in.
+
+    Requests already scoring with the previous version finish on it; the
+    previous version is released once they have drained.
+
+    Args:
+        version: Registry version name, ``latest`` or ``base``
+
+    Returns:
+        Dict[str, Any]: The model status after the swap (see get_model_status)
+
+    Raises:
+        ModelVersionNotFound: If the version does not exist
+        ModelLoadingError: If the version fails to load or warm up; the active version is kept
+    """
+    global _active
+
+    version, models_dir = resolve_version(version)
+    with _swap_lock:
+        current = _get_bundle()
+        if current.version == version:
+            return get_model_status()
+
+        started = time.perf_counter()
+        logger.info("Loading model version %s from %s", version, models_dir)
+        bundle = None
+        try:
+            bundle = ModelBundle(version, models_dir)
+            bundle.start_batcher()
+            if WARMUP_ENABLED:
+                bundle.warm_up()
+        except Exception as e:
+            logger.error("Failed to load model version %s; keeping %s", version, current.version, exc_info=True)
+            if bundle is not None:
+                bundle.retire()
+            raise ModelLoadingError(f"Could not load model version {version}: {e}")
+
+        with _init_lock:
+            previous, _active = _active, bundle
+        if score_cache is not None:
+            score_cache.clear()
+        _retired_bundles.append(previous)
+        previous.retire()
+        logger.info(
+            "Model version %s active after %.1f ms (replaced %s)",
+            version, (time.perf_counter() - started) * 1000, previous.version
+        )
+    return get_model_status()
+
+def get_model_status() -> Dict[str, Any]:
+    """Get the active model version, versions still draining and the versions in the registry"""
+    _retired_bundles[:] = [bundle for bundle in _retired_bundles if bundle.in_flight > 0]
+    bundle = _active
+    return {
+        "active": bundle.version if bundle is not None else None,
+        "loaded_at": bundle.loaded_at.isoformat() if bundle is not None else None,
+        "draining": {retired.version: retired.in_flight for retired in _retired_bundles},
+        "available": list_versions(),
+        "watching": _watcher_thread is not None and _watcher_thread.is_alive()
+    }
+
+def start_model_watcher(interval: float = MODEL_WATCH_INTERVAL_SECONDS) -> Optional[threading.Thread]:
+    """
+    Poll the registry and hot-swap in new versions (only when MODEL_VERSION is ``latest``).
+
+    Only a newly published latest version triggers a swap, so a rollback made
+    through activate_model_version is left alone.
+    """
+    global _watcher_thread
+    if interval <= 0 or MODEL_VERSION != LATEST or _watcher_thread is not None:
+        return None
+
+    def run():
+        last_seen, _ = resolve_version(LATEST)
+        while not _watcher_stop.wait(interval):
+            try:
+                latest, _ = resolve_version(LATEST)
+                if latest != last_seen:
+                    logger.info("Model watcher found version %s", latest)
+                    activate_model_version(latest)
+                    last_seen = latest
+            except Exception:
+                logger.error("Model watcher failed to activate a new version", exc_info=True)
+
+    _watcher_stop.clear()
+    _watcher_thread = threading.Thread(target=run, name="model-watcher", daemon=True)
+    _watcher_thread.start()
+    return _watcher_thread
+
+def stop_model_watcher() -> None:
+    global _watcher_thread
+    if _watcher_thread is not None:
+        _watcher_stop.set()
+        _watcher_thread.join()
+        _watcher_thread = None
+
+def get_readiness() -> Dict[str, Any]:
+    """Get per-component readiness and startup timings"""
+    components = {name: dict(state) for name, state in _startup_state.items()}
+    return {
+        "ready": all(state["ready"] for state in components.values()),
+        "components": components
+    }
+
+def get_batcher_stats() -> Dict[str, Any]:
+    """Get micro-batching histograms, or a disabled marker if batching is off"""
+    batcher = _active.batcher if _active is not None else None
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+def score_features_versioned(structured_data: List[Any]) -> Tuple[int, str]:
+    """
+    Score one row of the 11 clinical features.
+
+    Verdicts for feature vectors seen before are served from the score cache
+    without touching the model. Otherwise, when micro-batching is enabled the
+    row is coalesced with concurrent requests into a single forward pass, and
+    scored directly if not.
+
+    Returns:
+        Tuple[int, str]: The 0/1 model verdict and the model version that produced it
+    """
+    with _acquire_models() as models:
+        try:
+            row = np.asarray(structured_data, dtype=np.float64).reshape(-1)
+            expected = models.preprocessor.scaler.n_features_in_
+            if row.shape[0] != expected:
+                raise ValueError(f"Expected {expected} features, got {row.shape[0]}")
+            if not np.all(np.isfinite(row)):
+                raise ValueError("Features must be finite numbers")
+        except Exception as e:
+            logger.error("Error in data preprocessing", exc_info=True)
+            raise PreprocessingError("Preprocessing failed. Ensure input data format is correct.")
+
+        key = make_score_key(row, models.version) if score_cache is not None else None
+        if key is not None:
+            verdict = score_cache.get(key)
+            if verdict is not None:
+                return verdict, models.version
+
+        with observe_stage("score"):
+            if models.batcher is None:
+                verdict = int(np.round(models.score_batch(row.reshape(1, -1)))[0][0])
+            else:
+                verdict = int(np.round(models.batcher.predict(row))[0])
+        if key is not None:
+            score_cache.put(key, verdict)
+        return verdict, models.version
+
+def score_features(structured_data: List[Any]) -> int:
+    """Score one row of the 11 clinical features and return the 0/1 model verdict."""
+    return score_features_versioned(structured_data)[0]
+
+def report_source() -> str:
+    """Engine behind generate_report/agenerate_report: the local template in offline mode, else the LLM"""
+    return "template" if LLM_OFFLINE else "llm"
+
+def generate_report(llm: LLM, clinical_data: Dict[str, Any], ml_result: int, language: str) -> str:
+    """Generate the LLM report, sharing cached and in-flight results for identical inputs"""
+    if LLM_OFFLINE:
+        return generate_template_report(clinical_data, ml_result, language)
 
-    if _preprocessor is None or _ml_predictor is None or _llm is None:
-        # If models aren't initialized yet, initialize them
-        initialize_models()
-    return _preprocessor, _ml_predictor, _llm
+    result = format_result_summary(clinical_data, ml_result)
+    if report_cache is None:
+        return llm.inference(result=result, language=language)
+
+    key = make_cache_key(extract_features(clinical_data), ml_result, language)
+    return report_cache.get_or_generate(key, lambda: llm.inference(result=result, language=language), language)
+
+async def agenerate_report(llm: LLM, clinical_data: Dict[str, Any], ml_result: int, language: str) -> str:
+    """Async variant of generate_report using the non-blocking LLM client"""
+    if LLM_OFFLINE:
+        return generate_template_report(clinical_data, ml_result, language)
+
+    result = format_result_summary(clinical_data, ml_result)
+    if report_cache is None:
+        return await llm.ainference(result=result, language=language)
+
+    key = make_cache_key(extract_features(clinical_data), ml_result, language)
+    return await report_cache.aget_or_generate(
+        key, lambda: llm.ainference(result=result, language=language), language
+    )
+
+async def astream_report(llm: LLM, clinical_data: Dict[str, Any], ml_result: int, language: str) -> AsyncIterator[str]:
+    """Streaming variant of agenerate_report, yielding report text as it is generated"""
+    if LLM_OFFLINE:
+        yield generate_template_report(clinical_data, ml_result, language)
+        return
+
+    result = format_result_summary(clinical_data, ml_result)
+    if report_cache is None:
+        chunks = llm.astream_inference(result=result, language=language)
+    else:
+        key = make_cache_key(extract_features(clinical_data), ml_result, language)
+        chunks = report_cache.astream_or_generate(
+            key, lambda: llm.astream_inference(result=result, language=language), language
+        )
+    async with aclosing(chunks):
+        async for text in chunks:
+            yield text
 
+def _discard_outcome(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()
+
+async def agenerate_report_within_budget(
+        llm: LLM,
+        clinical_data: Dict[str, Any],
+        ml_result: int,
+        language: str,
+        budget: float = REPORT_LATENCY_BUDGET_SECONDS
+) -> Tuple[str, str]:
+    """
+    Generate the report, falling back to the local template when the LLM is too slow.
+
+    Args:
+        llm: Initialized LLM client
+        clinical_data: The 11 clinical features
+        ml_result: Model verdict (0 or 1)
+        language: Report language
+        budget: Seconds to wait for the LLM; 0 waits for it indefinitely
+
+    Returns:
+        Tuple[str, str]: The report and its source, ``"llm"`` or ``"template"``
+    """
+    if LLM_OFFLINE or budget <= 0:
+        return await agenerate_report(llm, clinical_data, ml_result, language), report_source()
+
+    task = asyncio.ensure_future(agenerate_report(llm, clinical_data, ml_result, language))
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), budget), "llm"
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    except asyncio.TimeoutError:
+        logger.warning("LLM report exceeded the %.1fs latency budget; serving the local template", budget)
+        if REPORT_FALLBACK_REPLACE and report_cache is not None:
+            # Let the call finish so the replacement job picks its result up from the cache
+            task.add_done_callback(_discard_outcome)
+        else:
+            task.cancel()
+    except Exception as e:
+        logger.warning("LLM report failed; serving the local template: %s", e)
+
+    return generate_template_report(clinical_data, ml_result, language), "template"
+
+@track_in_flight("sync")
 def make_prediction(
         db: Session,
         user_id: int,
@@ -110,76 +626,469 @@ def make_prediction(
 ) -> Prediction:
     try:
         # Get the already initialized models
-        preprocessor, ml_predictor, llm = get_models()
+        _, _, llm = get_models()
 
         # Prepare structured data input for ML model (extract from clinical_data dict)
-        structured_data = [
-            clinical_data.get('age'),
-            clinical_data.get('gender'),
-            clinical_data.get('chest_pain'),
-            clinical_data.get('bp'),
-            clinical_data.get('cholesterol'),
-            clinical_data.get('blood_sugar'),
-            clinical_data.get('electrocardiographic'),
-            clinical_data.get('heart_rate'),
-            clinical_data.get('exercise_angina'),
-            clinical_data.get('oldpeak'),
-            clinical_data.get('slope')
-        ]
-
-        # Preprocess the data
-        preprocessed_data = preprocessor.preprocess(structured_data)
-
-        # Get prediction from ML model
-        ml_prediction_result = np.round(ml_predictor.predict(preprocessed_data)).astype(int)
+        structured_data = extract_features(clinical_data)
 
-        # Log the final predictions
-        logger.info(f"Final ML prediction (clinical model): {ml_prediction_result} - {'Affected' if ml_prediction_result == 1 else 'Not Affected'}")
-        
-        # Format result string
-        result = f"""
-        Heart Disease Diagnosis Report:
+        # Preprocess and score the data (coalesced with concurrent requests when batching is on)
+        ml_prediction_result, model_version = score_features_versioned(structured_data)
 
-        **ML Model Prediction:** {'Yes' if ml_prediction_result == 1 else 'No'}
+        # Log the final predictions
+        logger.info("Final ML prediction (clinical model): %s - %s", ml_prediction_result, "Affected" if ml_prediction_result == 1 else "Not Affected")
         
-        **Input Data:**
-        - Age: {clinical_data.get('age')}
-        - Gender: {clinical_data.get('gender')}
-        - Chest Pain Type: {clinical_data.get('chest_pain')}
-        - Blood Pressure: {clinical_data.get('bp')}
-        - Cholesterol: {clinical_data.get('cholesterol')}
-        - Blood Sugar: {clinical_data.get('blood_sugar')}
-        - Electrocardiographic: {clinical_data.get('electrocardiographic')}
-        - Heart Rate: {clinical_data.get('heart_rate')}
-        - Exercise Angina: {clinical_data.get('exercise_angina')}
-        - Oldpeak: {clinical_data.get('oldpeak')}
-        - Slope: {clinical_data.get('slope')}
-        """
-
-        # Generate LLM report
-        report = llm.inference(result=result, language=language)
+        # Generate LLM report (served from the report cache when possible)
+        report = generate_report(llm, clinical_data, ml_prediction_result, language)
 
         # Create prediction record
-        prediction = Prediction(
-            user_id=user_id,
-            clinical_features=clinical_data,
-            clinical_model_result=bool(ml_prediction_result==1),
-            language=language,
-            report=report
+        return save_prediction(
+            db, user_id, clinical_data, ml_prediction_result, language, report, report_source(),
+            model_version=model_version
         )
-
-        db.add(prediction)
-        db.commit()
-        db.refresh(prediction)
-        
-        return prediction
     
     except Exception as e:
         logger.error("Error in prediction function", exc_info=True)
         db.rollback()
-        raise PredictionError(f"Prediction function encountered an error: {str(e)}")
+        raise PredictionError(f"Prediction function encountered an error: {str(e)}") from e
+
+
+def build_prediction(
+        user_id: int,
+        clinical_data: Dict[str, Any],
+        ml_result: int,
+        language: str,
+        report: Optional[str],
+        source: str = "llm",
+        replace_later: bool = False,
+        model_version: Optional[str] = None
+) -> Prediction:
+    """
+    Create an unsaved prediction with its report.
+
+    With ``replace_later`` a report job is attached to overwrite a fallback
+    template report with the LLM text once it is available.
+    """
+    prediction = Prediction(
+        user_id=user_id,
+        clinical_features=clinical_data,
+        clinical_model_result=bool(ml_result==1),
+        model_version=model_version,
+        language=language,
+        report=report,
+        report_source=source
+    )
+    if replace_later:
+        prediction.report_job = ReportJob()
+    return prediction
+
+
+def commit_prediction(db: Session, prediction: Prediction) -> Prediction:
+    """Insert a new prediction in its own transaction"""
+    db.add(prediction)
+    db.commit()
+    db.refresh(prediction)
+    
+    return prediction
+
+
+def save_prediction(
+        db: Session,
+        user_id: int,
+        clinical_data: Dict[str, Any],
+        ml_result: int,
+        language: str,
+        report: Optional[str],
+        source: str = "llm",
+        replace_later: bool = False,
+        model_version: Optional[str] = None
+) -> Prediction:
+    """Persist a scored prediction and its report (see build_prediction)"""
+    with observe_stage("db_write"):
+        return commit_prediction(db, build_prediction(
+            user_id, clinical_data, ml_result, language, report, source, replace_later, model_version
+        ))
 
 
-def get_user_predictions(db: Session, user_id: int) -> List[Prediction]:
-    """Get all predictions for a user"""
-    return db.query(Prediction).filter(Prediction.user_id == user_id).order_by(Prediction.created_at.desc()).all()
+async def asave_prediction(db: Session, prediction: Prediction) -> Prediction:
+    """
+    Persist a new prediction from async code.
+
+    Group-committed with concurrent requests by the write-behind writer when it
+    is running, otherwise committed on the database threads.
+    """
+    with observe_stage("db_write"):
+        if prediction_writer is not None and prediction_writer.running:
+            return await asyncio.wrap_future(prediction_writer.submit(prediction))
+        return await run_db(commit_prediction, db, prediction)
+
+
+@track_in_flight("interactive")
+async def make_prediction_async(
+        db: Session,
+        user_id: int,
+        clinical_data: Dict[str, Any],
+        language: str = "English",
+        features: Optional[np.ndarray] = None
+) -> Prediction:
+    """
+    Event-loop friendly variant of make_prediction.
+
+    Scoring runs in the threadpool and the insert goes through asave_prediction;
+    the report is generated with the async LLM client, so a slow Gemini call
+    never blocks other requests. Cancelling the task aborts the in-flight LLM
+    call. If the LLM misses the latency budget the local template report is
+    stored instead. ``features`` is the already validated model input vector,
+    if the caller has one.
+    """
+    try:
+        # Get the already initialized models (may wait for a background startup)
+        _, _, llm = await run_in_threadpool(get_models)
+
+        structured_data = features if features is not None else extract_features(clinical_data)
+        ml_prediction_result, model_version = await run_in_threadpool(score_features_versioned, structured_data)
+        logger.info("Final ML prediction (clinical model): %s - %s", ml_prediction_result, "Affected" if ml_prediction_result == 1 else "Not Affected")
+
+        report, source = await agenerate_report_within_budget(llm, clinical_data, ml_prediction_result, language)
+
+        return await asave_prediction(db, build_prediction(
+            user_id, clinical_data, ml_prediction_result, language, report, source,
+            source == "template" and REPORT_FALLBACK_REPLACE and not LLM_OFFLINE, model_version
+        ))
+
+    except asyncio.CancelledError:
+        await run_db(db.rollback)
+        raise
+    except Exception as e:
+        logger.error("Error in prediction function", exc_info=True)
+        await run_db(db.rollback)
+        raise PredictionError(f"Prediction function encountered an error: {str(e)}") from e
+
+
+def build_pending_prediction(
+        user_id: int,
+        clinical_data: Dict[str, Any],
+        ml_result: int,
+        language: str,
+        model_version: Optional[str] = None
+) -> Prediction:
+    """Create an unsaved prediction with its report pending, plus the job that will generate it"""
+    prediction = Prediction(
+        user_id=user_id,
+        clinical_features=clinical_data,
+        clinical_model_result=bool(ml_result==1),
+        model_version=model_version,
+        language=language,
+        report=None,
+        report_status="pending"
+    )
+    prediction.report_job = ReportJob()
+    return prediction
+
+
+@track_in_flight("background")
+async def make_prediction_deferred(
+        db: Session,
+        user_id: int,
+        clinical_data: Dict[str, Any],
+        language: str = "English",
+        features: Optional[np.ndarray] = None
+) -> Prediction:
+    """
+    Score and persist a prediction immediately, leaving the report to the job queue.
+
+    A cached report is attached straight away; otherwise the prediction is
+    stored with ``report_status="pending"`` and a queued report job.
+    """
+    try:
+        await run_in_threadpool(get_models)
+
+        structured_data = features if features is not None else extract_features(clinical_data)
+        ml_prediction_result, model_version = await run_in_threadpool(score_features_versioned, structured_data)
+        logger.info("Final ML prediction (clinical model): %s - %s", ml_prediction_result, "Affected" if ml_prediction_result == 1 else "Not Affected")
+
+        if LLM_OFFLINE:
+            report = generate_template_report(clinical_data, ml_prediction_result, language)
+            return await asave_prediction(db, build_prediction(
+                user_id, clinical_data, ml_prediction_result, language, report, "template",
+                model_version=model_version
+            ))
+
+        if report_cache is not None:
+            cache_key = make_cache_key(extract_features(clinical_data), ml_prediction_result, language)
+            report = await report_cache.aget(cache_key)
+            if report is not None:
+                return await asave_prediction(db, build_prediction(
+                    user_id, clinical_data, ml_prediction_result, language, report,
+                    model_version=model_version
+                ))
+
+        return await asave_prediction(db, build_pending_prediction(
+            user_id, clinical_data, ml_prediction_result, language, model_version
+        ))
+
+    except asyncio.CancelledError:
+        await run_db(db.rollback)
+        raise
+    except Exception as e:
+        logger.error("Error in deferred prediction function", exc_info=True)
+        await run_db(db.rollback)
+        raise PredictionError(f"Prediction function encountered an error: {str(e)}") from e
+
+
+@track_in_flight("stream")
+async def stream_prediction(
+        db: Session,
+        user_id: int,
+        clinical_data: Dict[str, Any],
+        language: str = "English",
+        features: Optional[np.ndarray] = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Score clinical data and stream the report as it is generated.
+
+    Yields ``(event, data)`` pairs: ``result`` with the ML verdict as soon as it
+    is known, ``chunk`` for each piece of report text, and ``done`` with the id
+    of the stored prediction once the full report has been persisted.
+    """
+    try:
+        _, _, llm = await run_in_threadpool(get_models)
+
+        structured_data = features if features is not None else extract_features(clinical_data)
+        ml_prediction_result, model_version = await run_in_threadpool(score_features_versioned, structured_data)
+        logger.info("Final ML prediction (clinical model): %s - %s", ml_prediction_result, "Affected" if ml_prediction_result == 1 else "Not Affected")
+        yield "result", {"clinical_result": bool(ml_prediction_result == 1), "language": language}
+
+        # Served from the report cache, or shared with concurrent identical requests, when possible
+        report_parts = []
+        async with aclosing(astream_report(llm, clinical_data, ml_prediction_result, language)) as chunks:
+            async for text in chunks:
+                report_parts.append(text)
+                yield "chunk", {"text": text}
+        report = "".join(report_parts)
+
+        prediction = await asave_prediction(db, build_prediction(
+            user_id, clinical_data, ml_prediction_result, language, report, report_source(),
+            model_version=model_version
+        ))
+        yield "done", {"id": prediction.id}
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # Shielded so the rollback finishes in its worker thread while the stream is torn down
+        with anyio.CancelScope(shield=True):
+            await run_db(db.rollback)
+        raise
+    except Exception as e:
+        logger.error("Error in streaming prediction function", exc_info=True)
+        await run_db(db.rollback)
+        raise PredictionError(f"Prediction function encountered an error: {str(e)}") from e
+
+
+def score_rows_versioned(rows: np.ndarray) -> Tuple[np.ndarray, str]:
+    """Score a 2D array of raw feature rows in one pass, returning 0/1 verdicts and the model version"""
+    with _acquire_models() as models:
+        return np.round(models.score_batch(rows)).astype(int).reshape(-1), models.version
+
+def score_rows(rows: np.ndarray) -> np.ndarray:
+    """Score a 2D array of raw feature rows in one pass, returning 0/1 verdicts"""
+    return score_rows_versioned(rows)[0]
+
+def _validation_errors(error: ValidationError) -> List[Dict[str, Any]]:
+    """JSON-safe field errors of a rejected bulk record, in the shape of a 422 response's ``detail``"""
+    return [{"loc": list(item["loc"]), "msg": item["msg"], "type": item["type"]} for item in error.errors(include_url=False)]
+
+@track_in_flight("batch")
+def make_batch_predictions(
+        db: Session,
+        user_id: int,
+        records: List[Dict[str, Any]],
+        language: str = "English",
+        include_report: bool = False,
+        chunk_size: int = BULK_PREDICTION_CHUNK_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Score many clinical records in large chunks, persisting each chunk in bulk.
+
+    Every record is validated with ClinicalFeatures, exactly like the body of
+    ``POST /api/predict``.
+
+    Args:
+        db: Database session; its engine is used for the bulk inserts
+        user_id: Owner of the created predictions
+        records: Clinical feature dicts, one per patient
+        language: Report language, used only when include_report is set
+        include_report: Generate an LLM report for every scored record
+        chunk_size: Number of records scored and committed together
+
+    Yields:
+        List[Dict[str, Any]]: Results for one chunk, in input order. Invalid
+        records yield an ``error`` entry with their field errors in ``detail``
+        instead of a prediction.
+    """
+    _, _, llm = get_models()
+
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        results: List[Dict[str, Any]] = []
+        valid: List[Tuple[int, ClinicalFeatures]] = []
+        rows = np.empty((len(chunk), len(FEATURE_NAMES)), dtype=np.float32)
+
+        for offset, record in enumerate(chunk):
+            try:
+                features = ClinicalFeatures.model_validate(record)
+            except ValidationError as e:
+                results.append({"index": start + offset, "error": "Invalid clinical data", "detail": _validation_errors(e)})
+                continue
+            features.to_vector(rows[len(valid)])
+            valid.append((offset, features))
+
+        stored = []
+        try:
+            verdicts, model_version = score_rows_versioned(rows[:len(valid)].astype(np.float64)) if valid else ([], None)
+
+            predictions = []
+            for (offset, features), verdict in zip(valid, verdicts):
+                report = None
+                if include_report:
+                    try:
+                        report = generate_report(llm, features.model_dump(), verdict, language)
+                    except Exception as e:
+                        results.append({"index": start + offset, "error": "Report generation failed"})
+                        continue
+                predictions.append((offset, report, Prediction(
+                    user_id=user_id,
+                    clinical_features=features.model_dump(),
+                    clinical_model_result=bool(verdict == 1),
+                    model_version=model_version,
+                    language=language,
+                    report=report,
+                    report_source=report_source() if include_report else None
+                )))
+
+            # expire_on_commit=False keeps the assigned ids readable without reloading every row
+            with Session(bind=db.get_bind(), expire_on_commit=False) as session:
+                session.add_all([prediction for _, _, prediction in predictions])
+                session.commit()
+                stored = [(offset, report, prediction.id, prediction.clinical_model_result) for offset, report, prediction in predictions]
+        except Exception as e:
+            logger.error("Error in batch prediction function", exc_info=True)
+            raise PredictionError(f"Batch prediction failed at record {start}: {str(e)}") from e
+
+        for offset, report, prediction_id, clinical_result in stored:
+            results.append({
+                "index": start + offset,
+                "id": prediction_id,
+                "clinical_result": clinical_result,
+                "model_version": model_version,
+                "language": language,
+                "report": report
+            })
+
+        results.sort(key=lambda item: item["index"])
+        logger.info("Batch prediction chunk scored: %s stored, %s rejected", len(stored), len(chunk) - len(stored))
+        yield results
+
+
+def get_user_prediction(db: Session, user_id: int, prediction_id: int) -> Optional[Prediction]:
+    """Get a single prediction owned by the user"""
+    return db.query(Prediction).filter(Prediction.id == prediction_id, Prediction.user_id == user_id).first()
+
+
+# Columns listed in prediction history; the report text is fetched separately
+PREDICTION_SUMMARY_COLUMNS = (
+    Prediction.id,
+    Prediction.created_at,
+    Prediction.clinical_features,
+    Prediction.clinical_model_result,
+    Prediction.model_version,
+    Prediction.language,
+    Prediction.report_status,
+    Prediction.report_source,
+    Prediction.report.isnot(None).label("has_report"),
+)
+
+def encode_cursor(created_at: datetime.datetime, prediction_id: int) -> str:
+    """Opaque keyset cursor pointing just after the given row"""
+    raw = f"{created_at.isoformat()}|{prediction_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, _, prediction_id = raw.partition("|")
+        return datetime.datetime.fromisoformat(created_at), int(prediction_id)
+    except ValueError as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+def get_user_predictions_page(
+        db: Session,
+        user_id: int,
+        limit: int = PREDICTION_PAGE_SIZE,
+        cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Get one page of a user's prediction history, newest first.
+
+    Uses keyset pagination on (created_at, id), so every page costs the same
+    regardless of its depth, and projects only the summary columns.
+
+    Args:
+        db: Database session
+        user_id: Owner of the predictions
+        limit: Maximum number of rows to return
+        cursor: ``next_cursor`` of the previous page, or None for the first page
+
+    Returns:
+        Tuple[List[Any], Optional[str]]: Summary rows and the cursor of the next page (None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query = db.query(*PREDICTION_SUMMARY_COLUMNS).filter(Prediction.user_id == user_id)
+    if cursor:
+        created_at, prediction_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Prediction.created_at < created_at,
+            and_(Prediction.created_at == created_at, Prediction.id < prediction_id)
+        ))
+    rows = query.order_by(Prediction.created_at.desc(), Prediction.id.desc()).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.created_at, last.id)
+
+def iter_user_predictions(
+        db: Session,
+        user_id: int,
+        chunk_size: int = PREDICTION_EXPORT_CHUNK_SIZE
+) -> Iterator[List[Any]]:
+    """
+    Stream a user's whole prediction history, newest first, in chunks of summary rows.
+
+    Rows are fetched ``chunk_size`` at a time from a server-side cursor where
+    the driver supports one, so memory stays flat however long the history is.
+    The session must stay open until the iterator is exhausted or closed.
+    """
+    result = db.execute(
+        select(*PREDICTION_SUMMARY_COLUMNS)
+        .filter(Prediction.user_id == user_id)
+        .order_by(Prediction.created_at.desc(), Prediction.id.desc())
+        .execution_options(yield_per=chunk_size)
+    )
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+def get_user_prediction_report(db: Session, user_id: int, prediction_id: int) -> Optional[Prediction]:
+    """Get a prediction owned by the user with only its report columns loaded"""
+    return db.query(Prediction).options(load_only(
+        Prediction.id, Prediction.report_text, Prediction.report_compressed,
+        Prediction.report_status, Prediction.report_source
+    )).filter(Prediction.id == prediction_id, Prediction.user_id == user_id).first()
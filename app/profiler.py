@@ -0,0 +1,369 @@
+import asyncio
+import collections
+import functools
+import inspect
+import sys
+import threading
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+import anyio
+import anyio.to_thread
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+from starlette.routing import Match
+
+from app.logger import logger
+from .config import PROFILER_INTERVAL_MS, PROFILER_KEEP, PROFILER_REQUEST_HEADER
+
+# Root frame of samples taken outside any request (idle threads, batcher, background jobs)
+NO_ROUTE = "-"
+
+# Route name and per-request profile id of the request being served, set by
+# ProfileRequestMiddleware while a profile is being captured
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+current_profile_id: ContextVar[Optional[str]] = ContextVar("current_profile_id", default=None)
+
+# (route, profile id) of the request whose work a worker thread or event loop task is running
+_thread_tags: Dict[int, Tuple[Optional[str], Optional[str]]] = {}
+_task_tags: "weakref.WeakKeyDictionary[asyncio.Task, Tuple[Optional[str], Optional[str]]]" = weakref.WeakKeyDictionary()
+_task_factory_users = 0
+_previous_task_factory = None
+
+_EXHAUSTED = object()
+
+# Number of running whole-process captures; routes are only resolved while one is running
+_captures_running = 0
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def tag_thread(fn: Callable) -> Callable:
+    """
+    Wrap work about to be offloaded to a worker thread so that the samples taken
+    while it runs are attributed to the calling request's route and profile.
+
+    Must be called on the caller's side (e.g. the event loop), where the
+    request's context variables are set. A no-op for untagged requests.
+    """
+    tags = (current_route.get(), current_profile_id.get())
+    if tags == (None, None):
+        return fn
+
+    @functools.wraps(fn)
+    def tagged(*args, **kwargs):
+        ident = threading.get_ident()
+        previous = _thread_tags.get(ident)
+        _thread_tags[ident] = tags
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if previous is None:
+                _thread_tags.pop(ident, None)
+            else:
+                _thread_tags[ident] = previous
+    return tagged
+
+
+def _tagging_task_factory(loop, coro, **kwargs):
+    task = _previous_task_factory(loop, coro, **kwargs) if _previous_task_factory else asyncio.Task(coro, loop=loop, **kwargs)
+    context = kwargs.get("context")
+    tags = (context.get(current_route), context.get(current_profile_id)) if context else (current_route.get(), current_profile_id.get())
+    if tags != (None, None):
+        _task_tags[task] = tags
+    return task
+
+
+@contextmanager
+def _tagging_tasks(loop):
+    """Tag tasks created by tagged requests (e.g. the body of a streamed response) while profiling runs."""
+    global _task_factory_users, _previous_task_factory
+    if _task_factory_users == 0:
+        _previous_task_factory = loop.get_task_factory()
+        loop.set_task_factory(_tagging_task_factory)
+    _task_factory_users += 1
+    try:
+        yield
+    finally:
+        _task_factory_users -= 1
+        if _task_factory_users == 0:
+            loop.set_task_factory(_previous_task_factory)
+            _previous_task_factory = None
+
+
+@contextmanager
+def _tagging_request(route: Optional[str], profile_id: Optional[str] = None):
+    """Tag the current request's task and the work it offloads with its route and profile id."""
+    task = asyncio.current_task()
+    route_token = current_route.set(route)
+    profile_token = current_profile_id.set(profile_id)
+    _task_tags[task] = (route, profile_id)
+    try:
+        yield
+    finally:
+        _task_tags.pop(task, None)
+        current_profile_id.reset(profile_token)
+        current_route.reset(route_token)
+
+
+async def run_in_threadpool(fn: Callable, *args, **kwargs) -> Any:
+    """``fastapi.concurrency.run_in_threadpool`` that keeps the request's profiler tags."""
+    return await _run_in_threadpool(tag_thread(fn), *args, **kwargs)
+
+
+async def iterate_in_threadpool(iterator: Iterator) -> AsyncIterator:
+    """``starlette.concurrency.iterate_in_threadpool`` that keeps the request's profiler tags."""
+    next_item = tag_thread(next)
+    while True:
+        item = await anyio.to_thread.run_sync(next_item, iterator, _EXHAUSTED)
+        if item is _EXHAUSTED:
+            return
+        yield item
+
+
+def resolve_route(scope) -> Optional[str]:
+    """Name of the route a request will be dispatched to, or None if no route matches."""
+    app = scope.get("app")
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "name", None)
+    return None
+
+
+def index_routes(routes) -> Dict[Any, str]:
+    """Map the code object of each route's endpoint to the route name, for tagging samples."""
+    index = {}
+    for route in routes:
+        endpoint = getattr(route, "endpoint", None)
+        code = getattr(inspect.unwrap(endpoint), "__code__", None) if endpoint is not None else None
+        if code is not None:
+            index[code] = getattr(route, "name", None) or endpoint.__name__
+    return index
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for the whole process.
+
+    A daemon thread snapshots the stack of every other thread each
+    ``interval_ms`` and counts identical stacks. Nothing is installed in the
+    profiled code, so the cost is one stack walk per thread per sample no
+    matter how busy the worker is. Stacks are rooted at the thread name and,
+    given a route index, at the route: the endpoint found on the stack, else
+    the route the thread was tagged with by :func:`tag_thread` (``-`` if
+    neither). Coroutines only show up while they run on the event loop, not
+    while they await.
+
+    With ``profile_id`` only the request it names is sampled: worker threads
+    and event loop tasks tagged with that id.
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = PROFILER_INTERVAL_MS,
+        routes: Optional[Dict[Any, str]] = None,
+        profile_id: Optional[str] = None
+    ):
+        """
+        Args:
+            interval_ms: Time between samples, at least 1 ms
+            routes: Endpoint code objects to route names, from :func:`index_routes`
+            profile_id: Only sample the request profiled under this id
+        """
+        self.interval = max(interval_ms, 1.0) / 1000.0
+        self.routes = routes
+        self.profile_id = profile_id
+        self.counts: collections.Counter = collections.Counter()
+        self.samples = 0
+        self.duration = 0.0
+
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+        self._loop = None
+        self._loop_thread: Optional[int] = None
+
+    def start(self) -> "SamplingProfiler":
+        """Start sampling; when called on an event loop, its samples are attributed by the running task."""
+        try:
+            self._loop, self._loop_thread = asyncio.get_running_loop(), threading.get_ident()
+        except RuntimeError:
+            self._loop, self._loop_thread = None, None
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        """Stop sampling and wait for the sampler thread. Blocking."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.monotonic() - self._started_at
+        return self
+
+    async def astop(self) -> "SamplingProfiler":
+        """Stop from the event loop, joining the sampler thread in a worker thread."""
+        # Shielded so a cancelled request still leaves no sampler running
+        with anyio.CancelScope(shield=True):
+            return await anyio.to_thread.run_sync(self.stop)
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed ``root;...;leaf count`` format read by flamegraph.pl, speedscope and inferno."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    stack = self._collapse(frame, names.get(ident, f"thread-{ident}"), self._tags(ident))
+                    if stack is not None:
+                        self.counts[stack] += 1
+            self.samples += 1
+
+    def _tags(self, ident: int) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        if ident == self._loop_thread:
+            task = asyncio.current_task(self._loop)
+            return _task_tags.get(task) if task is not None else None
+        return _thread_tags.get(ident)
+
+    def _collapse(self, frame, thread_name: str, tags: Optional[Tuple[Optional[str], Optional[str]]]) -> Optional[str]:
+        """Collapsed stack of one thread, or None if the sample is filtered out."""
+        tagged_route, tagged_profile = tags or (None, None)
+        if self.profile_id is not None and tagged_profile != self.profile_id:
+            return None
+        stack = []
+        route = None
+        while frame is not None:
+            code = frame.f_code
+            if route is None and self.routes is not None:
+                route = self.routes.get(code)
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = f"{frame.f_globals.get('__name__', '?')}:{code.co_name}"
+            stack.append(label)
+            frame = frame.f_back
+        # ';' separates frames and a space precedes the count
+        stack.append(thread_name.replace(";", ":").replace(" ", "_"))
+        if self.routes is not None:
+            stack.append(route or tagged_route or NO_ROUTE)
+        return ";".join(reversed(stack))
+
+
+_capture_lock = threading.Lock()
+
+
+async def capture(seconds: float, interval_ms: float = PROFILER_INTERVAL_MS, routes: Optional[Dict[Any, str]] = None) -> SamplingProfiler:
+    """
+    Profile the process for ``seconds`` while the event loop keeps serving requests.
+
+    Raises:
+        ProfilerBusyError: If another capture is already running
+    """
+    global _captures_running
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already being captured")
+    try:
+        profiler = SamplingProfiler(interval_ms, routes).start()
+        _captures_running += 1
+        try:
+            with _tagging_tasks(asyncio.get_running_loop()):
+                await asyncio.sleep(seconds)
+        finally:
+            _captures_running -= 1
+            await profiler.astop()
+        logger.info("Captured %.1f s profile with %d samples", profiler.duration, profiler.samples)
+        return profiler
+    finally:
+        _capture_lock.release()
+
+
+class RequestProfiles:
+    """The most recent per-request profiles, kept in memory until administrators download them."""
+
+    def __init__(self, keep: int = 20):
+        self.keep = keep
+        self._profiles: "collections.OrderedDict[str, SamplingProfiler]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile_id: str, profiler: SamplingProfiler) -> None:
+        with self._lock:
+            self._profiles[profile_id] = profiler
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[SamplingProfiler]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+request_profiles = RequestProfiles(PROFILER_KEEP)
+
+
+class ProfileRequestMiddleware:
+    """
+    ASGI middleware profiling single requests sent with ``X-Profile: 1``, and
+    tagging requests with their route while a whole-process capture runs.
+
+    Per-request profiling is only active with ``PROFILER_REQUEST_HEADER=true``,
+    and for one request at a time; others are served unprofiled. The profile
+    holds only that request's samples, including work it offloads to worker
+    threads through :func:`run_in_threadpool` or ``run_db``. A profiled
+    response carries an ``X-Profile-Id`` header naming the profile to download
+    from ``/api/admin/profiles/{id}``. Streamed responses are profiled until
+    their last chunk is sent.
+    """
+
+    def __init__(self, app, enabled: bool = PROFILER_REQUEST_HEADER, interval_ms: float = PROFILER_INTERVAL_MS):
+        self.app = app
+        self.enabled = enabled
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if not (self.enabled and self._requested(scope)) or not self._lock.acquire(blocking=False):
+            if not _captures_running:
+                await self.app(scope, receive, send)
+                return
+            with _tagging_request(resolve_route(scope)):
+                await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        try:
+            routes = index_routes(scope["app"].routes) if "app" in scope else None
+            profiler = SamplingProfiler(self.interval_ms, routes, profile_id).start()
+            try:
+                with _tagging_tasks(asyncio.get_running_loop()), _tagging_request(resolve_route(scope), profile_id):
+                    await self.app(scope, receive, send_with_profile_id)
+            finally:
+                await profiler.astop()
+                request_profiles.add(profile_id, profiler)
+                logger.info("Profiled %s %s as %s (%d samples)", scope["method"], scope["path"], profile_id, profiler.samples)
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                return value.strip().lower() in (b"1", b"true", b"yes")
+        return False
@@ -0,0 +1,330 @@
+import asyncio
+import datetime
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+from app.logger import logger
+from .config import (
+    REPORT_CACHE_ENABLED, REPORT_CACHE_MAX_ENTRIES,
+    REPORT_CACHE_TTL_SECONDS, REPORT_CACHE_PERSISTENT
+)
+from .database import SessionLocal, run_db
+from .metrics import Counter, snapshot_all
+from .models import ReportCacheEntry
+
+
+class _LeaderCancelled(Exception):
+    """Signals single-flight followers that the leading call was cancelled and they should retry."""
+
+
+def make_cache_key(features: List[Any], ml_result: int, language: str) -> str:
+    """
+    Build the canonical cache key for a report.
+
+    Features are normalized to floats with 6 significant digits so that e.g.
+    ``1``, ``1.0`` and ``"1"`` hash identically; the language is case-folded.
+
+    Args:
+        features: The 11 clinical features in model order
+        ml_result: Model verdict (0 or 1)
+        language: Report language
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    canonical = {
+        "features": [format(float(value), ".6g") for value in features],
+        "verdict": int(ml_result),
+        "language": language.strip().casefold(),
+    }
+    payload = json.dumps(canonical, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """
+    Two-tier cache of generated reports.
+
+    Tier one is an in-process LRU with a TTL; tier two is the ``report_cache``
+    table, which survives restarts and is shared by all workers. Concurrent
+    misses for the same key are de-duplicated so only one LLM call is made.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = REPORT_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = REPORT_CACHE_TTL_SECONDS,
+        persistent: bool = REPORT_CACHE_PERSISTENT,
+        session_factory: Callable = SessionLocal
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self.session_factory = session_factory
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (report, expires_at)
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._async_inflight: Dict[str, asyncio.Future] = {}
+
+        self.memory_hits = Counter("report_cache_memory_hits_total", "Reports served from the in-process LRU")
+        self.persistent_hits = Counter("report_cache_persistent_hits_total", "Reports served from the cache table")
+        self.misses = Counter("report_cache_misses_total", "Lookups that required an LLM call")
+        self.evictions = Counter("report_cache_evictions_total", "Entries evicted from the LRU for capacity")
+        self.expirations = Counter("report_cache_expirations_total", "Entries dropped because their TTL passed")
+        self.shared_calls = Counter("report_cache_shared_calls_total", "Requests that waited on another request's LLM call")
+
+    # In-process tier
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            report, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations.inc()
+                return None
+            self._entries.move_to_end(key)
+            return report
+
+    def _memory_put(self, key: str, report: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (report, time.monotonic() + (self.ttl_seconds if ttl is None else ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions.inc()
+
+    # Persistent tier
+    def _persistent_get(self, key: str) -> Optional[tuple]:
+        db = self.session_factory()
+        try:
+            entry = db.get(ReportCacheEntry, key)
+            if entry is None:
+                return None
+            age = (datetime.datetime.utcnow() - entry.created_at).total_seconds()
+            if age >= self.ttl_seconds:
+                db.delete(entry)
+                db.commit()
+                self.expirations.inc()
+                return None
+            return entry.report, self.ttl_seconds - age
+        except Exception:
+            logger.error("Report cache lookup failed", exc_info=True)
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def _persistent_put(self, key: str, report: str, language: str) -> None:
+        db = self.session_factory()
+        try:
+            db.merge(ReportCacheEntry(
+                key=key, language=language, report=report, created_at=datetime.datetime.utcnow()
+            ))
+            db.commit()
+        except Exception:
+            logger.error("Report cache write failed", exc_info=True)
+            db.rollback()
+        finally:
+            db.close()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look a report up in memory, then in the cache table. Blocking."""
+        report = self._memory_get(key)
+        if report is not None:
+            self.memory_hits.inc()
+            return report
+        if self.persistent:
+            found = self._persistent_get(key)
+            if found is not None:
+                report, remaining_ttl = found
+                self._memory_put(key, report, remaining_ttl)
+                self.persistent_hits.inc()
+                return report
+        return None
+
+    def put(self, key: str, report: str, language: str = "") -> None:
+        """Store a report in both tiers. Blocking."""
+        self._memory_put(key, report)
+        if self.persistent:
+            self._persistent_put(key, report, language)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Async lookup: memory hits never leave the event loop."""
+        report = self._memory_get(key)
+        if report is not None:
+            self.memory_hits.inc()
+            return report
+        if not self.persistent:
+            return None
+        return await run_db(self.get, key)
+
+    def get_or_generate(self, key: str, generate: Callable[[], str], language: str = "") -> str:
+        """
+        Return the cached report or generate it, sharing one call among concurrent threads.
+
+        Args:
+            key: Cache key from :func:`make_cache_key`
+            generate: Produces the report on a miss
+            language: Stored alongside the persistent entry
+        """
+        report = self.get(key)
+        if report is not None:
+            return report
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            self.shared_calls.inc()
+            return future.result()
+
+        self.misses.inc()
+        try:
+            report = generate()
+            self.put(key, report, language)
+            future.set_result(report)
+            return report
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_generate(self, key: str, generate: Callable[[], Awaitable[str]], language: str = "") -> str:
+        """
+        Async variant of :meth:`get_or_generate` for coroutines on the event loop.
+
+        If the leading request is cancelled (e.g. its client disconnected), a
+        waiting follower takes over instead of failing.
+        """
+        while True:
+            report = await self.aget(key)
+            if report is not None:
+                return report
+
+            future = self._async_inflight.get(key)
+            if future is not None:
+                self.shared_calls.inc()
+                try:
+                    return await asyncio.shield(future)
+                except _LeaderCancelled:
+                    continue
+
+            future = self._async_inflight[key] = asyncio.get_running_loop().create_future()
+            self.misses.inc()
+            try:
+                report = await generate()
+                await run_db(self.put, key, report, language)
+                future.set_result(report)
+                return report
+            except asyncio.CancelledError:
+                future.set_exception(_LeaderCancelled())
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            finally:
+                self._async_inflight.pop(key, None)
+                # Mark the outcome retrieved so failures nobody waited on are not logged by asyncio
+                if future.done() and not future.cancelled():
+                    future.exception()
+
+    async def astream_or_generate(
+        self, key: str, stream: Callable[[], AsyncIterator[str]], language: str = ""
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of :meth:`aget_or_generate`, yielding report text chunks.
+
+        The leading request yields chunks as ``stream`` produces them and shares
+        the assembled report with concurrent requests for the same key, streamed
+        or not; those receive it as a single chunk. If the leader stops early
+        (cancelled, or its client went away), a waiting follower takes over.
+        """
+        while True:
+            report = await self.aget(key)
+            if report is not None:
+                yield report
+                return
+
+            future = self._async_inflight.get(key)
+            if future is not None:
+                self.shared_calls.inc()
+                try:
+                    report = await asyncio.shield(future)
+                except _LeaderCancelled:
+                    continue
+                yield report
+                return
+
+            future = self._async_inflight[key] = asyncio.get_running_loop().create_future()
+            self.misses.inc()
+            try:
+                parts = []
+                async with aclosing(stream()) as chunks:
+                    async for text in chunks:
+                        parts.append(text)
+                        yield text
+                report = "".join(parts)
+                await run_db(self.put, key, report, language)
+                future.set_result(report)
+                return
+            except (asyncio.CancelledError, GeneratorExit):
+                future.set_exception(_LeaderCancelled())
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            finally:
+                self._async_inflight.pop(key, None)
+                if future.done() and not future.cancelled():
+                    future.exception()
+
+    def clear(self) -> None:
+        """Drop every in-process entry (the cache table is left intact)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size."""
+        return snapshot_all(
+            {
+                "memory_hits": self.memory_hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "shared_calls": self.shared_calls,
+            },
+            extra={
+                "enabled": True,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self.persistent,
+            }
+        )
+
+
+# Shared cache instance, or None when caching is disabled
+report_cache: Optional[ReportCache] = ReportCache() if REPORT_CACHE_ENABLED else None
+
+
+def get_report_cache_stats() -> Dict[str, Any]:
+    """Get report cache counters, or a disabled marker if caching is off"""
+    if report_cache is None:
+        return {"enabled": False}
+    return report_cache.stats()
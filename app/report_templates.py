@@ -0,0 +1,510 @@
+from typing import Any, Dict, List
+
+from app.logger import logger
+
+# Local report engine: builds the same six markdown sections LLM.prompt_template asks
+# Gemini for, from the clinical features and verdict alone. Used when the LLM misses
+# its latency budget and as the only engine in offline mode.
+#
+# Per-language strings. Every language provides exactly the same keys.
+TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "english": {
+        "title": "Diagnostic Report",
+        "sections": [
+            "Prediction Summary", "Clinical Analysis", "Risk Factor Assessment",
+            "Differential Considerations", "Management Recommendations", "Follow-up Protocol",
+        ],
+        "subsections": ["Immediate Actions", "Preventive Measures", "Long-term Management"],
+        "verdict": {1: "heart disease likely", 0: "heart disease unlikely"},
+        "risk_level": {"low": "low", "moderate": "moderate", "high": "high"},
+        "summary": (
+            "The heart disease prediction model classified this patient as **{verdict}**. "
+            "{count} of the 11 clinical indicators fall outside their reference ranges, giving an overall "
+            "**{risk} risk** profile."
+        ),
+        "confidence": (
+            "This assessment was produced by the automated screening model and a standard template; "
+            "it is a screening result and must be confirmed by a clinician."
+        ),
+        "labels": {
+            "age": "Age", "gender": "Gender", "chest_pain": "Chest pain type", "bp": "Resting blood pressure",
+            "cholesterol": "Serum cholesterol", "blood_sugar": "Fasting blood sugar > 120 mg/dl",
+            "electrocardiographic": "Resting ECG", "heart_rate": "Maximum heart rate",
+            "exercise_angina": "Exercise-induced angina", "oldpeak": "ST depression (oldpeak)",
+            "slope": "ST segment slope",
+        },
+        "values": {
+            "gender": ["Female", "Male"],
+            "chest_pain": ["Typical angina", "Atypical angina", "Non-anginal pain", "Asymptomatic"],
+            "yes_no": ["No", "Yes"],
+            "electrocardiographic": ["Normal", "ST-T wave abnormality", "Left ventricular hypertrophy"],
+            "slope": ["Upsloping", "Flat", "Downsloping"],
+        },
+        "status": {"normal": "within range", "elevated": "elevated", "high": "high", "abnormal": "abnormal", "reduced": "reduced"},
+        "years": "years",
+        "factors": {
+            "age": "Age of {age} years increases baseline cardiovascular risk",
+            "male": "Male sex is associated with earlier onset of coronary disease",
+            "chest_pain": "Asymptomatic presentation can mask silent ischaemia",
+            "bp": "Resting blood pressure of {bp} mm Hg is above the recommended target",
+            "cholesterol": "Serum cholesterol of {cholesterol} mg/dl is above the desirable level",
+            "blood_sugar": "Elevated fasting blood sugar suggests impaired glucose control",
+            "electrocardiographic": "Resting ECG shows changes that warrant review",
+            "heart_rate": "Maximum heart rate of {heart_rate} bpm points to reduced exercise capacity",
+            "exercise_angina": "Angina during exercise suggests exertional ischaemia",
+            "oldpeak": "ST depression of {oldpeak} mm during exercise is significant",
+            "slope": "A flat or downsloping ST segment is associated with ischaemia",
+        },
+        "modifiable": "Modifiable risk factors",
+        "non_modifiable": "Non-modifiable risk factors",
+        "other": "Other clinical findings",
+        "none": "None identified",
+        "comparison": {
+            "low": "Compared with the general population of the same age, overall risk appears average or below.",
+            "moderate": "Compared with the general population of the same age, overall risk appears moderately increased.",
+            "high": "Compared with the general population of the same age, overall risk appears clearly increased.",
+        },
+        "differentials": [
+            "Stable or unstable angina and coronary artery disease",
+            "Hypertensive heart disease and left ventricular hypertrophy",
+            "Arrhythmias and valvular heart disease",
+            "Stress-related cardiac conditions such as stress cardiomyopathy",
+            "Non-cardiac causes of chest symptoms: gastro-oesophageal reflux, musculoskeletal pain, anxiety",
+        ],
+        "immediate": [
+            "Review this result with a physician, ideally a cardiologist",
+            "Monitor blood pressure and resting heart rate at home and record the readings",
+            "Avoid strenuous exertion until cleared by a clinician",
+            "Discuss general medication classes (e.g. lipid-lowering, antihypertensive) with your doctor",
+        ],
+        "preventive": [
+            "Follow a heart-healthy diet rich in vegetables, whole grains and fish; limit salt and saturated fat",
+            "Aim for at least 150 minutes of moderate activity per week once cleared",
+            "Stop smoking and limit alcohol",
+            "Practise stress management and get 7-9 hours of sleep",
+        ],
+        "long_term": [
+            "Repeat lipid profile, fasting glucose and blood pressure checks on schedule",
+            "Track weight, waist circumference, blood pressure and activity levels",
+            "Consider specialist consultation for stress testing or echocardiography",
+        ],
+        "follow_up": {
+            "low": "Routine review in 12 months",
+            "moderate": "Clinical review within 3 months",
+            "high": "Clinical review within 2-4 weeks",
+        },
+        "warning": "Seek emergency care for chest pain at rest, breathlessness, fainting or palpitations",
+        "tests": "Recommended tests: ECG, lipid profile, HbA1c and, if advised, an exercise stress test",
+        "tracking": "Keep a log of symptoms, readings and medications to share at each visit",
+    },
+    "spanish": {
+        "title": "Informe Diagnóstico",
+        "sections": [
+            "Resumen de la Predicción", "Análisis Clínico", "Evaluación de Factores de Riesgo",
+            "Consideraciones Diferenciales", "Recomendaciones de Manejo", "Protocolo de Seguimiento",
+        ],
+        "subsections": ["Acciones Inmediatas", "Medidas Preventivas", "Manejo a Largo Plazo"],
+        "verdict": {1: "enfermedad cardíaca probable", 0: "enfermedad cardíaca poco probable"},
+        "risk_level": {"low": "bajo", "moderate": "moderado", "high": "alto"},
+        "summary": (
+            "El modelo de predicción clasificó a este paciente como **{verdict}**. "
+            "{count} de los 11 indicadores clínicos están fuera de sus rangos de referencia, lo que indica un "
+            "perfil de **riesgo {risk}**."
+        ),
+        "confidence": (
+            "Esta evaluación fue generada por el modelo automático de cribado y una plantilla estándar; "
+            "es un resultado de cribado y debe ser confirmado por un médico."
+        ),
+        "labels": {
+            "age": "Edad", "gender": "Sexo", "chest_pain": "Tipo de dolor torácico", "bp": "Presión arterial en reposo",
+            "cholesterol": "Colesterol sérico", "blood_sugar": "Glucosa en ayunas > 120 mg/dl",
+            "electrocardiographic": "ECG en reposo", "heart_rate": "Frecuencia cardíaca máxima",
+            "exercise_angina": "Angina inducida por ejercicio", "oldpeak": "Depresión del ST (oldpeak)",
+            "slope": "Pendiente del segmento ST",
+        },
+        "values": {
+            "gender": ["Mujer", "Hombre"],
+            "chest_pain": ["Angina típica", "Angina atípica", "Dolor no anginoso", "Asintomático"],
+            "yes_no": ["No", "Sí"],
+            "electrocardiographic": ["Normal", "Anomalía de la onda ST-T", "Hipertrofia ventricular izquierda"],
+            "slope": ["Ascendente", "Plana", "Descendente"],
+        },
+        "status": {"normal": "en rango", "elevated": "elevada", "high": "alta", "abnormal": "anormal", "reduced": "reducida"},
+        "years": "años",
+        "factors": {
+            "age": "La edad de {age} años aumenta el riesgo cardiovascular basal",
+            "male": "El sexo masculino se asocia a una aparición más temprana de enfermedad coronaria",
+            "chest_pain": "La presentación asintomática puede ocultar isquemia silente",
+            "bp": "La presión arterial en reposo de {bp} mm Hg supera el objetivo recomendado",
+            "cholesterol": "El colesterol sérico de {cholesterol} mg/dl supera el nivel deseable",
+            "blood_sugar": "La glucosa en ayunas elevada sugiere un control glucémico alterado",
+            "electrocardiographic": "El ECG en reposo muestra cambios que requieren revisión",
+            "heart_rate": "Una frecuencia cardíaca máxima de {heart_rate} lpm indica menor capacidad de ejercicio",
+            "exercise_angina": "La angina durante el ejercicio sugiere isquemia de esfuerzo",
+            "oldpeak": "Una depresión del ST de {oldpeak} mm durante el ejercicio es significativa",
+            "slope": "Un segmento ST plano o descendente se asocia a isquemia",
+        },
+        "modifiable": "Factores de riesgo modificables",
+        "non_modifiable": "Factores de riesgo no modificables",
+        "other": "Otros hallazgos clínicos",
+        "none": "Ninguno identificado",
+        "comparison": {
+            "low": "En comparación con la población general de la misma edad, el riesgo parece promedio o inferior.",
+            "moderate": "En comparación con la población general de la misma edad, el riesgo parece moderadamente aumentado.",
+            "high": "En comparación con la población general de la misma edad, el riesgo parece claramente aumentado.",
+        },
+        "differentials": [
+            "Angina estable o inestable y enfermedad arterial coronaria",
+            "Cardiopatía hipertensiva e hipertrofia ventricular izquierda",
+            "Arritmias y valvulopatías",
+            "Afecciones cardíacas relacionadas con el estrés, como la miocardiopatía por estrés",
+            "Causas no cardíacas de síntomas torácicos: reflujo gastroesofágico, dolor musculoesquelético, ansiedad",
+        ],
+        "immediate": [
+            "Revise este resultado con un médico, idealmente un cardiólogo",
+            "Controle la presión arterial y la frecuencia cardíaca en reposo en casa y anote los valores",
+            "Evite el esfuerzo intenso hasta que un médico lo autorice",
+            "Consulte con su médico sobre clases generales de medicamentos (p. ej., hipolipemiantes, antihipertensivos)",
+        ],
+        "preventive": [
+            "Siga una dieta cardiosaludable rica en verduras, cereales integrales y pescado; limite la sal y las grasas saturadas",
+            "Procure al menos 150 minutos semanales de actividad moderada una vez autorizado",
+            "Deje de fumar y limite el alcohol",
+            "Practique el manejo del estrés y duerma de 7 a 9 horas",
+        ],
+        "long_term": [
+            "Repita el perfil lipídico, la glucosa en ayunas y la presión arterial según lo programado",
+            "Registre peso, perímetro abdominal, presión arterial y nivel de actividad",
+            "Considere una consulta especializada para prueba de esfuerzo o ecocardiograma",
+        ],
+        "follow_up": {
+            "low": "Revisión rutinaria en 12 meses",
+            "moderate": "Revisión clínica en un plazo de 3 meses",
+            "high": "Revisión clínica en un plazo de 2 a 4 semanas",
+        },
+        "warning": "Acuda a urgencias ante dolor torácico en reposo, falta de aire, desmayos o palpitaciones",
+        "tests": "Pruebas recomendadas: ECG, perfil lipídico, HbA1c y, si se indica, prueba de esfuerzo",
+        "tracking": "Lleve un registro de síntomas, mediciones y medicamentos para compartir en cada visita",
+    },
+    "french": {
+        "title": "Rapport Diagnostique",
+        "sections": [
+            "Résumé de la Prédiction", "Analyse Clinique", "Évaluation des Facteurs de Risque",
+            "Considérations Différentielles", "Recommandations de Prise en Charge", "Protocole de Suivi",
+        ],
+        "subsections": ["Actions Immédiates", "Mesures Préventives", "Prise en Charge à Long Terme"],
+        "verdict": {1: "maladie cardiaque probable", 0: "maladie cardiaque peu probable"},
+        "risk_level": {"low": "faible", "moderate": "modéré", "high": "élevé"},
+        "summary": (
+            "Le modèle de prédiction a classé ce patient comme **{verdict}**. "
+            "{count} des 11 indicateurs cliniques sont hors de leurs valeurs de référence, ce qui correspond à un "
+            "profil de **risque {risk}**."
+        ),
+        "confidence": (
+            "Cette évaluation a été produite par le modèle de dépistage automatisé et un modèle de texte standard ; "
+            "il s'agit d'un résultat de dépistage qui doit être confirmé par un médecin."
+        ),
+        "labels": {
+            "age": "Âge", "gender": "Sexe", "chest_pain": "Type de douleur thoracique", "bp": "Pression artérielle au repos",
+            "cholesterol": "Cholestérol sérique", "blood_sugar": "Glycémie à jeun > 120 mg/dl",
+            "electrocardiographic": "ECG au repos", "heart_rate": "Fréquence cardiaque maximale",
+            "exercise_angina": "Angine d'effort", "oldpeak": "Sous-décalage du ST (oldpeak)",
+            "slope": "Pente du segment ST",
+        },
+        "values": {
+            "gender": ["Femme", "Homme"],
+            "chest_pain": ["Angine typique", "Angine atypique", "Douleur non angineuse", "Asymptomatique"],
+            "yes_no": ["Non", "Oui"],
+            "electrocardiographic": ["Normal", "Anomalie de l'onde ST-T", "Hypertrophie ventriculaire gauche"],
+            "slope": ["Ascendante", "Plate", "Descendante"],
+        },
+        "status": {"normal": "dans les normes", "elevated": "élevée", "high": "haute", "abnormal": "anormal", "reduced": "réduite"},
+        "years": "ans",
+        "factors": {
+            "age": "Un âge de {age} ans augmente le risque cardiovasculaire de base",
+            "male": "Le sexe masculin est associé à une survenue plus précoce de la maladie coronarienne",
+            "chest_pain": "Une présentation asymptomatique peut masquer une ischémie silencieuse",
+            "bp": "Une pression artérielle au repos de {bp} mm Hg dépasse l'objectif recommandé",
+            "cholesterol": "Un cholestérol sérique de {cholesterol} mg/dl dépasse le niveau souhaitable",
+            "blood_sugar": "Une glycémie à jeun élevée suggère un contrôle glycémique altéré",
+            "electrocardiographic": "L'ECG au repos montre des anomalies à examiner",
+            "heart_rate": "Une fréquence cardiaque maximale de {heart_rate} bpm indique une capacité d'effort réduite",
+            "exercise_angina": "Une angine à l'effort suggère une ischémie d'effort",
+            "oldpeak": "Un sous-décalage du ST de {oldpeak} mm à l'effort est significatif",
+            "slope": "Un segment ST plat ou descendant est associé à une ischémie",
+        },
+        "modifiable": "Facteurs de risque modifiables",
+        "non_modifiable": "Facteurs de risque non modifiables",
+        "other": "Autres éléments cliniques",
+        "none": "Aucun identifié",
+        "comparison": {
+            "low": "Par rapport à la population générale du même âge, le risque paraît moyen ou inférieur.",
+            "moderate": "Par rapport à la population générale du même âge, le risque paraît modérément augmenté.",
+            "high": "Par rapport à la population générale du même âge, le risque paraît nettement augmenté.",
+        },
+        "differentials": [
+            "Angine stable ou instable et maladie coronarienne",
+            "Cardiopathie hypertensive et hypertrophie ventriculaire gauche",
+            "Arythmies et valvulopathies",
+            "Affections cardiaques liées au stress, comme la cardiomyopathie de stress",
+            "Causes non cardiaques des symptômes thoraciques : reflux gastro-œsophagien, douleur musculo-squelettique, anxiété",
+        ],
+        "immediate": [
+            "Examinez ce résultat avec un médecin, idéalement un cardiologue",
+            "Surveillez la pression artérielle et la fréquence cardiaque au repos à domicile et notez les valeurs",
+            "Évitez les efforts intenses jusqu'à l'avis d'un médecin",
+            "Discutez avec votre médecin des classes générales de médicaments (hypolipémiants, antihypertenseurs)",
+        ],
+        "preventive": [
+            "Adoptez une alimentation riche en légumes, céréales complètes et poisson ; limitez le sel et les graisses saturées",
+            "Visez au moins 150 minutes d'activité modérée par semaine après accord médical",
+            "Arrêtez de fumer et limitez l'alcool",
+            "Pratiquez la gestion du stress et dormez 7 à 9 heures",
+        ],
+        "long_term": [
+            "Répétez le bilan lipidique, la glycémie à jeun et la pression artérielle selon le calendrier",
+            "Suivez le poids, le tour de taille, la pression artérielle et le niveau d'activité",
+            "Envisagez une consultation spécialisée pour un test d'effort ou une échocardiographie",
+        ],
+        "follow_up": {
+            "low": "Contrôle de routine dans 12 mois",
+            "moderate": "Consultation clinique dans les 3 mois",
+            "high": "Consultation clinique dans les 2 à 4 semaines",
+        },
+        "warning": "Consultez en urgence en cas de douleur thoracique au repos, d'essoufflement, de malaise ou de palpitations",
+        "tests": "Examens recommandés : ECG, bilan lipidique, HbA1c et, si indiqué, test d'effort",
+        "tracking": "Tenez un carnet des symptômes, mesures et médicaments à présenter à chaque visite",
+    },
+    "german": {
+        "title": "Diagnosebericht",
+        "sections": [
+            "Zusammenfassung der Vorhersage", "Klinische Analyse", "Bewertung der Risikofaktoren",
+            "Differentialdiagnostische Überlegungen", "Behandlungsempfehlungen", "Nachsorgeprotokoll",
+        ],
+        "subsections": ["Sofortmaßnahmen", "Präventive Maßnahmen", "Langfristiges Management"],
+        "verdict": {1: "Herzerkrankung wahrscheinlich", 0: "Herzerkrankung unwahrscheinlich"},
+        "risk_level": {"low": "niedriges", "moderate": "mittleres", "high": "hohes"},
+        "summary": (
+            "Das Vorhersagemodell hat diesen Patienten als **{verdict}** eingestuft. "
+            "{count} der 11 klinischen Indikatoren liegen außerhalb ihrer Referenzbereiche, was insgesamt ein "
+            "**{risk} Risiko** ergibt."
+        ),
+        "confidence": (
+            "Diese Einschätzung wurde vom automatisierten Screening-Modell und einer Standardvorlage erstellt; "
+            "es handelt sich um ein Screening-Ergebnis, das ärztlich bestätigt werden muss."
+        ),
+        "labels": {
+            "age": "Alter", "gender": "Geschlecht", "chest_pain": "Art des Brustschmerzes", "bp": "Ruheblutdruck",
+            "cholesterol": "Serumcholesterin", "blood_sugar": "Nüchternblutzucker > 120 mg/dl",
+            "electrocardiographic": "Ruhe-EKG", "heart_rate": "Maximale Herzfrequenz",
+            "exercise_angina": "Belastungsangina", "oldpeak": "ST-Senkung (Oldpeak)",
+            "slope": "Verlauf der ST-Strecke",
+        },
+        "values": {
+            "gender": ["Weiblich", "Männlich"],
+            "chest_pain": ["Typische Angina", "Atypische Angina", "Nicht-anginöser Schmerz", "Asymptomatisch"],
+            "yes_no": ["Nein", "Ja"],
+            "electrocardiographic": ["Normal", "ST-T-Wellen-Anomalie", "Linksventrikuläre Hypertrophie"],
+            "slope": ["Aufsteigend", "Flach", "Absteigend"],
+        },
+        "status": {"normal": "im Normbereich", "elevated": "erhöht", "high": "hoch", "abnormal": "auffällig", "reduced": "vermindert"},
+        "years": "Jahre",
+        "factors": {
+            "age": "Ein Alter von {age} Jahren erhöht das kardiovaskuläre Grundrisiko",
+            "male": "Männliches Geschlecht ist mit einem früheren Auftreten der koronaren Herzkrankheit verbunden",
+            "chest_pain": "Eine asymptomatische Präsentation kann eine stumme Ischämie verdecken",
+            "bp": "Ein Ruheblutdruck von {bp} mm Hg liegt über dem empfohlenen Zielwert",
+            "cholesterol": "Ein Serumcholesterin von {cholesterol} mg/dl liegt über dem wünschenswerten Wert",
+            "blood_sugar": "Ein erhöhter Nüchternblutzucker deutet auf eine gestörte Glukosekontrolle hin",
+            "electrocardiographic": "Das Ruhe-EKG zeigt abklärungsbedürftige Veränderungen",
+            "heart_rate": "Eine maximale Herzfrequenz von {heart_rate} Schlägen/min deutet auf eine verminderte Belastbarkeit hin",
+            "exercise_angina": "Angina bei Belastung spricht für eine belastungsabhängige Ischämie",
+            "oldpeak": "Eine ST-Senkung von {oldpeak} mm unter Belastung ist signifikant",
+            "slope": "Eine flache oder absteigende ST-Strecke ist mit Ischämie assoziiert",
+        },
+        "modifiable": "Beeinflussbare Risikofaktoren",
+        "non_modifiable": "Nicht beeinflussbare Risikofaktoren",
+        "other": "Weitere klinische Befunde",
+        "none": "Keine festgestellt",
+        "comparison": {
+            "low": "Im Vergleich zur Allgemeinbevölkerung gleichen Alters erscheint das Risiko durchschnittlich oder niedriger.",
+            "moderate": "Im Vergleich zur Allgemeinbevölkerung gleichen Alters erscheint das Risiko mäßig erhöht.",
+            "high": "Im Vergleich zur Allgemeinbevölkerung gleichen Alters erscheint das Risiko deutlich erhöht.",
+        },
+        "differentials": [
+            "Stabile oder instabile Angina pectoris und koronare Herzkrankheit",
+            "Hypertensive Herzkrankheit und linksventrikuläre Hypertrophie",
+            "Herzrhythmusstörungen und Herzklappenerkrankungen",
+            "Stressbedingte Herzerkrankungen wie die Stress-Kardiomyopathie",
+            "Nicht-kardiale Ursachen von Brustbeschwerden: Refluxkrankheit, muskuloskelettale Schmerzen, Angst",
+        ],
+        "immediate": [
+            "Besprechen Sie dieses Ergebnis mit einem Arzt, idealerweise einem Kardiologen",
+            "Messen Sie Blutdruck und Ruhepuls zu Hause und notieren Sie die Werte",
+            "Vermeiden Sie starke körperliche Belastung bis zur ärztlichen Freigabe",
+            "Besprechen Sie allgemeine Medikamentenklassen (z. B. Lipidsenker, Blutdrucksenker) mit Ihrem Arzt",
+        ],
+        "preventive": [
+            "Ernähren Sie sich herzgesund mit viel Gemüse, Vollkorn und Fisch; begrenzen Sie Salz und gesättigte Fette",
+            "Streben Sie nach ärztlicher Freigabe mindestens 150 Minuten moderate Bewegung pro Woche an",
+            "Hören Sie mit dem Rauchen auf und begrenzen Sie Alkohol",
+            "Üben Sie Stressbewältigung und schlafen Sie 7-9 Stunden",
+        ],
+        "long_term": [
+            "Lassen Sie Lipidprofil, Nüchternblutzucker und Blutdruck planmäßig kontrollieren",
+            "Dokumentieren Sie Gewicht, Taillenumfang, Blutdruck und Aktivität",
+            "Erwägen Sie eine fachärztliche Abklärung mit Belastungstest oder Echokardiographie",
+        ],
+        "follow_up": {
+            "low": "Routinekontrolle in 12 Monaten",
+            "moderate": "Klinische Kontrolle innerhalb von 3 Monaten",
+            "high": "Klinische Kontrolle innerhalb von 2-4 Wochen",
+        },
+        "warning": "Suchen Sie bei Brustschmerzen in Ruhe, Atemnot, Ohnmacht oder Herzrasen sofort die Notaufnahme auf",
+        "tests": "Empfohlene Untersuchungen: EKG, Lipidprofil, HbA1c und ggf. ein Belastungstest",
+        "tracking": "Führen Sie ein Protokoll über Beschwerden, Messwerte und Medikamente für jeden Arztbesuch",
+    },
+}
+
+# Grouping of the risk factors flagged by identify_risk_factors
+_MODIFIABLE = ("bp", "cholesterol", "blood_sugar")
+_NON_MODIFIABLE = ("age", "male")
+_OTHER = ("chest_pain", "electrocardiographic", "heart_rate", "exercise_angina", "oldpeak", "slope")
+
+
+def _number(value: Any) -> float:
+    return float(value) if value is not None else 0.0
+
+
+def _choice(options: List[str], value: Any) -> str:
+    index = int(_number(value))
+    return options[index] if 0 <= index < len(options) else str(value)
+
+
+def identify_risk_factors(clinical_data: Dict[str, Any]) -> List[str]:
+    """Return the keys of the risk factors present in the clinical data."""
+    age = _number(clinical_data.get("age"))
+    checks = {
+        "age": age >= 55,
+        "male": int(_number(clinical_data.get("gender"))) == 1,
+        "chest_pain": int(_number(clinical_data.get("chest_pain"))) == 3,
+        "bp": _number(clinical_data.get("bp")) >= 140,
+        "cholesterol": _number(clinical_data.get("cholesterol")) >= 240,
+        "blood_sugar": int(_number(clinical_data.get("blood_sugar"))) == 1,
+        "electrocardiographic": int(_number(clinical_data.get("electrocardiographic"))) in (1, 2),
+        "heart_rate": _number(clinical_data.get("heart_rate")) < 0.7 * (220 - age),
+        "exercise_angina": int(_number(clinical_data.get("exercise_angina"))) == 1,
+        "oldpeak": _number(clinical_data.get("oldpeak")) >= 2.0,
+        "slope": int(_number(clinical_data.get("slope"))) in (1, 2),
+    }
+    return [name for name, present in checks.items() if present]
+
+
+def _risk_level(ml_result: int, factor_count: int) -> str:
+    if ml_result == 1 and factor_count >= 4:
+        return "high"
+    if ml_result == 1 or factor_count >= 3:
+        return "moderate"
+    return "low"
+
+
+def get_template(language: str) -> Dict[str, Any]:
+    """Strings for ``language``, falling back to English for languages without a template."""
+    template = TEMPLATES.get(language.strip().casefold())
+    if template is None:
+        logger.info("No local report template for '%s', using English", language)
+        template = TEMPLATES["english"]
+    return template
+
+
+def generate_template_report(clinical_data: Dict[str, Any], ml_result: int, language: str = "English") -> str:
+    """
+    Build the six-section markdown report locally, without calling the LLM.
+
+    Args:
+        clinical_data: The 11 clinical features
+        ml_result: Model verdict (0 or 1)
+        language: Report language; unsupported languages fall back to English
+
+    Returns:
+        str: Markdown report using the heading levels required by the LLM prompt
+    """
+    t = get_template(language)
+    factors = identify_risk_factors(clinical_data)
+    level = _risk_level(ml_result, len(factors))
+    values = dict(clinical_data)
+    status = t["status"]
+    labels = t["labels"]
+    options = t["values"]
+
+    def bullets(items: List[str]) -> List[str]:
+        return [f"- {item}" for item in items]
+
+    def factor_lines(keys) -> List[str]:
+        present = [t["factors"][key].format(**values) for key in keys if key in factors]
+        return bullets(present) if present else [f"- {t['none']}"]
+
+    bp = _number(clinical_data.get("bp"))
+    analysis = [
+        f"- **{labels['age']}:** {clinical_data.get('age')} {t['years']}",
+        f"- **{labels['gender']}:** {_choice(options['gender'], clinical_data.get('gender'))}",
+        f"- **{labels['chest_pain']}:** {_choice(options['chest_pain'], clinical_data.get('chest_pain'))}",
+        f"- **{labels['bp']}:** {clinical_data.get('bp')} mm Hg "
+        f"({status['high'] if bp >= 140 else status['elevated'] if bp >= 130 else status['normal']})",
+        f"- **{labels['cholesterol']}:** {clinical_data.get('cholesterol')} mg/dl "
+        f"({status['high'] if 'cholesterol' in factors else status['normal']})",
+        f"- **{labels['blood_sugar']}:** {_choice(options['yes_no'], clinical_data.get('blood_sugar'))}",
+        f"- **{labels['electrocardiographic']}:** {_choice(options['electrocardiographic'], clinical_data.get('electrocardiographic'))}",
+        f"- **{labels['heart_rate']}:** {clinical_data.get('heart_rate')} bpm "
+        f"({status['reduced'] if 'heart_rate' in factors else status['normal']})",
+        f"- **{labels['exercise_angina']}:** {_choice(options['yes_no'], clinical_data.get('exercise_angina'))}",
+        f"- **{labels['oldpeak']}:** {clinical_data.get('oldpeak')} mm "
+        f"({status['abnormal'] if 'oldpeak' in factors else status['normal']})",
+        f"- **{labels['slope']}:** {_choice(options['slope'], clinical_data.get('slope'))}",
+    ]
+
+    sections = t["sections"]
+    subsections = t["subsections"]
+    lines = [
+        f"# {t['title']}",
+        "",
+        f"## 1. {sections[0]}",
+        t["summary"].format(verdict=t["verdict"][1 if ml_result == 1 else 0], count=len(factors), risk=t["risk_level"][level]),
+        "",
+        t["confidence"],
+        "",
+        f"## 2. {sections[1]}",
+        *analysis,
+        "",
+        f"## 3. {sections[2]}",
+        f"**{t['modifiable']}:**",
+        *factor_lines(_MODIFIABLE),
+        "",
+        f"**{t['non_modifiable']}:**",
+        *factor_lines(_NON_MODIFIABLE),
+        "",
+        f"**{t['other']}:**",
+        *factor_lines(_OTHER),
+        "",
+        t["comparison"][level],
+        "",
+        f"## 4. {sections[3]}",
+        *bullets(t["differentials"]),
+        "",
+        f"## 5. {sections[4]}",
+        f"### A. {subsections[0]}",
+        *bullets(t["immediate"]),
+        "",
+        f"### B. {subsections[1]}",
+        *bullets(t["preventive"]),
+        "",
+        f"### C. {subsections[2]}",
+        *bullets(t["long_term"]),
+        "",
+        f"## 6. {sections[5]}",
+        f"- **{t['follow_up'][level]}**",
+        f"- **{t['warning']}**",
+        f"- {t['tests']}",
+        f"- {t['tracking']}",
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,77 @@
+import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
+
+
+class ClinicalFeatures(BaseModel):
+    """
+    The 11 clinical features scored by the model, in model input order.
+
+    Ranges match the prediction form; anything outside them is rejected before
+    it reaches the scaler or the LLM. Numeric strings are accepted for
+    compatibility with older clients; booleans are not numbers here.
+    """
+
+    age: int = Field(..., ge=1, le=120)
+    gender: int = Field(..., ge=0, le=1)
+    chest_pain: int = Field(..., ge=0, le=3)
+    bp: int = Field(..., ge=80, le=220)
+    cholesterol: int = Field(..., ge=100, le=600)
+    blood_sugar: int = Field(..., ge=0, le=1)
+    electrocardiographic: int = Field(..., ge=0, le=2)
+    heart_rate: int = Field(..., ge=60, le=220)
+    exercise_angina: int = Field(..., ge=0, le=1)
+    oldpeak: float = Field(..., ge=0, le=10)
+    slope: int = Field(..., ge=0, le=2)
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def reject_booleans(cls, value: Any) -> Any:
+        if isinstance(value, bool):
+            raise ValueError("Input should be a number, not a boolean")
+        return value
+
+    def to_vector(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Write the features into a float32 model input vector, allocated if ``out`` is omitted."""
+        if out is None:
+            out = np.empty(len(type(self).model_fields), dtype=np.float32)
+        # Declared fields are stored in declaration (model input) order
+        out[:] = tuple(self.__dict__.values())
+        return out
+
+
+class PredictionRequest(BaseModel):
+    """JSON body of ``POST /api/predict``, mirroring the fields of the form request."""
+
+    clinical_data: ClinicalFeatures
+    language: str = Field("English", max_length=32)
+    background: bool = False
+
+
+class PredictionSummary(BaseModel):
+    """One row of the prediction history, without the report text."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    created_at: datetime.datetime
+    clinical_features: Dict[str, Any]
+    clinical_model_result: Optional[bool]
+    model_version: Optional[str]
+    language: Optional[str]
+    report_status: str
+    report_source: Optional[str]
+    has_report: bool
+
+
+class PredictionPage(BaseModel):
+    """Response of ``GET /api/user/predictions``."""
+
+    predictions: List[PredictionSummary]
+    next_cursor: Optional[str] = None
+
+
+# Encodes history rows straight to JSON bytes in pydantic-core, skipping jsonable_encoder
+PredictionSummaryList = TypeAdapter(List[PredictionSummary])
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .config import SCORE_CACHE_ENABLED, SCORE_CACHE_MAX_ENTRIES
+from .metrics import Counter, snapshot_all
+
+
+def make_score_key(row: np.ndarray, version: str) -> Tuple:
+    """
+    Canonical cache key for one feature row scored by one model version.
+
+    The row is the validated float64 feature vector, so ``1``, ``1.0`` and
+    ``"1"`` submitted for the same feature produce the same key.
+    """
+    return (version, *row.tolist())
+
+
+class ScoreCache:
+    """
+    Bounded LRU of model verdicts for repeated feature vectors.
+
+    Most clinical features are small integer codes, so clinics resubmit the
+    same vectors often; a hit returns the verdict without touching the scaler,
+    the micro-batcher or the model backend. Keys include the model version and
+    the cache is cleared whenever a model version is loaded.
+    """
+
+    def __init__(self, max_entries: int = SCORE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = Counter("score_cache_hits_total", "Model verdicts served from the score cache")
+        self.misses = Counter("score_cache_misses_total", "Feature vectors that had to be scored by the model")
+        self.evictions = Counter("score_cache_evictions_total", "Entries evicted from the score cache for capacity")
+        self.invalidations = Counter("score_cache_invalidations_total", "Times the score cache was cleared by a model load")
+
+    def get(self, key: Tuple) -> Optional[int]:
+        with self._lock:
+            verdict = self._entries.get(key)
+            if verdict is None:
+                self.misses.inc()
+                return None
+            self._entries.move_to_end(key)
+        self.hits.inc()
+        return verdict
+
+    def put(self, key: Tuple, verdict: int) -> None:
+        with self._lock:
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions.inc()
+
+    def clear(self) -> None:
+        """Drop every entry; called when a model version is loaded."""
+        with self._lock:
+            self._entries.clear()
+        self.invalidations.inc()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size."""
+        return snapshot_all(
+            {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            },
+            extra={
+                "enabled": True,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+        )
+
+
+# Shared cache instance, or None when caching is disabled
+score_cache: Optional[ScoreCache] = ScoreCache() if SCORE_CACHE_ENABLED and SCORE_CACHE_MAX_ENTRIES > 0 else None
+
+
+def get_score_cache_stats() -> Dict[str, Any]:
+    """Get score cache counters, or a disabled marker if caching is off"""
+    if score_cache is None:
+        return {"enabled": False}
+    return score_cache.stats()
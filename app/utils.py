@@ -0,0 +1,70 @@
+import asyncio
+import csv
+import io
+from typing import Any, Awaitable, Dict, List, TypeVar
+
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away before its request finished."""
+
+
+def _parse_number(value: str) -> Any:
+    """Convert a CSV cell to int or float, leaving blanks and text untouched."""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() and "." not in value else number
+
+
+def parse_clinical_csv(content: str) -> List[Dict[str, Any]]:
+    """
+    Parse a CSV upload of clinical features into a list of records.
+
+    Args:
+        content: CSV text with a header row naming the clinical features
+
+    Returns:
+        List[Dict[str, Any]]: One dict per data row with numeric cells converted
+    """
+    reader = csv.DictReader(io.StringIO(content.lstrip("\ufeff")))
+    return [
+        {key.strip(): _parse_number(value or "") for key, value in row.items() if key}
+        for row in reader
+    ]
+
+
+async def run_until_disconnected(request: Request, awaitable: Awaitable[T], poll_interval: float = 0.5) -> T:
+    """
+    Await ``awaitable`` but cancel it as soon as the client disconnects.
+
+    Args:
+        request: Incoming request whose connection is watched
+        awaitable: Work to run on behalf of the request
+        poll_interval: Seconds between disconnect checks
+
+    Returns:
+        The awaitable's result
+
+    Raises:
+        ClientDisconnected: If the client disconnected first; the work is cancelled
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
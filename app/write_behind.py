@@ -0,0 +1,302 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from .config import (
+    WRITE_BEHIND_ENABLED, WRITE_BEHIND_MAX_BATCH, WRITE_BEHIND_MAX_WAIT_MS, WRITE_BEHIND_DURABILITY
+)
+from .database import engine as default_engine
+from .metrics import Counter, Histogram, snapshot_all
+from .models import Prediction
+
+# Bucket bounds for the exposed histograms
+FLUSH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
+
+_STOP = object()
+
+
+class _PendingWrite:
+    """A prediction waiting to be inserted, together with its result future."""
+
+    __slots__ = ("prediction", "future", "enqueued_at")
+
+    def __init__(self, prediction: Prediction):
+        self.prediction = prediction
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class PredictionWriter:
+    """
+    Group-commits ``Prediction`` inserts from concurrent requests.
+
+    Callers submit new (transient) predictions from any thread or, via
+    ``asyncio.wrap_future``, from the event loop. A background thread waits at
+    most ``max_wait_ms`` after the first row for up to ``max_batch_size`` rows,
+    inserts them in one transaction and resolves each future with the stored
+    prediction, its id assigned. One commit, and so one fsync, covers the batch.
+
+    Durability ``full`` keeps the engine's commit guarantees. ``relaxed`` lets
+    the writer's transactions skip the flush to disk (SQLite ``synchronous=OFF``,
+    PostgreSQL ``synchronous_commit=off``): a crash may lose the most recent
+    commits but never corrupts the database.
+    """
+
+    def __init__(
+        self,
+        engine=default_engine,
+        max_batch_size: int = 128,
+        max_wait_ms: float = 10.0,
+        durability: str = "full",
+        name: str = "prediction-writer"
+    ):
+        """
+        Args:
+            engine: Engine the writer holds a dedicated connection to
+            max_batch_size: Maximum number of rows per transaction
+            max_wait_ms: Maximum time to hold the first queued row waiting for more
+            durability: ``full`` or ``relaxed``
+            name: Name of the worker thread
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if durability not in ("full", "relaxed"):
+            raise ValueError("durability must be 'full' or 'relaxed'")
+
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.durability = durability
+        self.name = name
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._connection = None
+
+        self.flush_size_histogram = Histogram(
+            "write_behind_flush_size", FLUSH_SIZE_BUCKETS, "Predictions inserted per transaction"
+        )
+        self.queue_wait_histogram = Histogram(
+            "write_behind_queue_wait_ms", LATENCY_BUCKETS_MS, "Time a prediction spent queued before its flush"
+        )
+        self.flush_duration_histogram = Histogram(
+            "write_behind_flush_ms", LATENCY_BUCKETS_MS, "Insert and commit time per flush"
+        )
+        self.flushes_total = Counter("write_behind_flushes_total", "Transactions committed by the writer")
+        self.rows_total = Counter("write_behind_rows_total", "Predictions stored by the writer")
+        self.failed_rows_total = Counter("write_behind_failed_rows_total", "Predictions that could not be stored")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the background writer thread if it is not already running."""
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            logger.info(
+                "Prediction writer started (max_batch_size=%d, max_wait_ms=%.1f, durability=%s)",
+                self.max_batch_size, self.max_wait * 1000, self.durability
+            )
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the writer after it has stored everything queued before the call."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+            logger.info("Prediction writer stopped")
+
+    def submit(self, prediction: Prediction) -> Future:
+        """
+        Queue a new prediction for the next group commit.
+
+        Args:
+            prediction: Transient Prediction, with any related ReportJob attached
+
+        Returns:
+            Future: Resolves to the stored (detached) prediction, or the insert error
+        """
+        if not self.running:
+            raise RuntimeError("Prediction writer is not running")
+        write = _PendingWrite(prediction)
+        self._queue.put(write)
+        return write.future
+
+    def stats(self) -> dict:
+        """Return flush-size and latency histograms plus row counters."""
+        return snapshot_all(
+            {
+                "flush_size": self.flush_size_histogram,
+                "queue_wait_ms": self.queue_wait_histogram,
+                "flush_ms": self.flush_duration_histogram,
+                "flushes_total": self.flushes_total,
+                "rows_total": self.rows_total,
+                "failed_rows_total": self.failed_rows_total,
+            },
+            extra={
+                "running": self.running,
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "durability": self.durability,
+            }
+        )
+
+    def _collect(self, first: _PendingWrite) -> Tuple[List[_PendingWrite], bool]:
+        """Gather rows for one transaction, starting from an already dequeued write."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stopping = self._collect(item)
+            self._process(batch)
+
+        # Store whatever is still queued so no caller is left waiting
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.max_batch_size):
+            self._process(remaining[start:start + self.max_batch_size])
+        self._disconnect()
+
+    def _connect(self):
+        """Dedicated connection, so relaxed durability settings never leak into the shared pool."""
+        if self._connection is None:
+            self._connection = self.engine.connect()
+            if self.durability == "relaxed":
+                if self.engine.dialect.name == "sqlite":
+                    self._connection.execute(text("PRAGMA synchronous=OFF"))
+                elif self.engine.dialect.name == "postgresql":
+                    self._connection.execute(text("SET synchronous_commit TO OFF"))
+                self._connection.commit()
+        return self._connection
+
+    def _disconnect(self, invalidate: bool = False) -> None:
+        if self._connection is None:
+            return
+        try:
+            if invalidate:
+                self._connection.invalidate()
+            self._connection.close()
+        except Exception:
+            logger.warning("Failed to close prediction writer connection", exc_info=True)
+        self._connection = None
+
+    def _insert(self, batch: List[_PendingWrite]) -> None:
+        """Insert and commit a batch in one transaction; raises if any row fails."""
+        # expire_on_commit=False keeps the assigned ids and defaults readable after the session closes
+        with Session(bind=self._connect(), expire_on_commit=False) as session:
+            try:
+                session.add_all([write.prediction for write in batch])
+                session.commit()
+                session.expunge_all()
+            except Exception:
+                session.rollback()
+                raise
+
+    def _process(self, batch: List[_PendingWrite]) -> None:
+        # Requests cancelled while queued (e.g. the client disconnected) are not stored
+        batch = [write for write in batch if write.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.monotonic()
+        for write in batch:
+            self.queue_wait_histogram.observe((started - write.enqueued_at) * 1000)
+
+        try:
+            self._insert(batch)
+        except Exception:
+            logger.error("Group commit of %s predictions failed, retrying them one by one", len(batch), exc_info=True)
+            self._disconnect(invalidate=True)
+            self._process_individually(batch)
+            return
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        self.flush_size_histogram.observe(len(batch))
+        self.flush_duration_histogram.observe(elapsed_ms)
+        self.flushes_total.inc()
+        self.rows_total.inc(len(batch))
+        for write in batch:
+            write.future.set_result(write.prediction)
+        logger.debug("Group-committed %d predictions in %.2f ms", len(batch), elapsed_ms)
+
+    @staticmethod
+    def _reset_keys(prediction: Prediction) -> None:
+        """
+        Forget keys flushed by a rolled-back transaction.
+
+        SQLAlchemy leaves them on the objects after a rollback, and retrying
+        with them could collide with ids assigned to other rows since.
+        """
+        prediction.id = None
+        if prediction.report_job is not None:
+            prediction.report_job.id = None
+            prediction.report_job.prediction_id = None
+
+    def _process_individually(self, batch: List[_PendingWrite]) -> None:
+        """Isolate a failing row so it does not take the rest of its batch down with it."""
+        for write in batch:
+            self._reset_keys(write.prediction)
+            started = time.monotonic()
+            try:
+                self._insert([write])
+            except Exception as e:
+                self._disconnect(invalidate=True)
+                self.failed_rows_total.inc()
+                write.future.set_exception(e)
+                continue
+            self.flush_size_histogram.observe(1)
+            self.flush_duration_histogram.observe((time.monotonic() - started) * 1000)
+            self.flushes_total.inc()
+            self.rows_total.inc()
+            write.future.set_result(write.prediction)
+
+
+# Shared writer, started by the application lifespan, or None when write-behind is off
+prediction_writer: Optional[PredictionWriter] = PredictionWriter(
+    max_batch_size=WRITE_BEHIND_MAX_BATCH,
+    max_wait_ms=WRITE_BEHIND_MAX_WAIT_MS,
+    durability=WRITE_BEHIND_DURABILITY
+) if WRITE_BEHIND_ENABLED else None
+
+
+def get_write_behind_stats() -> Dict[str, Any]:
+    """Get prediction writer metrics, or a disabled marker if write-behind is off"""
+    if prediction_writer is None:
+        return {"enabled": False}
+    return prediction_writer.stats()
@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.backends import reference_dataset
+from app.prediction import FEATURE_NAMES
+from .micro import run_micro_benchmarks, summarize_ms
+from .stub_llm import StubLLM, start_stub_server, server_port
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Relative weight of each route in the default mixed workload
+DEFAULT_MIX = {"token": 1, "predict": 3, "user_predictions": 4, "dashboard": 2}
+
+# Latency metrics compared against a baseline run
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse ``token=1,predict=3`` into route weights."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown route '{name}', expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def launch_app(port: int, llm_endpoint: str, workers: int = 1, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """
+    Start the application with uvicorn in a scratch directory.
+
+    The database and logs are created in the scratch directory, so benchmark
+    data never touches the development database.
+    """
+    workdir = tempfile.mkdtemp(prefix="hdp-bench-")
+    for name in ("final_models", "templates", "static"):
+        os.symlink(os.path.join(REPO_ROOT, name), os.path.join(workdir, name))
+
+    app_env = dict(os.environ)
+    app_env.setdefault("SECRET_KEY", "benchmark-secret")
+    app_env.setdefault("ALGORITHM", "HS256")
+    app_env.update(env or {})
+    app_env["GEMINI_API_ENDPOINT"] = llm_endpoint
+    app_env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, app_env.get("PYTHONPATH")]))
+
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=app_env
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, process: Optional[subprocess.Popen], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Application exited with code {process.returncode}")
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"Application was not ready after {timeout} seconds")
+
+
+async def create_users(client: httpx.AsyncClient, count: int) -> List[Dict[str, str]]:
+    """Sign up benchmark users (reusing existing ones) and log them in."""
+    suffix = datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    users = []
+    for index in range(count):
+        username = f"bench-{suffix}-{index}"
+        password = "benchmark-password"
+        response = await client.post("/api/signup", json={
+            "username": username, "email": f"{username}@example.com", "password": password
+        })
+        if response.status_code not in (200, 400):
+            response.raise_for_status()
+        token = await client.post("/api/token", data={"username": username, "password": password})
+        token.raise_for_status()
+        users.append({"username": username, "password": password, "token": token.json()["access_token"]})
+    return users
+
+
+class LoadGenerator:
+    """Closed-loop load generator: each virtual user issues requests back to back for the run duration."""
+
+    def __init__(self, client: httpx.AsyncClient, users: List[Dict[str, str]], mix: Dict[str, float], inputs: int = 256, seed: int = 0):
+        self.client = client
+        self.users = users
+        self.routes = [route for route, weight in mix.items() if weight > 0]
+        self.weights = [mix[route] for route in self.routes]
+        self.random = random.Random(seed)
+        self.samples: Dict[str, List[float]] = {route: [] for route in self.routes}
+        self.errors: Dict[str, int] = {route: 0 for route in self.routes}
+        # A bounded pool of distinct inputs, so the report cache sees a realistic mix of hits and misses
+        self.records = [dict(zip(FEATURE_NAMES, row)) for row in reference_dataset(inputs, seed).tolist()]
+
+    def _request(self, route: str, user: Dict[str, str]):
+        auth = {"Authorization": f"Bearer {user['token']}"}
+        if route == "token":
+            return self.client.post("/api/token", data={"username": user["username"], "password": user["password"]})
+        if route == "predict":
+            return self.client.post("/api/predict", headers=auth, data={
+                "clinical_data": json.dumps(self.random.choice(self.records)), "language": "English"
+            })
+        if route == "user_predictions":
+            return self.client.get("/api/user/predictions", headers=auth)
+        return self.client.get("/dashboard", headers=auth)
+
+    async def _virtual_user(self, deadline: float) -> None:
+        while time.monotonic() < deadline:
+            route = self.random.choices(self.routes, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await self._request(route, self.random.choice(self.users))
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if ok:
+                self.samples[route].append(elapsed_ms)
+            else:
+                self.errors[route] += 1
+
+    async def run(self, concurrency: int, duration: float) -> Dict[str, Any]:
+        started = time.monotonic()
+        await asyncio.gather(*(self._virtual_user(started + duration) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+        return {
+            route: {**summarize_ms(self.samples[route]), "errors": self.errors[route], "rps": round(len(self.samples[route]) / elapsed, 2)}
+            for route in self.routes
+        }
+
+
+def compare_with_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """List the latency metrics that got more than ``tolerance`` (fractional) slower than the baseline."""
+    regressions = []
+    sections = [("routes", name) for name in results.get("routes", {})] + [("micro", name) for name in ("preprocess", "predict")]
+    for section, name in sections:
+        current = results.get(section, {}).get(name) or {}
+        previous = baseline.get(section, {}).get(name) or {}
+        for metric in COMPARED_METRICS:
+            if metric in current and previous.get(metric):
+                change = current[metric] / previous[metric] - 1
+                if change > tolerance:
+                    regressions.append(f"{section}.{name}.{metric}: {previous[metric]:.3f} -> {current[metric]:.3f} ms (+{change:.0%})")
+    return regressions
+
+
+async def run_load_test(args) -> Dict[str, Any]:
+    stub_server = None
+    process = None
+    base_url = args.app_url
+    try:
+        if base_url is None:
+            stub = StubLLM(args.llm_latency_ms, args.llm_token_rate)
+            stub_server = start_stub_server(stub)
+            port = free_port()
+            process = launch_app(port, f"http://127.0.0.1:{server_port(stub_server)}", args.workers)
+            base_url = f"http://127.0.0.1:{port}"
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as client:
+            await wait_until_ready(client, process, args.startup_timeout)
+            users = await create_users(client, args.users)
+            generator = LoadGenerator(client, users, args.mix, args.inputs, args.seed)
+            return await generator.run(args.concurrency, args.duration)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if stub_server is not None:
+            stub_server.should_exit = True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test and micro-benchmarks for the prediction service")
+    parser.add_argument("--app-url", default=None, help="Benchmark a running server instead of launching one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the launched app")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load per run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Virtual users issuing requests concurrently")
+    parser.add_argument("--users", type=int, default=4, help="Distinct accounts used by the virtual users")
+    parser.add_argument("--inputs", type=int, default=256, help="Distinct clinical records sent to /api/predict")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Route weights, e.g. token=1,predict=3,user_predictions=4,dashboard=2")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="Stub LLM delay before the first token")
+    parser.add_argument("--llm-token-rate", type=float, default=200, help="Stub LLM tokens per second, 0 for instant")
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--micro-iterations", type=int, default=2000)
+    parser.add_argument("--skip-load", action="store_true", help="Only run the micro-benchmarks")
+    parser.add_argument("--skip-micro", action="store_true", help="Only run the load test")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed fractional slowdown versus the baseline")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+            "duration_seconds": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "mix": args.mix,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_token_rate": args.llm_token_rate,
+        }
+    }
+    if not args.skip_micro:
+        results["micro"] = run_micro_benchmarks(args.micro_iterations)
+    if not args.skip_load:
+        results["routes"] = asyncio.run(run_load_test(args))
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare_with_baseline(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,60 @@
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from app.backends import reference_dataset
+from app.config import INFERENCE_BACKEND
+from app.prediction import DataPreprocessor, ML_Model_Predictor
+
+
+def summarize_ms(samples_ms) -> Dict[str, float]:
+    """Count, mean and tail percentiles of a list of latencies in milliseconds."""
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if samples.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "count": int(samples.size),
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(samples.max()), 4),
+    }
+
+
+def time_calls(fn: Callable[[Any], Any], inputs, iterations: int, warmup: int = 50) -> Dict[str, float]:
+    """Time ``fn`` once per call over ``inputs`` (cycled), after a warm-up."""
+    for index in range(warmup):
+        fn(inputs[index % len(inputs)])
+    samples = []
+    for index in range(iterations):
+        started = time.perf_counter()
+        fn(inputs[index % len(inputs)])
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize_ms(samples)
+
+
+def run_micro_benchmarks(iterations: int = 2000, backend: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Benchmark ``DataPreprocessor.preprocess`` and ``ML_Model_Predictor.predict`` on single rows.
+
+    Args:
+        iterations: Timed calls per function
+        backend: Inference backend to load, defaults to ``INFERENCE_BACKEND``
+
+    Returns:
+        Dict[str, Any]: Latency summaries keyed by function name
+    """
+    backend = backend or INFERENCE_BACKEND
+    rows = reference_dataset(256)
+    preprocessor = DataPreprocessor()
+    predictor = ML_Model_Predictor(scaler=preprocessor.scaler, backend_name=backend)
+
+    model_inputs = rows if predictor.expects_raw_features else preprocessor.preprocess_batch(rows)
+    return {
+        "backend": backend,
+        "preprocess": time_calls(preprocessor.preprocess, [row.tolist() for row in rows], iterations),
+        "predict": time_calls(predictor.predict, list(model_inputs), iterations),
+    }
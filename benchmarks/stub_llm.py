@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import json
+import re
+import threading
+from typing import List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.report_templates import generate_template_report
+
+# Canned report returned for every prompt, sized like a real ~600 word Gemini answer
+SAMPLE_CLINICAL_DATA = {
+    "age": 63, "gender": 1, "chest_pain": 3, "bp": 145, "cholesterol": 233, "blood_sugar": 1,
+    "electrocardiographic": 0, "heart_rate": 150, "exercise_angina": 0, "oldpeak": 2.3, "slope": 0,
+}
+
+
+def _candidate(text: str, finished: bool) -> dict:
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return {"candidates": [candidate]}
+
+
+class StubLLM:
+    """
+    Local stand-in for the Gemini ``generateContent`` REST API.
+
+    Answers ``generateContent`` and ``streamGenerateContent`` with a
+    canned report after ``latency_ms``, emitting tokens at ``token_rate`` tokens
+    per second (0 sends everything at once). Point the app at it with
+    ``GEMINI_API_ENDPOINT=http://host:port``.
+    """
+
+    def __init__(self, latency_ms: float = 800, token_rate: float = 200, chunk_tokens: int = 8, report: Optional[str] = None):
+        self.latency = max(latency_ms, 0) / 1000.0
+        self.token_rate = token_rate
+        self.chunk_tokens = max(chunk_tokens, 1)
+        self.tokens: List[str] = re.findall(r"\S+\s*", report or generate_template_report(SAMPLE_CLINICAL_DATA, 1))
+        self.requests_total = 0
+        self.app = Starlette(routes=[Route("/v1beta/models/{target:path}", self.handle, methods=["POST"])])
+
+    def _token_delay(self, count: int) -> float:
+        return count / self.token_rate if self.token_rate > 0 else 0.0
+
+    async def handle(self, request: Request):
+        self.requests_total += 1
+        method = request.path_params["target"].rpartition(":")[2]
+        await request.body()
+        await asyncio.sleep(self.latency)
+
+        if method == "generateContent":
+            await asyncio.sleep(self._token_delay(len(self.tokens)))
+            return JSONResponse(_candidate("".join(self.tokens), True))
+        if method != "streamGenerateContent":
+            return JSONResponse({"error": {"code": 404, "message": f"Unsupported method {method}"}}, status_code=404)
+
+        # The Python SDK streams a JSON array over REST; other clients ask for server-sent events
+        sse = request.query_params.get("alt") == "sse"
+
+        async def events():
+            if not sse:
+                yield "["
+            for start in range(0, len(self.tokens), self.chunk_tokens):
+                chunk = self.tokens[start:start + self.chunk_tokens]
+                await asyncio.sleep(self._token_delay(len(chunk)))
+                payload = json.dumps(_candidate("".join(chunk), start + self.chunk_tokens >= len(self.tokens)))
+                if sse:
+                    yield f"data: {payload}\r\n\r\n"
+                else:
+                    yield payload if start == 0 else f",\r\n{payload}"
+            if not sse:
+                yield "]"
+
+        return StreamingResponse(events(), media_type="text/event-stream" if sse else "application/json")
+
+
+def start_stub_server(stub: StubLLM, host: str = "127.0.0.1", port: int = 0) -> uvicorn.Server:
+    """
+    Serve the stub on a background thread.
+
+    Returns:
+        uvicorn.Server: The running server; its bound port is in ``servers[0].sockets``
+    """
+    server = uvicorn.Server(uvicorn.Config(stub.app, host=host, port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, name="stub-llm", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Stub LLM server failed to start")
+        threading.Event().wait(0.05)
+    return server
+
+
+def server_port(server: uvicorn.Server) -> int:
+    return server.servers[0].sockets[0].getsockname()[1]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=800, help="Delay before the first token")
+    parser.add_argument("--token-rate", type=float, default=200, help="Tokens per second, 0 for instant")
+    parser.add_argument("--chunk-tokens", type=int, default=8, help="Tokens per streamed chunk")
+    args = parser.parse_args(argv)
+
+    stub = StubLLM(args.latency_ms, args.token_rate, args.chunk_tokens)
+    uvicorn.run(stub.app, host=args.host, port=args.port, log_level="warning", lifespan="off")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
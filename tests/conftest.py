@@ -0,0 +1,103 @@
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+# The settings are read once at import time, and files (final_models, templates,
+# static, logs) are resolved from the working directory, so both are prepared
+# before anything from app is imported
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="heart-disease-tests-")
+for name in ("final_models", "templates", "static"):
+    os.symlink(os.path.join(ROOT, name), os.path.join(WORKDIR, name))
+os.chdir(WORKDIR)
+sys.path.insert(0, ROOT)
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(WORKDIR, 'test.db')}",
+    "MODEL_REGISTRY_DIR": os.path.join(WORKDIR, "versions"),
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "LLM_OFFLINE": "true",
+    "INFERENCE_BACKEND": "numpy",
+    "STARTUP_MODE": "blocking",
+    "BCRYPT_ROUNDS": "4",
+    "LOG_ASYNC": "false",
+    "LOG_LEVEL": "WARNING",
+    "ADMIN_USERNAMES": "admin",
+})
+
+from app import prediction  # noqa: E402
+from app.auth import CurrentUser, get_current_user  # noqa: E402
+from app.config import MODEL_REGISTRY_DIR, MODELS_DIR  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import upgrade  # noqa: E402
+from app.model_registry import MODEL_FILE, SCALER_FILE  # noqa: E402
+from app.models import User  # noqa: E402
+
+# A valid record inside every range of ClinicalFeatures
+CLINICAL_DATA = {
+    "age": 54, "gender": 1, "chest_pain": 2, "bp": 130, "cholesterol": 246, "blood_sugar": 0,
+    "electrocardiographic": 1, "heart_rate": 150, "exercise_angina": 0, "oldpeak": 1.0, "slope": 1,
+}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    upgrade(engine)
+    yield engine
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(user):
+    """An API client signed in as ``user``; the app lifespan (model loading, job queue) is not run."""
+    app.dependency_overrides[get_current_user] = lambda: CurrentUser(
+        id=user.id, username=user.username, email=user.email, is_active=True
+    )
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def user(db):
+    """A fresh active user, so tests never share prediction history."""
+    name = f"user-{uuid.uuid4().hex[:12]}"
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def publish(registry_dir: str, version: str) -> str:
+    """Publish a copy of the base model as a registry version."""
+    path = os.path.join(registry_dir, version)
+    os.makedirs(path)
+    for name in (MODEL_FILE, SCALER_FILE):
+        shutil.copy(os.path.join(MODELS_DIR, name), path)
+    return path
+
+
+@pytest.fixture
+def registry():
+    """The configured model registry, emptied again afterwards so other tests serve the base version."""
+    # Models loaded by earlier tests were resolved before anything was published
+    prediction.clear_models()
+    os.makedirs(MODEL_REGISTRY_DIR, exist_ok=True)
+    yield MODEL_REGISTRY_DIR
+    prediction.clear_models()
+    shutil.rmtree(MODEL_REGISTRY_DIR)
@@ -0,0 +1,139 @@
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import app.auth as auth
+from app.auth import CurrentUser, PrincipalCache, authenticate_token, create_access_token, principal_cache
+from app.database import SessionLocal
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Count the users queries made by authenticate_token."""
+    calls = []
+    get_user = auth.get_user
+
+    def counting_get_user(db, username):
+        calls.append(username)
+        return get_user(db, username)
+
+    monkeypatch.setattr(auth, "get_user", counting_get_user)
+    principal_cache.clear()
+    yield calls
+    principal_cache.clear()
+
+
+@pytest.fixture
+def token(user):
+    return create_access_token({"sub": user.username})
+
+
+def test_verified_tokens_are_served_from_the_cache(db, user, token, lookups):
+    assert authenticate_token(db, token).username == user.username
+    assert authenticate_token(db, token).username == user.username
+    assert lookups == [user.username]
+
+
+def test_deactivating_a_user_drops_their_cached_tokens(db, user, token, lookups):
+    authenticate_token(db, token)
+    user.is_active = False
+    db.commit()
+
+    with pytest.raises(HTTPException) as error:
+        authenticate_token(db, token)
+    assert error.value.status_code == 403
+    assert len(lookups) == 2
+
+
+def test_tokens_cached_between_flush_and_commit_are_dropped(db, user, token, lookups):
+    user.is_active = False
+    db.flush()
+    # A concurrent request misses the cache and still reads the committed, active row
+    with SessionLocal() as other:
+        assert authenticate_token(other, token).username == user.username
+    db.commit()
+
+    with pytest.raises(HTTPException) as error:
+        authenticate_token(db, token)
+    assert error.value.status_code == 403
+
+
+def test_rolled_back_changes_keep_the_cache(db, user, token, lookups):
+    user.is_active = False
+    db.flush()
+    db.rollback()
+    authenticate_token(db, token)
+    db.commit()
+    authenticate_token(db, token)
+    assert len(lookups) == 1
+
+
+def test_changing_the_password_drops_cached_tokens(db, user, token, lookups):
+    authenticate_token(db, token)
+    user.hashed_password = "rotated"
+    db.commit()
+    authenticate_token(db, token)
+    assert len(lookups) == 2
+
+
+def test_renaming_a_user_drops_tokens_cached_under_the_old_name(db, user, token, lookups):
+    authenticate_token(db, token)
+    user.username = f"{user.username}-renamed"
+    db.commit()
+    with pytest.raises(HTTPException) as error:
+        authenticate_token(db, token)
+    assert error.value.status_code == 401
+
+
+def test_unrelated_updates_keep_the_cache(db, user, token, lookups):
+    authenticate_token(db, token)
+    user.email = f"new-{user.email}"
+    db.commit()
+    authenticate_token(db, token)
+    assert len(lookups) == 1
+
+
+def test_invalid_tokens_are_not_cached(db, lookups):
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            authenticate_token(db, "not-a-jwt")
+        assert error.value.status_code == 401
+    assert principal_cache.get("not-a-jwt") is None
+
+
+def principal(name: str) -> CurrentUser:
+    return CurrentUser(id=1, username=name, email=f"{name}@example.com", is_active=True)
+
+
+def test_cache_is_bounded_and_honours_token_expiry():
+    cache = PrincipalCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", principal("alice"), None)
+    cache.put("b", principal("bob"), None)
+    cache.put("c", principal("carol"), None)
+    assert cache.get("a") is None and cache.get("c").username == "carol"
+
+    # Entries never outlive their token
+    cache.put("expired", principal("dave"), time.time() - 1)
+    cache.put("expiring", principal("erin"), time.time() + 0.05)
+    assert cache.get("expired") is None
+    time.sleep(0.1)
+    assert cache.get("expiring") is None
+
+
+def test_invalidate_user_drops_every_token_of_that_user():
+    cache = PrincipalCache()
+    cache.put("t1", principal("alice"), None)
+    cache.put("t2", principal("alice"), None)
+    cache.put("t3", principal("bob"), None)
+    cache.invalidate_user("alice")
+    assert (cache.get("t1"), cache.get("t2")) == (None, None)
+    assert cache.get("t3").username == "bob"
+
+
+def test_expired_jwts_are_rejected(db, user, lookups):
+    token = create_access_token({"sub": user.username}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(HTTPException) as error:
+        authenticate_token(db, token)
+    assert error.value.status_code == 401
@@ -0,0 +1,36 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from app.backends import NumpyBackend, check_backend_parity, export_numpy_model, reference_dataset
+from app.config import MODELS_DIR
+
+pytest.importorskip("h5py")
+pytest.importorskip("tensorflow")
+
+MODEL_PATH = os.path.join(MODELS_DIR, "dl_best_model.h5")
+
+
+@pytest.fixture(scope="module")
+def scaler():
+    return joblib.load(os.path.join(MODELS_DIR, "scaler_object.joblib"))
+
+
+def test_numpy_backend_matches_the_keras_model(scaler):
+    report = check_backend_parity(["numpy", "keras"], scaler=scaler)
+    assert report["keras"]["max_abs_diff"] == 0
+    assert report["numpy"]["ok"], report["numpy"]
+    assert report["numpy"]["verdict_mismatches"] == 0
+
+
+def test_exported_weights_score_like_the_h5_file(scaler, tmp_path):
+    numpy_path = export_numpy_model(MODEL_PATH, str(tmp_path / "dl_best_model.npz"))
+    rows = reference_dataset(size=64, seed=1)
+    exported = NumpyBackend(MODEL_PATH, scaler, numpy_path=numpy_path).predict(rows)
+    direct = NumpyBackend(MODEL_PATH, scaler, numpy_path=str(tmp_path / "missing.npz")).predict(rows)
+    np.testing.assert_array_equal(exported, direct)
+
+    report = check_backend_parity(["numpy"], scaler=scaler, rows=rows)
+    assert report["numpy"]["ok"]
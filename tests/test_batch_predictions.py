@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import event
+
+from app.database import engine
+from app.models import Prediction
+from app.prediction import make_batch_predictions
+
+from conftest import CLINICAL_DATA
+
+
+@pytest.fixture
+def statements():
+    """SQL statements sent to the test database."""
+    sent = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        sent.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield sent
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def run_batch(db, user, records, **kwargs):
+    return [item for chunk in make_batch_predictions(db, user.id, records, **kwargs) for item in chunk]
+
+
+def test_chunks_are_inserted_without_reloading_each_row(db, user, statements):
+    records = [{**CLINICAL_DATA, "age": 30 + i % 60} for i in range(102)]
+    results = run_batch(db, user, records, chunk_size=50)
+
+    assert [item["index"] for item in results] == list(range(102))
+    ids = [item["id"] for item in results]
+    assert None not in ids and len(set(ids)) == 102
+    # Only the inserts: no row is reloaded to read its id back
+    assert statements and all(s.lstrip().upper().startswith("INSERT") for s in statements)
+
+    stored = db.query(Prediction).filter(Prediction.user_id == user.id).order_by(Prediction.id).all()
+    assert [p.id for p in stored] == sorted(ids)
+    assert {p.id: p.clinical_model_result for p in stored} == {item["id"]: item["clinical_result"] for item in results}
+    assert stored[0].clinical_features == {**CLINICAL_DATA, "age": 30}
+
+
+def test_records_are_validated_like_single_predictions(db, user):
+    records = [
+        CLINICAL_DATA,
+        {**CLINICAL_DATA, "age": -5},
+        {**CLINICAL_DATA, "age": True},
+        {key: value for key, value in CLINICAL_DATA.items() if key != "slope"},
+        "not a record",
+        {key: str(value) for key, value in CLINICAL_DATA.items()},
+    ]
+    results = run_batch(db, user, records)
+
+    assert [("id" in item, item["index"]) for item in results] == [
+        (True, 0), (False, 1), (False, 2), (False, 3), (False, 4), (True, 5)
+    ]
+    assert [item["loc"] for item in results[1]["detail"]] == [["age"]]
+    assert results[1]["detail"][0]["type"] == "greater_than_equal"
+    assert [item["loc"] for item in results[2]["detail"]] == [["age"]]
+    assert [item["loc"] for item in results[3]["detail"]] == [["slope"]]
+    assert results[4]["detail"][0]["type"] == "model_type"
+    assert db.query(Prediction).filter(Prediction.user_id == user.id).count() == 2
+    # Numeric strings are stored as the validated numbers
+    assert db.get(Prediction, results[5]["id"]).clinical_features == CLINICAL_DATA
@@ -0,0 +1,111 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.batching import InferenceBatcher
+
+
+def row_sums(rows: np.ndarray) -> np.ndarray:
+    return rows.sum(axis=1, keepdims=True)
+
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def make(batch_fn=row_sums, **kwargs):
+        batcher = InferenceBatcher(batch_fn, **kwargs)
+        batcher.start()
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in batchers:
+        batcher.stop()
+
+
+def test_concurrent_rows_share_a_forward_pass_and_get_their_own_output(make_batcher):
+    batch_sizes = []
+
+    def batch_fn(rows):
+        batch_sizes.append(rows.shape[0])
+        return row_sums(rows)
+
+    batcher = make_batcher(batch_fn, max_batch_size=8, max_wait_ms=200)
+    futures = [batcher.submit(np.full(3, float(i))) for i in range(8)]
+
+    assert [float(f.result(5)[0]) for f in futures] == [3.0 * i for i in range(8)]
+    assert batch_sizes == [8]
+    assert batcher.stats()["batches_total"] == 1
+
+
+def test_batches_never_exceed_max_batch_size(make_batcher):
+    batch_sizes = []
+
+    def batch_fn(rows):
+        batch_sizes.append(rows.shape[0])
+        return row_sums(rows)
+
+    batcher = make_batcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(np.ones(2)) for _ in range(10)]
+    for future in futures:
+        assert float(future.result(5)[0]) == 2.0
+    assert max(batch_sizes) <= 4
+    assert sum(batch_sizes) == 10
+
+
+def test_rows_from_many_threads_are_resolved_to_their_callers(make_batcher):
+    batcher = make_batcher(max_batch_size=16, max_wait_ms=5)
+    results = {}
+
+    def call(i):
+        results[i] = float(batcher.predict(np.array([i, 1.0]), timeout=5)[0])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {i: i + 1.0 for i in range(32)}
+
+
+def test_a_failing_batch_fails_every_row_in_it_and_the_worker_keeps_going(make_batcher):
+    calls = []
+
+    def batch_fn(rows):
+        calls.append(rows.shape[0])
+        if len(calls) == 1:
+            raise RuntimeError("model exploded")
+        return row_sums(rows)
+
+    batcher = make_batcher(batch_fn, max_batch_size=4, max_wait_ms=200)
+    failed = [batcher.submit(np.ones(2)) for _ in range(4)]
+    for future in failed:
+        with pytest.raises(RuntimeError, match="model exploded"):
+            future.result(5)
+    assert batcher.stats()["failed_batches_total"] == 1
+
+    assert float(batcher.predict(np.ones(2), timeout=5)[0]) == 2.0
+
+
+def test_stop_flushes_queued_rows(make_batcher):
+    release = threading.Event()
+
+    def batch_fn(rows):
+        release.wait(5)
+        return row_sums(rows)
+
+    batcher = make_batcher(batch_fn, max_batch_size=1, max_wait_ms=0)
+    futures = [batcher.submit(np.ones(2)) for _ in range(3)]
+    release.set()
+    batcher.stop()
+    assert [float(f.result(0)[0]) for f in futures] == [2.0, 2.0, 2.0]
+
+
+def test_submit_requires_a_running_batcher():
+    batcher = InferenceBatcher(row_sums)
+    with pytest.raises(RuntimeError):
+        batcher.submit(np.ones(2))
+    with pytest.raises(ValueError):
+        InferenceBatcher(row_sums, max_batch_size=0)
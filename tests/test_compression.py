@@ -0,0 +1,179 @@
+import pytest
+from sqlalchemy import event
+
+import app.compression as compression
+import app.models as models
+from app.compression import (
+    ZLIB, ZLIB_DICT, ZSTD, ReportCompressionError, build_zlib_dictionary, compress_report, decompress_report,
+    dictionaries, migrate_reports, preload_dictionaries, train_dictionary
+)
+from app.database import engine
+from app.models import Prediction, ReportDictionary
+
+from conftest import CLINICAL_DATA
+
+SECTIONS = [
+    "## Prediction Summary", "## Clinical Analysis", "## Risk Factor Assessment",
+    "## Differential Considerations", "## Management Recommendations", "## Follow-up Protocol",
+]
+
+
+def sample_report(i: int) -> str:
+    lines = ["# Diagnostic Report"]
+    for section in SECTIONS:
+        lines += [section, f"- Patient {i} shows a blood pressure of {120 + i} mmHg.", "- **Schedule a follow-up visit.**"]
+    return "\n".join(lines) + "\n"
+
+
+@pytest.fixture(autouse=True)
+def fresh_dictionaries(db):
+    """Start without a dictionary and drop the ones a test stored, so other tests compress plainly."""
+    existing = {entry.id for entry in db.query(ReportDictionary)}
+    dictionaries.clear()
+    yield
+    db.query(ReportDictionary).filter(ReportDictionary.id.notin_(existing)).delete(synchronize_session=False)
+    db.commit()
+    dictionaries.clear()
+
+
+def test_zlib_round_trip():
+    text = sample_report(1) + "Überwachung des Blutdrucks 🫀\n"
+    blob = compress_report(text)
+    assert blob[0] == ZLIB
+    assert len(blob) < len(text.encode("utf-8"))
+    assert decompress_report(blob) == text
+
+
+def test_zlib_dictionary_round_trip_and_cold_lookup(db):
+    text = sample_report(99)
+    plain = compress_report(text)
+
+    db.add(ReportDictionary(codec="zlib", data=build_zlib_dictionary([sample_report(i) for i in range(20)])))
+    db.commit()
+    dictionaries.clear()
+
+    blob = compress_report(text)
+    assert blob[0] == ZLIB_DICT
+    assert len(blob) < len(plain)
+    # Another process only has the dictionary id from the blob and loads it from the table
+    dictionaries.clear()
+    assert decompress_report(blob) == text
+    # Reports compressed before the dictionary existed still decompress
+    assert decompress_report(plain) == text
+
+
+def test_train_dictionary_on_stored_reports(db, user):
+    for i in range(10):
+        db.add(Prediction(user_id=user.id, clinical_features=CLINICAL_DATA, report=sample_report(i)))
+    db.commit()
+
+    dictionary_id = train_dictionary(db, "zlib")
+    assert dictionary_id is not None
+    blob = compress_report(sample_report(50))
+    assert blob[0] == ZLIB_DICT
+    assert decompress_report(blob) == sample_report(50)
+
+
+def test_zstd_round_trip(monkeypatch):
+    pytest.importorskip("zstandard")
+    monkeypatch.setattr(compression, "REPORT_COMPRESSION", "zstd")
+    text = sample_report(2)
+    blob = compress_report(text)
+    assert blob[0] == ZSTD
+    assert decompress_report(blob) == text
+
+
+def test_zstd_dictionary_round_trip(db, user, monkeypatch):
+    pytest.importorskip("zstandard")
+    monkeypatch.setattr(compression, "REPORT_COMPRESSION", "zstd")
+    for i in range(200):
+        db.add(Prediction(user_id=user.id, clinical_features=CLINICAL_DATA, report=sample_report(i)))
+    db.commit()
+
+    text = sample_report(500)
+    plain = compress_report(text)
+    dictionary_id = train_dictionary(db, "zstd", size=4096)
+    blob = compress_report(text)
+    assert compression.zstandard.get_frame_parameters(blob[1:]).dict_id == dictionary_id
+    assert len(blob) < len(plain)
+    dictionaries.clear()
+    assert decompress_report(blob) == text
+
+
+def test_zstd_falls_back_to_zlib_without_the_package(monkeypatch):
+    monkeypatch.setattr(compression, "REPORT_COMPRESSION", "zstd")
+    monkeypatch.setattr(compression, "zstandard", None)
+    blob = compress_report(sample_report(3))
+    assert blob[0] == ZLIB
+    with pytest.raises(ReportCompressionError, match="zstandard"):
+        decompress_report(bytes([ZSTD]) + b"\x28\xb5\x2f\xfd")
+
+
+def test_unknown_codecs_are_rejected():
+    with pytest.raises(ReportCompressionError, match="Unknown"):
+        decompress_report(b"\x7fpayload")
+
+
+def test_report_property_stores_compressed_text(db, user):
+    prediction = Prediction(user_id=user.id, clinical_features=CLINICAL_DATA, report=sample_report(4))
+    db.add(prediction)
+    db.commit()
+    db.expire_all()
+
+    stored = db.get(Prediction, prediction.id)
+    assert stored.report_text is None and stored.report_compressed[0] == ZLIB
+    assert stored.report == sample_report(4)
+
+
+def test_report_property_keeps_plain_text_with_compression_off(db, user, monkeypatch):
+    monkeypatch.setattr(models, "REPORT_COMPRESSION", "none")
+    prediction = Prediction(user_id=user.id, clinical_features=CLINICAL_DATA, report=sample_report(5))
+    assert prediction.report_compressed is None and prediction.report_text == sample_report(5)
+
+
+def test_migrate_compresses_legacy_rows(db, user):
+    legacy = Prediction(user_id=user.id, clinical_features=CLINICAL_DATA, report_text=sample_report(6))
+    db.add(legacy)
+    db.commit()
+    legacy_id = legacy.id
+
+    totals = migrate_reports(db, chunk_size=2)
+    assert totals["rows"] >= 1
+    assert totals["bytes_after"] < totals["bytes_before"]
+
+    db.expire_all()
+    stored = db.get(Prediction, legacy_id)
+    assert stored.report_text is None and stored.report_compressed is not None
+    assert stored.report == sample_report(6)
+    assert migrate_reports(db)["rows"] == 0
+
+
+def test_migrate_refuses_to_run_with_compression_off(db, user, monkeypatch):
+    monkeypatch.setattr(compression, "REPORT_COMPRESSION", "none")
+    monkeypatch.setattr(models, "REPORT_COMPRESSION", "none")
+    legacy = Prediction(user_id=user.id, clinical_features=CLINICAL_DATA, report_text=sample_report(7))
+    db.add(legacy)
+    db.commit()
+
+    with pytest.raises(ReportCompressionError, match="REPORT_COMPRESSION"):
+        migrate_reports(db)
+    db.expire_all()
+    assert db.get(Prediction, legacy.id).report_text == sample_report(7)
+
+
+def test_preloaded_dictionary_keeps_compression_off_the_database(db, user):
+    for i in range(12):
+        db.add(Prediction(user_id=user.id, clinical_features=CLINICAL_DATA, report=sample_report(i)))
+    db.commit()
+    dictionary_id = train_dictionary(db, codec="zlib")
+    dictionaries.clear()
+
+    assert preload_dictionaries() == dictionary_id
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        blob = compress_report(sample_report(20))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert blob[0] == ZLIB_DICT and statements == []
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+import app.prediction as prediction
+from app.instrumentation import _error_counters
+from app.prediction import ModelLoadingError, PredictionError, PreprocessingError
+
+from conftest import CLINICAL_DATA
+
+
+def errors(error_type: str) -> int:
+    counter = _error_counters.get(error_type)
+    return counter.value if counter is not None else 0
+
+
+@pytest.mark.parametrize("error", [PreprocessingError, ModelLoadingError, PredictionError])
+def test_failures_are_counted_under_their_original_type(client, monkeypatch, error):
+    def fail(structured_data):
+        raise error("scoring failed")
+
+    monkeypatch.setattr(prediction, "score_features_versioned", fail)
+    before = {name: errors(name) for name in ("PreprocessingError", "ModelLoadingError", "PredictionError")}
+
+    response = client.post("/api/predict", json={"clinical_data": CLINICAL_DATA})
+    assert response.status_code == 500
+    after = {name: errors(name) for name in before}
+    assert {name: after[name] - before[name] for name in before} == {
+        name: int(name == error.__name__) for name in before
+    }
+
+
+def test_streamed_failures_are_counted_under_their_original_type(client, monkeypatch):
+    def fail(structured_data):
+        raise PreprocessingError("scoring failed")
+
+    monkeypatch.setattr(prediction, "score_features_versioned", fail)
+    before = errors("PreprocessingError")
+    response = client.post("/api/predict/stream", data={"clinical_data": json.dumps(CLINICAL_DATA)})
+    assert "event: error" in response.text
+    assert errors("PreprocessingError") == before + 1
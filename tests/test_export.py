@@ -0,0 +1,84 @@
+import datetime
+import functools
+import json
+
+import pytest
+
+import app.main as main
+import app.prediction as prediction
+from app.models import Prediction
+
+from conftest import CLINICAL_DATA
+
+START = datetime.datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def history(db, user):
+    """Add ``count`` predictions for the signed-in user and return their ids, newest first."""
+    def add(count: int) -> list:
+        ids = []
+        for i in range(count):
+            row = Prediction(
+                user_id=user.id, created_at=START + datetime.timedelta(minutes=i), clinical_features=CLINICAL_DATA,
+                clinical_model_result=bool(i % 2), language="English", report="# Report" if i % 3 else None
+            )
+            db.add(row)
+            db.commit()
+            ids.append(row.id)
+        return ids[::-1]
+    return add
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Two rows per round trip, so a handful of rows crosses several chunk boundaries
+    monkeypatch.setattr(main, "iter_user_predictions", functools.partial(prediction.iter_user_predictions, chunk_size=2))
+
+
+def export(client, format: str):
+    response = client.get("/api/user/predictions/export", params={"format": format})
+    assert response.status_code == 200
+    return response
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 3, 4])
+def test_json_export_is_one_array_across_chunks(client, history, count):
+    ids = history(count)
+    response = export(client, "json")
+    assert response.headers["content-type"].startswith("application/json")
+    assert response.headers["content-disposition"] == 'attachment; filename="predictions.json"'
+
+    rows = json.loads(response.content)
+    assert [row["id"] for row in rows] == ids
+    assert all("report" not in row for row in rows)
+
+
+@pytest.mark.parametrize("count", [0, 3, 4])
+def test_ndjson_export_has_one_row_per_line(client, history, count):
+    ids = history(count)
+    response = export(client, "ndjson")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ids
+    assert response.text.endswith("\n") if count else response.text == ""
+
+
+def test_exports_match_the_history_pages(client, history):
+    ids = history(5)
+    exported = json.loads(export(client, "json").content)
+    assert [json.loads(line) for line in export(client, "ndjson").text.splitlines()] == exported
+
+    paged, cursor = [], None
+    while True:
+        page = client.get("/api/user/predictions", params={"limit": 2, **({"cursor": cursor} if cursor else {})}).json()
+        paged.extend(page["predictions"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert paged == exported and [row["id"] for row in paged] == ids
+    assert [row["has_report"] for row in exported] == [bool(i % 3) for i in reversed(range(5))]
+
+
+def test_unknown_formats_are_rejected(client):
+    assert client.get("/api/user/predictions/export", params={"format": "csv"}).status_code == 422
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+import app.jobs as jobs
+from app.jobs import ReportJobQueue
+from app.models import Prediction, ReportJob
+
+from conftest import CLINICAL_DATA
+
+
+@pytest.fixture(autouse=True)
+def no_models(monkeypatch):
+    # Reports come from the patched generator, so the models are never loaded
+    monkeypatch.setattr(jobs, "get_models", lambda: (None, None, None))
+
+
+@pytest.fixture
+def enqueue(db, user):
+    def enqueue() -> int:
+        prediction = Prediction(
+            user_id=user.id, clinical_features=CLINICAL_DATA, clinical_model_result=True,
+            language="English", report_status="pending"
+        )
+        prediction.report_job = ReportJob()
+        db.add(prediction)
+        db.commit()
+        return prediction.id
+    return enqueue
+
+
+def run_queue(queue: ReportJobQueue, prediction_ids, timeout: float = 5.0) -> None:
+    async def main():
+        await queue.start()
+        queue.notify()
+        try:
+            for prediction_id in prediction_ids:
+                await queue.wait_for_report(prediction_id, timeout)
+        finally:
+            await queue.stop()
+    asyncio.run(main())
+
+
+def load(db, prediction_id: int) -> Prediction:
+    db.expire_all()
+    return db.get(Prediction, prediction_id)
+
+
+def test_jobs_fill_in_the_report(db, enqueue, monkeypatch):
+    async def generate(llm, clinical_data, ml_result, language):
+        return f"report for verdict {ml_result} in {language}"
+
+    monkeypatch.setattr(jobs, "agenerate_report", generate)
+    queue = ReportJobQueue(workers=2, poll_seconds=0.05)
+    ids = [enqueue() for _ in range(3)]
+    run_queue(queue, ids)
+
+    for prediction_id in ids:
+        prediction = load(db, prediction_id)
+        assert prediction.report == "report for verdict 1 in English"
+        assert prediction.report_status == "ready"
+        assert prediction.report_source == "template"
+        assert prediction.report_job.status == "done"
+        assert prediction.report_job.attempts == 1
+    assert queue.completed_total.value == 3
+
+
+def test_each_job_runs_once_with_several_workers(db, enqueue, monkeypatch):
+    calls = []
+
+    async def generate(llm, clinical_data, ml_result, language):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "report"
+
+    monkeypatch.setattr(jobs, "agenerate_report", generate)
+    prediction_id = enqueue()
+    run_queue(ReportJobQueue(workers=4, poll_seconds=0.05), [prediction_id])
+
+    assert len(calls) == 1
+    assert load(db, prediction_id).report_job.attempts == 1
+
+
+def test_failed_attempts_are_retried_with_backoff(db, enqueue, monkeypatch):
+    attempts = []
+
+    async def generate(llm, clinical_data, ml_result, language):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("llm unavailable")
+        return "report"
+
+    monkeypatch.setattr(jobs, "agenerate_report", generate)
+    queue = ReportJobQueue(workers=1, max_attempts=3, backoff_seconds=0.01, poll_seconds=0.02)
+    prediction_id = enqueue()
+    run_queue(queue, [prediction_id])
+
+    prediction = load(db, prediction_id)
+    assert prediction.report == "report"
+    assert prediction.report_job.attempts == 3
+    assert prediction.report_job.last_error is None
+    assert queue.retried_total.value == 2
+
+
+def test_jobs_fail_after_their_last_attempt(db, enqueue, monkeypatch):
+    async def generate(llm, clinical_data, ml_result, language):
+        raise RuntimeError("llm unavailable")
+
+    monkeypatch.setattr(jobs, "agenerate_report", generate)
+    queue = ReportJobQueue(workers=1, max_attempts=2, backoff_seconds=0.01, poll_seconds=0.02)
+    prediction_id = enqueue()
+    run_queue(queue, [prediction_id])
+
+    prediction = load(db, prediction_id)
+    assert prediction.report is None
+    assert prediction.report_status == "failed"
+    assert prediction.report_source is None
+    assert prediction.report_job.status == "failed"
+    assert prediction.report_job.last_error == "llm unavailable"
+    assert queue.failed_total.value == 1
+
+
+def test_wait_for_report_gives_up_after_the_timeout(enqueue):
+    prediction_id = enqueue()
+    queue = ReportJobQueue(workers=1, poll_seconds=0.02)
+
+    async def main():
+        # Workers are not started, so the report stays pending
+        queue._completed = asyncio.Condition()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await queue.wait_for_report(prediction_id, 0.1)
+        return loop.time() - started
+
+    assert 0.1 <= asyncio.run(main()) < 1.0
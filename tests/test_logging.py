@@ -0,0 +1,88 @@
+import json
+import logging
+import queue
+from types import SimpleNamespace
+
+import pytest
+
+import app.logger as app_logger
+from app.logger import (
+    AsyncQueueHandler, JsonFormatter, RateLimitFilter, SamplingFilter, parse_sample_rates, redact_phi
+)
+
+from conftest import CLINICAL_DATA
+
+
+def record(name="heart_disease_prediction_app", level=logging.INFO, lineno=10, msg="scored %s", args=(1,)):
+    return logging.LogRecord(name, level, "/app/prediction.py", lineno, msg, args, None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manually advanced time.monotonic for the rate limiter."""
+    now = [1000.0]
+    monkeypatch.setattr(app_logger, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_clinical_payloads_are_redacted():
+    line = logging.Formatter("%(message)s").format(record(msg="Parsed clinical data: %s", args=(redact_phi(CLINICAL_DATA),)))
+    assert line == "Parsed clinical data: <redacted: 11 fields>"
+    assert "246" not in line and "cholesterol" not in line
+
+
+def test_phi_logging_can_be_switched_on(monkeypatch):
+    monkeypatch.setattr(app_logger, "LOG_PHI", True)
+    assert redact_phi(CLINICAL_DATA) is CLINICAL_DATA
+
+
+def test_rate_limit_throttles_each_call_site_and_reports_what_it_dropped(clock):
+    limiter = RateLimitFilter(per_second=2)
+    assert [limiter.filter(record()) for _ in range(5)] == [True, True, False, False, False]
+    # Other call sites and warnings are not affected
+    assert limiter.filter(record(lineno=20))
+    assert limiter.filter(record(level=logging.WARNING))
+
+    clock[0] += 1.0
+    passed = record()
+    assert limiter.filter(passed)
+    assert passed.suppressed == 3
+    assert not hasattr(record(), "suppressed")
+
+
+def test_sampling_keeps_a_fraction_of_selected_loggers(monkeypatch):
+    sampler = SamplingFilter(parse_sample_rates("httpx=0.1, httpx.debug=1, uvicorn.access=0"))
+    monkeypatch.setattr(app_logger, "random", SimpleNamespace(random=lambda: 0.5))
+
+    assert not sampler.filter(record(name="httpx"))
+    assert not sampler.filter(record(name="httpx._client"))
+    assert sampler.filter(record(name="httpx.debug"))  # the longer prefix wins
+    assert not sampler.filter(record(name="uvicorn.access"))
+    assert sampler.filter(record(name="httpxy"))
+    assert sampler.filter(record(name="heart_disease_prediction_app"))
+    assert sampler.filter(record(name="uvicorn.access", level=logging.ERROR))
+
+    monkeypatch.setattr(app_logger, "random", SimpleNamespace(random=lambda: 0.05))
+    assert sampler.filter(record(name="httpx"))
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("") == {}
+    assert parse_sample_rates("httpx=0.1,,uvicorn.access = 0.01") == {"httpx": 0.1, "uvicorn.access": 0.01}
+
+
+def test_full_queue_drops_and_counts_low_priority_records():
+    handler = AsyncQueueHandler(queue.Queue(1))
+    before = handler.dropped.value
+    handler.handle(record())
+    handler.handle(record())
+    assert handler.queue.qsize() == 1
+    assert handler.dropped.value == before + 1
+
+
+def test_json_lines_include_extra_fields():
+    throttled = record(msg="scored %s rows", args=(3,))
+    throttled.suppressed = 7
+    entry = json.loads(JsonFormatter().format(throttled))
+    assert entry["message"] == "scored 3 rows"
+    assert (entry["level"], entry["line"], entry["suppressed"]) == ("INFO", 10, 7)
@@ -0,0 +1,129 @@
+import datetime
+
+import pytest
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, JSON, MetaData, String, Table, Text, inspect, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from app.config import DATABASE_POOL_SIZE
+from app.database import build_engine
+from app.migrations import MIGRATIONS, upgrade
+from app.models import Prediction
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def baseline_metadata() -> MetaData:
+    """The users and predictions tables as the first release created them with create_all."""
+    metadata = MetaData()
+    Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("username", String, unique=True, index=True),
+        Column("email", String, unique=True, index=True),
+        Column("hashed_password", String),
+        Column("is_active", Boolean),
+    )
+    Table(
+        "predictions", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", Integer, ForeignKey("users.id")),
+        Column("created_at", DateTime),
+        Column("clinical_features", JSON),
+        Column("clinical_model_result", Boolean),
+        Column("language", String),
+        Column("report", Text),
+    )
+    return metadata
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def baseline(engine):
+    metadata = baseline_metadata()
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(metadata.tables["users"].insert().values(
+            id=1, username="legacy", email="legacy@example.com", hashed_password="x", is_active=True
+        ))
+        connection.execute(metadata.tables["predictions"].insert().values(
+            id=1, user_id=1, created_at=datetime.datetime(2023, 6, 1), clinical_features={"age": 61},
+            clinical_model_result=True, language="English", report="# Legacy report"
+        ))
+    return engine
+
+
+def columns(engine, table: str) -> dict:
+    return {column["name"]: column for column in inspect(engine).get_columns(table)}
+
+
+def test_upgrade_brings_the_baseline_schema_up_to_date(baseline):
+    assert upgrade(baseline) == LATEST
+
+    inspector = inspect(baseline)
+    assert {"report_jobs", "report_cache", "report_dictionaries", "schema_migrations"} <= set(inspector.get_table_names())
+    predictions = columns(baseline, "predictions")
+    assert {"report_status", "report_source", "report_compressed", "model_version"} <= set(predictions)
+    assert predictions["report_source"]["nullable"] and predictions["report_source"]["default"] is None
+    assert "ix_predictions_user_id_created_at" in {index["name"] for index in inspector.get_indexes("predictions")}
+    assert [fk["referred_table"] for fk in inspector.get_foreign_keys("predictions")] == ["users"]
+    with baseline.connect() as connection:
+        applied = connection.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars().all()
+    assert applied == [number for number, _, _ in MIGRATIONS]
+
+
+def test_upgrade_keeps_existing_rows(baseline):
+    upgrade(baseline)
+    with Session(baseline) as session:
+        legacy = session.get(Prediction, 1)
+        assert legacy.report == "# Legacy report"
+        assert legacy.clinical_features == {"age": 61}
+        # Rows that predate the columns were written by the LLM and are complete
+        assert (legacy.report_status, legacy.report_source, legacy.model_version) == ("ready", "llm", None)
+
+        session.add(Prediction(user_id=1, clinical_features={"age": 50}, report_status="pending"))
+        session.commit()
+        assert session.query(Prediction).filter(Prediction.report_source.is_(None)).count() == 1
+
+
+def test_upgrade_is_idempotent(baseline):
+    upgrade(baseline)
+    assert upgrade(baseline) == LATEST
+    with baseline.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM schema_migrations")).scalar() == len(MIGRATIONS)
+
+
+def test_upgrade_stops_at_the_target_and_resumes(baseline):
+    assert upgrade(baseline, target=3) == 3
+    assert "model_version" not in columns(baseline, "predictions")
+    assert upgrade(baseline) == LATEST
+    assert "model_version" in columns(baseline, "predictions")
+
+
+def test_upgrade_creates_an_empty_database(engine):
+    assert upgrade(engine) == LATEST
+    assert columns(engine, "predictions")["report_source"]["nullable"]
+
+
+def test_file_databases_get_the_sized_pool(engine):
+    assert isinstance(engine.pool, QueuePool) and engine.pool.size() == DATABASE_POOL_SIZE
+
+
+@pytest.mark.parametrize("url, kwargs", [
+    ("sqlite://", {}),
+    ("sqlite:///:memory:", {}),
+    ("sqlite://", {"poolclass": StaticPool}),
+])
+def test_upgrade_runs_on_in_memory_databases(url, kwargs):
+    engine = build_engine(url, **kwargs)
+    try:
+        assert upgrade(engine) == LATEST
+        assert "report_source" in columns(engine, "predictions")
+    finally:
+        engine.dispose()
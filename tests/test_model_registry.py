@@ -0,0 +1,135 @@
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+
+import app.prediction as prediction
+from app.backends import RemoteBackend, RemoteInferenceError
+from app.config import MODEL_REGISTRY_DIR, MODELS_DIR
+from app.inference_server import InferenceServer
+from app.model_registry import BASE_VERSION, MODEL_FILE, ModelVersionNotFound, list_versions, resolve_version
+from app.prediction import ModelLoadingError, activate_model_version, extract_features, get_model_status, score_features_versioned
+
+from conftest import CLINICAL_DATA, publish
+
+
+def test_versions_sort_naturally_and_skip_unpublished_directories(tmp_path):
+    registry_dir = str(tmp_path)
+    for version in ("v2", "v10", "v9"):
+        publish(registry_dir, version)
+    publish(registry_dir, "_v11-copying")
+    publish(registry_dir, ".v12")
+    os.makedirs(tmp_path / "v13")  # incomplete: no model files
+    assert list_versions(registry_dir) == ["v2", "v9", "v10"]
+
+
+def test_resolve_version(tmp_path):
+    registry_dir = str(tmp_path)
+    assert resolve_version("latest", registry_dir) == (BASE_VERSION, MODELS_DIR)
+    path = publish(registry_dir, "v1")
+    assert resolve_version("latest", registry_dir) == ("v1", path)
+    assert resolve_version("v1", registry_dir) == ("v1", path)
+    assert resolve_version(BASE_VERSION, registry_dir) == (BASE_VERSION, MODELS_DIR)
+    for missing in ("v2", "../v1", "_v1"):
+        with pytest.raises(ModelVersionNotFound):
+            resolve_version(missing, registry_dir)
+
+
+def test_hot_swap_changes_the_scoring_version_and_drains_the_old_one(registry):
+    publish(registry, "v1")
+    features = extract_features(CLINICAL_DATA)
+    assert score_features_versioned(features)[1] == "v1"
+
+    publish(registry, "v2")
+    with prediction._acquire_models() as held:
+        status = activate_model_version("latest")
+        assert status["active"] == "v2"
+        assert status["draining"] == {"v1": 1}
+        # A request that started on v1 finishes on it
+        assert held.version == "v1" and held.score_batch(np.asarray([features], dtype=np.float64)).shape == (1, 1)
+    assert get_model_status()["draining"] == {}
+    assert score_features_versioned(features)[1] == "v2"
+
+    # Rolling back is just activating the older version
+    assert activate_model_version("v1")["active"] == "v1"
+    assert score_features_versioned(features)[1] == "v1"
+
+
+def test_activation_keeps_the_active_version_on_failure(registry):
+    publish(registry, "v1")
+    score_features_versioned(extract_features(CLINICAL_DATA))
+    with pytest.raises(ModelVersionNotFound):
+        activate_model_version("v7")
+
+    broken = publish(registry, "v2")
+    with open(os.path.join(broken, MODEL_FILE), "wb") as f:
+        f.write(b"not an hdf5 file")
+    with pytest.raises(ModelLoadingError):
+        activate_model_version("v2")
+    assert get_model_status()["active"] == "v1"
+
+
+@pytest.fixture
+def sidecar(registry, tmp_path):
+    publish(registry, "v1")
+    publish(registry, "v2")
+    server = InferenceServer(str(tmp_path / "sidecar.sock"), backend_name="numpy", version="v1", max_versions=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_sidecar_scores_with_the_version_each_call_names(sidecar):
+    row = np.asarray([extract_features(CLINICAL_DATA)], dtype=np.float64)
+    default = RemoteBackend(socket_path=sidecar.socket_path)
+    assert default.version == "v1"
+
+    pinned = RemoteBackend(socket_path=sidecar.socket_path, version="v2")
+    assert list(sidecar._models) == ["v1", "v2"]
+    assert pinned.predict(row).shape == (1, 1)
+    np.testing.assert_allclose(pinned.predict(row), default.predict(row), atol=1e-6)
+    default.close()
+    pinned.close()
+
+
+def test_hot_swap_with_the_remote_backend_moves_the_sidecar(sidecar, monkeypatch):
+    create_backend = prediction.create_backend
+
+    def remote_on_the_worker(name, scaler=None, model_path=None, version=None):
+        # The in-process sidecar loads its own models on its handler threads
+        if threading.current_thread() is not threading.main_thread():
+            return create_backend(name, scaler, model_path, version)
+        return RemoteBackend(model_path, scaler, version, socket_path=sidecar.socket_path)
+
+    monkeypatch.setattr(prediction, "create_backend", remote_on_the_worker)
+    shutil.rmtree(os.path.join(MODEL_REGISTRY_DIR, "v2"))
+    sidecar._models.clear()
+    features = extract_features(CLINICAL_DATA)
+    assert score_features_versioned(features)[1] == "v1"
+
+    publish(MODEL_REGISTRY_DIR, "v2")
+    assert activate_model_version("v2")["active"] == "v2"
+    assert "v2" in sidecar._models
+    assert score_features_versioned(features)[1] == "v2"
+
+
+def test_sidecar_rejects_versions_it_cannot_load(sidecar):
+    with pytest.raises(RemoteInferenceError, match="not found"):
+        RemoteBackend(socket_path=sidecar.socket_path, version="v7")
+
+
+def test_remote_backend_rejects_rows_scored_with_another_version(sidecar):
+    backend = RemoteBackend(socket_path=sidecar.socket_path, version="v2")
+    # e.g. a sidecar that ignores the requested version
+    score = sidecar.score
+    sidecar.score = lambda rows, version=None: score(rows, "v1")
+    try:
+        with pytest.raises(RemoteInferenceError, match="expected v2"):
+            backend.predict(np.asarray([extract_features(CLINICAL_DATA)], dtype=np.float64))
+    finally:
+        sidecar.score = score
+        backend.close()
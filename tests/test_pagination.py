@@ -0,0 +1,84 @@
+import datetime
+
+import pytest
+
+from app.models import Prediction
+from app.prediction import decode_cursor, encode_cursor, get_user_predictions_page, iter_user_predictions
+
+from conftest import CLINICAL_DATA
+
+START = datetime.datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def add(db, user):
+    def add(created_at: datetime.datetime, report: str = None) -> int:
+        prediction = Prediction(
+            user_id=user.id, created_at=created_at, clinical_features=CLINICAL_DATA,
+            clinical_model_result=False, report=report
+        )
+        db.add(prediction)
+        db.commit()
+        return prediction.id
+    return add
+
+
+def walk(db, user_id: int, limit: int, between_pages=None):
+    ids, cursor = [], None
+    while True:
+        rows, cursor = get_user_predictions_page(db, user_id, limit, cursor)
+        ids.extend(row.id for row in rows)
+        if cursor is None:
+            return ids
+        if between_pages is not None:
+            between_pages()
+
+
+def test_pages_are_newest_first_and_break_timestamp_ties_by_id(db, user, add):
+    # Two rows share each timestamp, so only the id orders them
+    ids = [add(START + datetime.timedelta(minutes=i // 2)) for i in range(7)]
+    expected = sorted(ids, key=lambda i: (ids.index(i) // 2, i), reverse=True)
+    assert walk(db, user.id, limit=2) == expected
+    assert walk(db, user.id, limit=100) == expected
+
+
+def test_rows_inserted_while_paging_neither_shift_nor_repeat_pages(db, user, add):
+    ids = [add(START + datetime.timedelta(minutes=i)) for i in range(6)]
+    inserted = []
+
+    def insert_newer():
+        inserted.append(add(datetime.datetime.utcnow() + datetime.timedelta(minutes=len(inserted))))
+
+    # Offset pagination would repeat rows here, as each insert shifts older rows down a page
+    assert walk(db, user.id, limit=2, between_pages=insert_newer) == list(reversed(ids))
+    assert len(inserted) == 2
+
+
+def test_a_full_last_page_has_no_cursor(db, user, add):
+    first, second = add(START), add(START + datetime.timedelta(minutes=1))
+    rows, cursor = get_user_predictions_page(db, user.id, 1)
+    assert [row.id for row in rows] == [second] and cursor is not None
+    rows, cursor = get_user_predictions_page(db, user.id, 1, cursor)
+    assert [row.id for row in rows] == [first] and cursor is None
+
+
+def test_pages_only_hold_the_users_rows_and_flag_reports(db, user, add):
+    with_report = add(START, report="# Diagnostic Report")
+    without_report = add(START + datetime.timedelta(minutes=1))
+    rows, _ = get_user_predictions_page(db, user.id, 10)
+    assert {row.id: row.has_report for row in rows} == {with_report: True, without_report: False}
+    assert get_user_predictions_page(db, user.id + 10_000, 10) == ([], None)
+
+
+def test_cursors_round_trip_and_reject_garbage():
+    created_at = datetime.datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_export_iterates_the_whole_history_in_chunks(db, user, add):
+    ids = [add(START + datetime.timedelta(minutes=i)) for i in range(5)]
+    chunks = list(iter_user_predictions(db, user.id, chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [row.id for chunk in chunks for row in chunk] == list(reversed(ids))
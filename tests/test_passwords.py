@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+
+import app.auth as auth
+from app.auth import pwd_context, run_password_task
+from app.config import BCRYPT_ROUNDS
+from app.models import User
+
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture
+def legacy_user(db):
+    """A user whose password was hashed with a bcrypt cost other than the configured one."""
+    name = f"legacy-{uuid.uuid4().hex[:12]}"
+    user = User(
+        username=name, email=f"{name}@example.com", is_active=True,
+        hashed_password=bcrypt.using(rounds=BCRYPT_ROUNDS + 1).hash(PASSWORD)
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def login(client, username, password):
+    return client.post("/api/token", data={"username": username, "password": password})
+
+
+def cost(hashed_password: str) -> int:
+    return int(hashed_password.split("$")[2])
+
+
+def test_login_rehashes_outdated_passwords(client, db, legacy_user):
+    response = login(client, legacy_user.username, PASSWORD)
+    assert response.status_code == 200 and response.json()["access_token"]
+
+    db.refresh(legacy_user)
+    assert cost(legacy_user.hashed_password) == BCRYPT_ROUNDS
+    assert pwd_context.verify(PASSWORD, legacy_user.hashed_password)
+    # The upgraded hash keeps working
+    assert login(client, legacy_user.username, PASSWORD).status_code == 200
+
+
+def test_failed_logins_keep_the_stored_hash(client, db, legacy_user):
+    stored = legacy_user.hashed_password
+    assert login(client, legacy_user.username, "wrong").status_code == 401
+    db.refresh(legacy_user)
+    assert legacy_user.hashed_password == stored
+
+
+@pytest.fixture
+def one_slot(monkeypatch):
+    """Shrink the password pool and its queue to a single slot."""
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(auth, "_password_slots", slots)
+    return slots
+
+
+def test_saturated_password_pool_answers_503_with_retry_after(client, legacy_user, one_slot):
+    one_slot.acquire()
+    try:
+        for response in (
+            login(client, legacy_user.username, PASSWORD),
+            client.post("/api/signup", json={"username": "queued", "email": "queued@example.com", "password": "pw"}),
+        ):
+            assert response.status_code == 503
+            assert response.headers["retry-after"] == "1"
+    finally:
+        one_slot.release()
+    assert login(client, legacy_user.username, PASSWORD).status_code == 200
+
+
+def test_slots_are_released_once_the_work_finishes(one_slot):
+    started, finish = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        finish.wait(5)
+        return "hash"
+
+    async def cancel_then_retry():
+        task = asyncio.ensure_future(run_password_task(slow_hash))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        # The cancelled request's hash is still running, so its slot is still taken
+        with pytest.raises(HTTPException) as error:
+            await run_password_task(lambda: "other")
+        assert error.value.status_code == 503
+        finish.set()
+        for _ in range(500):
+            await asyncio.sleep(0.01)
+            if one_slot.acquire(blocking=False):
+                one_slot.release()
+                break
+        return await run_password_task(lambda: "other")
+
+    assert asyncio.run(cancel_then_retry()) == "other"
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+
+from app.models import ReportCacheEntry
+from app.report_cache import ReportCache, make_cache_key
+
+
+@pytest.fixture
+def key():
+    return uuid.uuid4().hex
+
+
+def test_cache_key_normalizes_features_and_language():
+    assert make_cache_key([1, "2", 3.0], 1, " English ") == make_cache_key(["1", 2.0, "3"], 1, "english")
+    assert make_cache_key([1, 2, 3], 1, "English") != make_cache_key([1, 2, 3], 0, "English")
+    assert make_cache_key([1, 2, 3], 1, "English") != make_cache_key([1, 2, 3], 1, "Spanish")
+
+
+def test_memory_tier_is_an_lru():
+    cache = ReportCache(max_entries=2, persistent=False)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_entries_expire_after_the_ttl():
+    cache = ReportCache(ttl_seconds=0.05, persistent=False)
+    cache.put("a", "A")
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_persistent_tier_is_shared_and_refills_memory(key, db):
+    ReportCache(persistent=True).put(key, "stored report", "English")
+
+    # A second cache, e.g. another worker or a restarted one, starts with an empty memory tier
+    other = ReportCache(persistent=True)
+    assert other.get(key) == "stored report"
+    assert other.get(key) == "stored report"
+    stats = other.stats()
+    assert (stats["persistent_hits"], stats["memory_hits"]) == (1, 1)
+    assert db.get(ReportCacheEntry, key).language == "English"
+
+
+def test_get_or_generate_makes_one_call_for_concurrent_misses(key):
+    cache = ReportCache(persistent=False)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "report"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_generate(key, generate)))
+        for _ in range(5)
+    ]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Followers register as waiters before the leader finishes
+    deadline = time.monotonic() + 5
+    while cache.stats()["shared_calls"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["report"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1 and cache.stats()["shared_calls"] == 4
+
+
+def test_get_or_generate_shares_the_leaders_failure(key):
+    cache = ReportCache(persistent=False)
+
+    def generate():
+        raise RuntimeError("llm down")
+
+    with pytest.raises(RuntimeError, match="llm down"):
+        cache.get_or_generate(key, generate)
+    # Nothing was cached, so the next call tries again
+    assert cache.get_or_generate(key, lambda: "report") == "report"
+
+
+def test_aget_or_generate_makes_one_call_for_concurrent_misses(key):
+    cache = ReportCache(persistent=False)
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "report"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_generate(key, generate) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["report"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["shared_calls"] == 4
+
+
+def test_follower_takes_over_when_the_leader_is_cancelled(key):
+    cache = ReportCache(persistent=False)
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return f"report {len(calls)}"
+
+    async def main():
+        leader = asyncio.create_task(cache.aget_or_generate(key, generate))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(cache.aget_or_generate(key, generate))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "report 2"
+    assert len(calls) == 2
+
+
+def test_streamed_misses_share_the_leaders_report(key):
+    cache = ReportCache(persistent=False)
+    calls = []
+
+    async def stream():
+        calls.append(1)
+        for chunk in ("Diagnostic ", "report ", "text"):
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    async def collect():
+        return [chunk async for chunk in cache.astream_or_generate(key, stream)]
+
+    async def main():
+        streamed = await asyncio.gather(collect(), collect(), collect())
+        shared = await cache.aget_or_generate(key, lambda: pytest.fail("report should be cached"))
+        return streamed, shared
+
+    streamed, shared = asyncio.run(main())
+    assert streamed[0] == ["Diagnostic ", "report ", "text"]
+    # Followers receive the assembled report as one chunk
+    assert streamed[1:] == [["Diagnostic report text"]] * 2
+    assert shared == "Diagnostic report text"
+    assert len(calls) == 1
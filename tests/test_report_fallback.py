@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+import app.prediction as prediction
+from app.prediction import agenerate_report_within_budget
+from app.report_templates import generate_template_report
+from app.utils import ClientDisconnected, run_until_disconnected
+
+from conftest import CLINICAL_DATA
+
+
+class SlowLLM:
+    """Stand-in for the Gemini client that answers after ``delay`` seconds."""
+
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.cancelled = False
+
+    async def ainference(self, result: str, language: str) -> str:
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return f"# LLM report ({language})"
+
+
+@pytest.fixture(autouse=True)
+def online(monkeypatch):
+    monkeypatch.setattr(prediction, "LLM_OFFLINE", False)
+    monkeypatch.setattr(prediction, "report_cache", None)
+
+
+def within_budget(llm, budget):
+    return asyncio.run(agenerate_report_within_budget(llm, CLINICAL_DATA, 1, "English", budget=budget))
+
+
+def test_fast_llm_reports_are_served():
+    assert within_budget(SlowLLM(delay=0.01), budget=1) == ("# LLM report (English)", "llm")
+
+
+def test_slow_llm_falls_back_to_the_template_and_is_cancelled():
+    llm = SlowLLM(delay=5)
+    report, source = within_budget(llm, budget=0.05)
+    assert (report, source) == (generate_template_report(CLINICAL_DATA, 1, "English"), "template")
+    assert llm.cancelled
+
+
+def test_failing_llm_falls_back_to_the_template():
+    report, source = within_budget(SlowLLM(error=RuntimeError("quota exceeded")), budget=1)
+    assert source == "template" and report == generate_template_report(CLINICAL_DATA, 1, "English")
+
+
+def test_a_zero_budget_waits_for_the_llm():
+    assert within_budget(SlowLLM(delay=0.1), budget=0) == ("# LLM report (English)", "llm")
+
+
+def test_cancelling_the_request_cancels_the_llm_call():
+    llm = SlowLLM(delay=5)
+
+    async def cancel_midway():
+        task = asyncio.ensure_future(agenerate_report_within_budget(llm, CLINICAL_DATA, 0, "English", budget=1))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(cancel_midway())
+    assert llm.cancelled
+
+
+class Request:
+    """The part of a Starlette request run_until_disconnected watches."""
+
+    def __init__(self, disconnect_after: int):
+        self.polls = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self) -> bool:
+        self.polls += 1
+        return self.polls >= self.disconnect_after
+
+
+def test_disconnected_clients_cancel_their_prediction():
+    llm = SlowLLM(delay=5)
+    request = Request(disconnect_after=2)
+
+    async def predict():
+        with pytest.raises(ClientDisconnected):
+            await run_until_disconnected(request, llm.ainference("", "English"), poll_interval=0.01)
+        await asyncio.sleep(0)
+
+    asyncio.run(predict())
+    assert llm.cancelled and request.polls == 2
+
+
+def test_connected_clients_get_the_result():
+    request = Request(disconnect_after=100)
+    result = asyncio.run(run_until_disconnected(request, SlowLLM(delay=0.05).ainference("", "German"), poll_interval=0.01))
+    assert result == "# LLM report (German)"
@@ -0,0 +1,69 @@
+import pytest
+
+from app.report_templates import TEMPLATES, generate_template_report, identify_risk_factors
+
+from conftest import CLINICAL_DATA
+
+# Low-risk patient: no risk factor present
+HEALTHY = {
+    "age": 40, "gender": 0, "chest_pain": 0, "bp": 118, "cholesterol": 180, "blood_sugar": 0,
+    "electrocardiographic": 0, "heart_rate": 170, "exercise_angina": 0, "oldpeak": 0.0, "slope": 0,
+}
+# Every risk factor present
+AT_RISK = {
+    "age": 67, "gender": 1, "chest_pain": 3, "bp": 160, "cholesterol": 286, "blood_sugar": 1,
+    "electrocardiographic": 2, "heart_rate": 100, "exercise_angina": 1, "oldpeak": 3.4, "slope": 1,
+}
+
+
+def headings(report: str) -> list:
+    return [line for line in report.splitlines() if line.startswith("#")]
+
+
+def test_every_language_provides_the_same_keys():
+    english = TEMPLATES["english"]
+    for language, template in TEMPLATES.items():
+        assert template.keys() == english.keys(), language
+        assert len(template["sections"]) == 6 and len(template["subsections"]) == 3
+
+
+@pytest.mark.parametrize("language", ["English", "Spanish", "French", "German"])
+def test_reports_follow_the_llm_heading_layout_in_each_language(language):
+    template = TEMPLATES[language.casefold()]
+    report = generate_template_report(CLINICAL_DATA, 1, language)
+
+    assert headings(report) == [
+        f"# {template['title']}",
+        *[f"## {number}. {section}" for number, section in enumerate(template["sections"][:5], 1)],
+        *[f"### {letter}. {name}" for letter, name in zip("ABC", template["subsections"])],
+        f"## 6. {template['sections'][5]}",
+    ]
+    assert template["verdict"][1] in report
+    assert template["labels"]["cholesterol"] in report
+    assert "{" not in report  # every placeholder was filled
+
+
+def test_languages_are_matched_case_insensitively_and_fall_back_to_english():
+    assert generate_template_report(CLINICAL_DATA, 0, " german ") == generate_template_report(CLINICAL_DATA, 0, "German")
+    assert generate_template_report(CLINICAL_DATA, 0, "Klingon") == generate_template_report(CLINICAL_DATA, 0, "English")
+
+
+def test_risk_factors_and_level_follow_the_clinical_values():
+    assert identify_risk_factors(HEALTHY) == []
+    assert len(identify_risk_factors(AT_RISK)) == 11
+
+    english = TEMPLATES["english"]
+    low = generate_template_report(HEALTHY, 0)
+    high = generate_template_report(AT_RISK, 1)
+    assert f"**{english['risk_level']['low']} risk**" in low
+    assert f"**{english['risk_level']['high']} risk**" in high
+    assert "11 of the 11 clinical indicators" in high
+    assert english["factors"]["bp"].format(**AT_RISK) in high
+    assert english["factors"]["bp"].format(**AT_RISK) not in low
+
+
+def test_coded_values_are_spelled_out():
+    report = generate_template_report(AT_RISK, 1, "French")
+    french = TEMPLATES["french"]["values"]
+    assert french["chest_pain"][3] in report and french["gender"][1] in report
+    assert "160 mm Hg" in report
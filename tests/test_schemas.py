@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import ClinicalFeatures, PredictionRequest
+
+from conftest import CLINICAL_DATA
+
+
+@pytest.mark.parametrize("field, value", [
+    ("age", 0), ("age", 121), ("gender", 2), ("chest_pain", -1), ("bp", 79), ("bp", 221),
+    ("cholesterol", 601), ("heart_rate", 59), ("oldpeak", 10.5), ("slope", 3), ("age", "old"),
+    ("age", True), ("gender", False),
+])
+def test_out_of_range_features_are_rejected(field, value):
+    with pytest.raises(ValidationError) as error:
+        ClinicalFeatures(**{**CLINICAL_DATA, field: value})
+    assert [item["loc"] for item in error.value.errors()] == [(field,)]
+
+
+def test_missing_features_are_all_reported():
+    data = dict(CLINICAL_DATA)
+    del data["age"], data["slope"]
+    with pytest.raises(ValidationError) as error:
+        ClinicalFeatures(**data)
+    assert {item["loc"] for item in error.value.errors()} == {("age",), ("slope",)}
+
+
+def test_numeric_strings_are_accepted():
+    features = ClinicalFeatures(**{key: str(value) for key, value in CLINICAL_DATA.items()})
+    assert features == ClinicalFeatures(**CLINICAL_DATA)
+
+
+def test_to_vector_is_float32_in_model_input_order():
+    features = ClinicalFeatures(**CLINICAL_DATA)
+    vector = features.to_vector()
+    assert vector.dtype == np.float32
+    np.testing.assert_array_equal(vector, np.asarray(list(CLINICAL_DATA.values()), dtype=np.float32))
+
+    out = np.zeros(len(CLINICAL_DATA), dtype=np.float32)
+    assert features.to_vector(out) is out
+    np.testing.assert_array_equal(out, vector)
+
+
+def test_prediction_request_defaults_and_language_limit():
+    request = PredictionRequest(clinical_data=CLINICAL_DATA)
+    assert (request.language, request.background) == ("English", False)
+    with pytest.raises(ValidationError):
+        PredictionRequest(clinical_data=CLINICAL_DATA, language="x" * 33)
+
+
+def test_api_rejects_invalid_json_bodies_with_422(client):
+    response = client.post("/api/predict", json={"clinical_data": {**CLINICAL_DATA, "bp": 300}})
+    assert response.status_code == 422
+    assert [tuple(item["loc"]) for item in response.json()["detail"]] == [("body", "clinical_data", "bp")]
+    assert client.get("/api/user/predictions").json()["predictions"] == []
+
+    response = client.post("/api/predict", json={"clinical_data": {**CLINICAL_DATA, "age": True}})
+    assert response.status_code == 422
+    assert [tuple(item["loc"]) for item in response.json()["detail"]] == [("body", "clinical_data", "age")]
+
+
+def test_api_rejects_invalid_form_data_with_422(client):
+    response = client.post("/api/predict", data={"clinical_data": json.dumps({**CLINICAL_DATA, "age": 0})})
+    assert response.status_code == 422
+    assert [tuple(item["loc"]) for item in response.json()["detail"]] == [("body", "clinical_data", "age")]
+
+    response = client.post("/api/predict", data={"language": "English"})
+    assert response.status_code == 422
+    assert [tuple(item["loc"]) for item in response.json()["detail"]] == [("body", "clinical_data")]
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+import app.prediction as prediction
+from app.prediction import activate_model_version, extract_features, score_features_versioned
+from app.score_cache import ScoreCache, make_score_key, score_cache
+
+from conftest import CLINICAL_DATA, publish
+
+
+class ForwardPasses(list):
+    """(version, rows) for every batch the model actually scores."""
+
+    def __init__(self, monkeypatch):
+        super().__init__()
+        self._monkeypatch = monkeypatch
+
+    def watch_active(self) -> None:
+        with prediction._acquire_models() as bundle:
+            predict_batch = bundle.predictor.predict_batch
+
+            def counting_predict_batch(rows):
+                self.append((bundle.version, len(rows)))
+                return predict_batch(rows)
+
+            self._monkeypatch.setattr(bundle.predictor, "predict_batch", counting_predict_batch)
+
+
+@pytest.fixture
+def forward_passes(monkeypatch):
+    score_cache.clear()
+    passes = ForwardPasses(monkeypatch)
+    passes.watch_active()
+    yield passes
+    score_cache.clear()
+
+
+def test_keys_normalise_equal_rows_and_include_the_version():
+    row = np.asarray([54, 1, 2, 130, 246, 0, 1, 150, 0, 1, 1], dtype=np.float64)
+    same = np.asarray(["54", "1.0", 2, 130, 246, 0, 1, 150, 0, 1, 1], dtype=np.float64)
+    assert make_score_key(row, "v1") == make_score_key(same, "v1")
+    assert make_score_key(row, "v1") != make_score_key(row, "v2")
+    hash(make_score_key(row, "v1"))  # usable as a dict key
+
+
+def test_cache_is_a_bounded_lru():
+    cache = ScoreCache(max_entries=2)
+    cache.put(("v1", 1.0), 0)
+    cache.put(("v1", 2.0), 1)
+    assert cache.get(("v1", 1.0)) == 0  # now the most recently used
+    cache.put(("v1", 3.0), 1)
+    assert cache.get(("v1", 2.0)) is None
+    assert cache.get(("v1", 1.0)) == 0 and cache.get(("v1", 3.0)) == 1
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (3, 1, 1, 2)
+    cache.clear()
+    assert (cache.stats()["size"], cache.stats()["invalidations"]) == (0, 1)
+
+
+def test_repeated_rows_skip_the_model(forward_passes):
+    features = extract_features(CLINICAL_DATA)
+    verdict, version = score_features_versioned(features)
+    assert score_features_versioned(features) == (verdict, version)
+    assert score_features_versioned([str(value) for value in features]) == (verdict, version)
+    assert forward_passes == [(version, 1)]
+
+    other = extract_features({**CLINICAL_DATA, "age": 70})
+    score_features_versioned(other)
+    assert len(forward_passes) == 2
+
+
+def test_activating_a_version_invalidates_cached_verdicts(registry, forward_passes):
+    features = extract_features(CLINICAL_DATA)
+    publish(registry, "v1")
+    activate_model_version("v1")
+    forward_passes.watch_active()
+    score_features_versioned(features)
+    score_features_versioned(features)
+    invalidations = score_cache.stats()["invalidations"]
+
+    publish(registry, "v2")
+    activate_model_version("v2")
+    assert score_cache.stats()["invalidations"] == invalidations + 1
+    assert score_cache.stats()["size"] == 0
+    forward_passes.watch_active()
+
+    # The first v2 request is scored by v2 and cached under v2 only
+    assert score_features_versioned(features)[1] == "v2"
+    assert score_features_versioned(features)[1] == "v2"
+    assert forward_passes == [("v1", 1), ("v2", 1)]
+    row = np.asarray(features, dtype=np.float64)
+    assert score_cache.get(make_score_key(row, "v2")) is not None
+    assert score_cache.get(make_score_key(row, "v1")) is None
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+import app.prediction as prediction
+from app.models import Prediction
+
+from conftest import CLINICAL_DATA
+
+CHUNKS = ["# Diagnostic Report\n", "## Prediction Summary\n", "Low risk.\n"]
+
+
+def events(response) -> list:
+    """(event, data) pairs of a Server-Sent Events body."""
+    parsed = []
+    for message in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines())
+        parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+
+def stream(client, language="English"):
+    return client.post("/api/predict/stream", data={"clinical_data": json.dumps(CLINICAL_DATA), "language": language})
+
+
+@pytest.fixture
+def report_chunks(monkeypatch):
+    """Stream CHUNKS as the report, optionally failing after ``fail_after`` chunks."""
+    settings = {"fail_after": None}
+
+    async def fake_astream_report(llm, clinical_data, ml_result, language):
+        for index, text in enumerate(CHUNKS):
+            if index == settings["fail_after"]:
+                raise RuntimeError("LLM connection reset")
+            yield text
+
+    monkeypatch.setattr(prediction, "astream_report", fake_astream_report)
+    return settings
+
+
+def test_events_arrive_in_order_and_done_follows_the_stored_row(client, db, user, report_chunks):
+    response = stream(client, language="German")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    received = events(response)
+    assert [event for event, _ in received] == ["result", "chunk", "chunk", "chunk", "done"]
+    result = received[0][1]
+    assert result["language"] == "German" and isinstance(result["clinical_result"], bool)
+    assert [data["text"] for event, data in received if event == "chunk"] == CHUNKS
+
+    stored = db.get(Prediction, received[-1][1]["id"])
+    assert stored.user_id == user.id
+    assert stored.report == "".join(CHUNKS)
+    assert stored.clinical_model_result == result["clinical_result"]
+    assert stored.clinical_features == CLINICAL_DATA
+    assert (stored.language, stored.report_status) == ("German", "ready")
+
+
+def test_a_failed_stream_ends_with_an_error_and_stores_nothing(client, db, user, report_chunks):
+    report_chunks["fail_after"] = 1
+    received = events(stream(client))
+    assert [event for event, _ in received] == ["result", "chunk", "error"]
+    assert "LLM connection reset" in received[-1][1]["detail"]
+    assert db.query(Prediction).filter(Prediction.user_id == user.id).count() == 0
+
+
+def test_invalid_clinical_data_is_rejected_before_streaming(client):
+    response = client.post("/api/predict/stream", data={"clinical_data": json.dumps({**CLINICAL_DATA, "slope": 9})})
+    assert response.status_code == 422
@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import build_engine
+from app.migrations import upgrade
+from app.models import Prediction, ReportJob, User
+from app.write_behind import PredictionWriter
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'write_behind.db'}")
+    upgrade(engine)
+    with Session(engine) as session:
+        session.add(User(id=1, username="writer", email="writer@example.com", hashed_password="x"))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def make_writer(engine):
+    writers = []
+
+    def make(**kwargs):
+        writer = PredictionWriter(engine=engine, **kwargs)
+        writer.start()
+        writers.append(writer)
+        return writer
+
+    yield make
+    for writer in writers:
+        writer.stop()
+
+
+def stored_ids(engine):
+    with Session(engine) as session:
+        return sorted(session.execute(text("SELECT id FROM predictions")).scalars())
+
+
+def test_concurrent_inserts_share_one_commit_and_get_their_own_ids(engine, make_writer):
+    writer = make_writer(max_batch_size=16, max_wait_ms=200)
+    predictions = []
+    for i in range(10):
+        prediction = Prediction(user_id=1, clinical_features={"age": 40 + i}, report_status="pending")
+        prediction.report_job = ReportJob()
+        predictions.append(prediction)
+
+    stored = [future.result(5) for future in [writer.submit(p) for p in predictions]]
+
+    ids = [prediction.id for prediction in stored]
+    assert None not in ids and len(set(ids)) == 10
+    assert [prediction.report_job.prediction_id for prediction in stored] == ids
+    assert stored_ids(engine) == sorted(ids)
+    stats = writer.stats()
+    assert (stats["flushes_total"], stats["rows_total"]) == (1, 10)
+
+
+def test_a_failing_row_is_isolated_and_the_others_get_fresh_ids(engine, make_writer):
+    # Reject one report job so the group commit fails and is retried row by row
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TRIGGER reject_job BEFORE INSERT ON report_jobs WHEN NEW.status = 'reject' "
+            "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+        ))
+    writer = make_writer(max_batch_size=8, max_wait_ms=200)
+
+    # Another process inserts right after the rollback and takes the ids flushed by the failed batch
+    disconnect = writer._disconnect
+
+    def disconnect_then_insert_elsewhere(invalidate=False):
+        disconnect(invalidate)
+        with Session(engine) as session:
+            session.add(Prediction(user_id=1, clinical_features={}, report_status="ready"))
+            session.commit()
+
+    writer._disconnect = disconnect_then_insert_elsewhere
+
+    first = Prediction(user_id=1, clinical_features={"age": 50}, report_status="pending")
+    first.report_job = ReportJob()
+    rejected = Prediction(user_id=1, clinical_features={"age": 51}, report_status="pending")
+    rejected.report_job = ReportJob(status="reject")
+    last = Prediction(user_id=1, clinical_features={"age": 52}, report_status="ready")
+    futures = [writer.submit(p) for p in (first, rejected, last)]
+
+    stored_first = futures[0].result(5)
+    with pytest.raises(Exception, match="rejected"):
+        futures[1].result(5)
+    stored_last = futures[2].result(5)
+
+    assert stored_first.report_job.prediction_id == stored_first.id
+    with Session(engine) as session:
+        assert session.get(Prediction, stored_first.id).clinical_features == {"age": 50}
+        assert session.get(Prediction, stored_last.id).clinical_features == {"age": 52}
+        assert session.query(ReportJob).count() == 1
+    stats = writer.stats()
+    assert (stats["rows_total"], stats["failed_rows_total"]) == (2, 1)
+
+
+def test_stop_stores_everything_queued_before_it(engine, make_writer):
+    writer = make_writer(max_batch_size=2, max_wait_ms=1000)
+    futures = [writer.submit(Prediction(user_id=1, clinical_features={}, report_status="ready")) for _ in range(5)]
+    writer.stop()
+    assert all(future.done() and future.exception() is None for future in futures)
+    assert len(stored_ids(engine)) == 5
+
+
+def test_cancelled_writes_are_skipped(engine, make_writer):
+    writer = make_writer(max_batch_size=8, max_wait_ms=200)
+    cancelled = writer.submit(Prediction(user_id=1, clinical_features={"age": 1}, report_status="ready"))
+    kept = writer.submit(Prediction(user_id=1, clinical_features={"age": 2}, report_status="ready"))
+    assert cancelled.cancel()
+    assert kept.result(5).id is not None
+    assert stored_ids(engine) == [kept.result().id]
+
+
+def test_submit_requires_a_running_writer(engine):
+    with pytest.raises(RuntimeError):
+        PredictionWriter(engine=engine).submit(Prediction(user_id=1))
+    with pytest.raises(ValueError):
+        PredictionWriter(engine=engine, durability="sometimes")